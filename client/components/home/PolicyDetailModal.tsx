@@ -89,20 +89,41 @@ export default function PolicyDetailModal({
     setSummaryError(false);
     setSummaryLoading(true);
 
-    fetchWithAuth(`/api/policies/${policy.id}/summary`)
-    .then((res) => {
-      if (!res.ok) throw new Error("summary fetch failed");
-      return res.json();
-    })
-    .then((data) => {
-      setSummary(data.summary);
+    // stream=1: {"delta"} 줄이 오는 대로 이어 붙여 첫 토큰부터 보여준다
+    let cancelled = false;
+    fetchWithAuth(`/api/policies/${policy.id}/summary?stream=1`)
+    .then(async (res) => {
+      if (!res.ok || !res.body) throw new Error("summary fetch failed");
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+      let text = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done || cancelled) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop() ?? "";
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const frame = JSON.parse(line);
+          if (frame.error) throw new Error(frame.error);
+          if (frame.delta) {
+            text += frame.delta;
+            setSummary(text.trimEnd());
+          }
+        }
+      }
     })
     .catch(() => {
-      setSummaryError(true);
+      if (!cancelled) setSummaryError(true);
     })
     .finally(() => {
-      setSummaryLoading(false);
+      if (!cancelled) setSummaryLoading(false);
     });
+    return () => {
+      cancelled = true;
+    };
   }, [policy.id]);
 
 
@@ -114,11 +135,13 @@ export default function PolicyDetailModal({
   const summaryRows = [
     {
       label: "AI 요약",
-      value: summaryLoading
+      value: summary
+        ? summary
+        : summaryLoading
         ? "요약중입니다…"
         : summaryError
         ? "요약을 불러오지 못했습니다."
-        : summary || "",
+        : "",
     },
   ];
 
@@ -39,10 +39,21 @@ export async function proxyRequest(req: NextRequest, targetPath: string) {
   }
 
   const res = await fetch(url, init);
-  const body = await res.arrayBuffer();
   const headers = new Headers(res.headers);
   headers.set("Access-Control-Allow-Origin", "*");
 
+  // NDJSON 스트리밍 응답은 모아 두지 않고 그대로 흘려보낸다 (줄이 오는 대로 클라이언트에 전달)
+  if (res.body && headers.get("content-type")?.includes("application/x-ndjson")) {
+    headers.delete("content-length");
+    return new NextResponse(res.body, {
+      status: res.status,
+      statusText: res.statusText,
+      headers,
+    });
+  }
+
+  const body = await res.arrayBuffer();
+
   return new NextResponse(body, {
     status: res.status,
     statusText: res.statusText,
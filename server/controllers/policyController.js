@@ -1,19 +1,37 @@
 const db = require('../config/db');
-const { runPython } = require('../utils/pythonRunner');
+const { callWorker } = require('../utils/pythonWorker');
 const { normalizePolicyRow, normalizePolicies } = require("../utils/policyNormalizer");
 
 // 정책 검색
+// - limit/cursor 가 있으면 { items, nextCursor } 페이지로 응답
+// - stream=1 이면 페이지마다 한 줄씩 NDJSON 으로 흘려보냄
 exports.search = async (req, res) => {
-  const { q, sido, employmentStatus, maritalStatus, education, major, specialGroup, interests } = req.query;
+  const { q, sido, employmentStatus, maritalStatus, education, major, specialGroup, interests, limit, cursor, stream } = req.query;
   const filters = {
     keyword: q, sido, employmentStatus, maritalStatus, education, major,
     specialGroup: specialGroup?.split(","),
     interests: interests?.split(","),
+    limit: limit ? Number(limit) : undefined,
+    cursor,
   };
 
+  if (stream === "1" || stream === "true") {
+    res.type("application/x-ndjson");
+    try {
+      await callWorker("search_stream", { filters }, {
+        onData: (page) => res.write(JSON.stringify(page) + "\n"),
+      });
+      res.end();
+    } catch (err) {
+      if (!res.headersSent) return res.status(500).json({ message: "검색 실패" });
+      res.end(JSON.stringify({ error: "검색 실패" }) + "\n");
+    }
+    return;
+  }
+
   try {
-    const result = await runPython("python/search.py", [JSON.stringify(filters)]);
-    res.json(JSON.parse(result));
+    const result = await callWorker("search", { filters });
+    res.json(result);
   } catch (err) {
     res.status(500).json({ message: "검색 실패" });
   }
@@ -35,8 +53,7 @@ exports.recommend = async (req, res) => {
 
     if (updateResult.affectedRows === 0) return res.status(400).json({ message: "추천 횟수 소진" });
 
-    const resultbuf = await runPython("python/recommend.py", [email, prompt]);
-    const parsed = JSON.parse(resultbuf);
+    const parsed = await callWorker("recommend", { email, prompt });
 
     // AI가 객체 배열을 준 경우 바로 반환
     if (Array.isArray(parsed) && parsed[0] && typeof parsed[0] === "object") {
@@ -71,10 +88,28 @@ exports.getSummary = async (req, res) => {
     const [[row]] = await db.query('SELECT * FROM policies WHERE id = ?', [req.params.id]);
     if (!row) return res.status(404).json({ message: "정책 없음" });
 
+    // python/policy_summary.py build_input_text 와 같은 형식 (요약 캐시 키가 이 문자열의 해시)
     const inputText = `정책명: ${row.plcyNm}\n설명: ${row.plcyExplnCn}\n지원내용: ${row.plcySprtCn}\n방법: ${row.plcyAplyMthdCn}...`.trim();
-    const out = await runPython("python/policy_summary.py", [], inputText);
+
+    // stream=1 이면 토큰 조각이 오는 대로 {"delta"} 한 줄씩, 끝에 {"done": true}
+    if (req.query.stream === "1" || req.query.stream === "true") {
+      res.type("application/x-ndjson");
+      res.flushHeaders();
+      try {
+        await callWorker("summary_stream", { id: row.id, text: inputText }, {
+          onData: (frame) => res.write(JSON.stringify(frame) + "\n"),
+        });
+        res.end(JSON.stringify({ done: true }) + "\n");
+      } catch (err) {
+        res.end(JSON.stringify({ error: "요약 실패" }) + "\n");
+      }
+      return;
+    }
+
+    const out = await callWorker("summary", { id: row.id, text: inputText });
     res.json({ summary: out.trim() });
   } catch (err) {
+    if (res.headersSent) return res.end();
     res.status(500).json({ message: "요약 실패" });
   }
 };
@@ -5,11 +5,16 @@ const mysql = require('mysql2/promise');
 const fs = require('fs');
 const readline = require('readline');
 const path = require('path');
+const { runPython } = require('../utils/pythonRunner');
 
 const API_KEY = process.env.API_KEY;
 const BASE_URL = process.env.BASE_URL;
 const PAGE_SIZE = 1000;
 
+// 파이썬 쪽 캐시(상주 워커 코퍼스, 검색 결과 캐시 등) 무효화용 세대 마커
+const POLICY_CACHE_DIR = process.env.POLICY_CACHE_DIR || path.join(__dirname, '../.policy_cache');
+const GENERATION_FILE = process.env.POLICY_GENERATION_FILE || path.join(POLICY_CACHE_DIR, 'generation');
+
 const zipCdToName = {};
 const filePath = path.join(__dirname, '../data/legal_district_code.txt');
 async function loadZipCdToName() {
@@ -396,10 +401,38 @@ async function deleteExpiredOrClosedPoliciesForce() {
   }
 }
 
+function bumpPolicyGeneration() {
+  fs.mkdirSync(path.dirname(GENERATION_FILE), { recursive: true });
+  const tmp = `${GENERATION_FILE}.${process.pid}.tmp`;
+  fs.writeFileSync(tmp, String(Date.now()));
+  fs.renameSync(tmp, GENERATION_FILE);
+}
+
+// 새 세대의 전처리 스냅샷을 미리 만들어 둔다 (실패해도 recommend.py 가 DB 에서 읽고 다시 만든다)
+async function buildPolicySnapshot() {
+  try {
+    await runPython('python/recommend.py', ['--build-snapshot']);
+  } catch (e) {
+    console.error('정책 스냅샷 빌드 실패(무시):', e.message);
+  }
+}
+
+// 새/변경 정책의 상세 페이지 요약을 미리 만들어 둔다 (요청 시에는 캐시 조회만)
+async function pregenerateSummaries() {
+  try {
+    await runPython('python/policy_summary.py', ['--pregenerate']);
+  } catch (e) {
+    console.error('정책 요약 일괄 생성 실패(무시):', e.message);
+  }
+}
+
 (async function main() {
   try {
     await fetchAndSavePolicies();
     await deleteExpiredOrClosedPoliciesForce();
+    bumpPolicyGeneration();
+    await buildPolicySnapshot();
+    await pregenerateSummaries();
     console.log('모든 정책 저장/정리 완료!');
     process.exit(0);
   } catch (err) {
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+검색 코퍼스 적재 벤치마크: SELECT * + dict 행(기존) vs 컬럼형 PolicyStore.
+
+  python3 python/bench_policy_store.py            # 합성 데이터 5000건
+  python3 python/bench_policy_store.py -n 100000  # 합성 데이터 N건
+  python3 python/bench_policy_store.py --db       # 실제 DB (.env 의 DB_*)
+
+정책당 상주 메모리(tracemalloc 기준)와 적재 시간을 출력한다.
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+import search
+from policy_store import PolicyStore, STORE_COLUMNS, load_store
+
+_WORDS = "청년 취업 지원 주거 월세 창업 교육 대출 보증 이자 세금 공제 프로그램 멘토링 일자리 인턴 전세 임대".split()
+_SIDO = ["서울특별시", "부산광역시", "경기도", "강원특별자치도", "전북특별자치도", "제주특별자치도"]
+_GU = ["종로구", "중구", "수원시 장안구", "강서구", "춘천시", "전주시 완산구", "제주시"]
+
+
+def synthetic_rows(n, seed=7):
+    """SELECT * 로 읽힌 policies 행을 흉내낸 합성 데이터."""
+    r = random.Random(seed)
+    long_text = lambda k: " ".join(r.choices(_WORDS, k=k))
+    for i in range(n):
+        yield {
+            "id": i + 1,
+            "plcyNm": f"{long_text(3)} 사업{i}",
+            "zipCd": ", ".join(f"{r.choice(_SIDO)} {r.choice(_GU)}" for _ in range(r.randint(0, 30))),
+            "mrgSttsCd": r.choice(["기혼", "미혼", "제한없음"]),
+            "schoolCd": r.choice(["대학 재학, 대학 졸업", "제한없음", ""]),
+            "jobCd": r.choice(["재직자, 미취업자", "(예비)창업자", "제한없음"]),
+            "plcyMajorCd": r.choice(["공학계열", "제한없음"]),
+            "sbizCd": r.choice(["중소기업, 여성", "제한없음"]),
+            "plcyKywdNm": ", ".join(r.sample(["취업", "주거", "창업", "교육", "대출", "바우처"], 2)),
+            "plcyExplnCn": long_text(120),
+            "plcySprtCn": long_text(150),
+            "plcyAplyMthdCn": long_text(80),
+            "srngMthdCn": long_text(40),
+            "sbmsnDcmntCn": long_text(60),
+            "etcMttrCn": long_text(60),
+            "addAplyQlfcCndCn": long_text(40),
+            "ptcpPrpTrgtCn": long_text(30),
+            "aplyYmd": "20250101 ~ 20251231",
+            "sprtTrgtMinAge": "19", "sprtTrgtMaxAge": "34", "sprtTrgtAgeLmtYn": "Y",
+            "earnCndSeCd": "무관", "earnMinAmt": "0", "earnMaxAmt": "0",
+            "lclsfNm": "일자리", "mclsfNm": "취업", "plcyPvsnMthdCd": "보조금",
+            "aplyUrlAddr": "https://example.com/apply", "refUrlAddr1": "https://example.com/ref",
+            "inqCnt": r.randint(0, 10000),
+        }
+
+
+def measure(label, build):
+    """
+    build() 를 두 번 돌린다.
+    - 메모리: tracemalloc 의 현재(상주) 바이트 — 적재가 끝난 뒤 남아 있는 것만
+    - 시간: 추적 없이 측정
+    """
+    tracemalloc.start()
+    obj = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(obj) or 1
+    del obj
+
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    return {
+        "label": label,
+        "n": len(obj),
+        "load_ms": round(elapsed * 1000, 1),
+        "bytes_per_policy": round(current / count),
+        "peak_bytes_per_policy": round(peak / count),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=5000, help="합성 정책 수")
+    parser.add_argument("--db", action="store_true", help="실제 DB 에서 적재")
+    ns = parser.parse_args(argv[1:])
+
+    if ns.db:
+        legacy_build = search.load_policies_from_db
+        store_build = lambda: load_store(search.connect)
+    else:
+        # 드라이버가 돌려준 행을 흉내: 시간은 적재(전처리/적재) 비용만 보도록 미리 만들어 둔다.
+        # SELECT * 는 긴 본문까지 문자열로 새로 만들기 때문에 dict 사본에 문자열도 복제한다.
+        rows = list(synthetic_rows(ns.n))
+        legacy_build = lambda: [
+            search.preprocess_policy_row({k: v.encode("utf-8").decode("utf-8") if isinstance(v, str) else v for k, v in r.items()})
+            for r in rows
+        ]
+        # 프로젝션: 검색이 읽는 컬럼만 SELECT 한 것과 같은 입력
+        store_build = lambda: PolicyStore.from_rows({k: r[k] for k in STORE_COLUMNS} for r in rows)
+
+    result = {
+        "legacy": measure("select_star_dicts", legacy_build),
+        "store": measure("columnar_store", store_build),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
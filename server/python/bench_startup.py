@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스크립트 기동(import) 시간 벤치마크 + 회귀 검사.
+
+Node 가 요청마다 띄우는 프로세스(recommend.py, policy_summary.py, search.py)는
+import 비용을 매번 낸다. 무거운 모듈(langchain, openai, pydantic, pymysql)은 쓰는 함수 안에서
+import 하도록 되어 있으니, 누가 다시 모듈 최상단으로 올리면 여기서 잡힌다.
+
+  python3 python/bench_startup.py                  # 측정 + 금지 모듈 검사
+  python3 python/bench_startup.py -n 20            # 반복 횟수
+  python3 python/bench_startup.py --save-baseline  # 현재 값을 기준선으로 저장
+  python3 python/bench_startup.py --check          # 기준선 대비 느려졌으면 exit 1
+
+- cold_ms: 새 인터프리터로 `import <모듈>` 까지의 벽시계 시간 중앙값 (python -c pass 만큼을 뺀 값은 import_ms)
+- top: `-X importtime` 의 누적 시간 상위 (그 모듈이 끌어온 직접 import 기준)
+- 금지 모듈이 import 되어 있으면 --check 없이도 exit 1
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from corpus_version import CACHE_ROOT
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(CACHE_ROOT, "startup_baseline.json")
+
+_LLM_MODULES = ["langchain_openai", "langchain_core", "openai", "pydantic", "tiktoken"]
+
+# 모듈 → import 만으로는 올라오면 안 되는 모듈
+TARGETS = {
+    "recommend": _LLM_MODULES + ["pymysql", "asyncio"],
+    "policy_summary": _LLM_MODULES + ["pymysql"],
+    "search": _LLM_MODULES + ["pymysql"],
+}
+
+
+def _run(code, extra=()):
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *extra, "-c", code],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    return (time.perf_counter() - t0) * 1000, proc
+
+
+def cold_ms(code, n):
+    _run(code)  # 첫 실행은 .pyc 생성/디스크 캐시 때문에 버린다
+    return statistics.median(_run(code)[0] for _ in range(n))
+
+
+def import_breakdown(module, top=8):
+    """-X importtime 출력 → (전체 누적 us, 직접 import 상위, 올라온 모듈 이름 전체)"""
+    _, proc = _run(f"import {module}", ("-X", "importtime"))
+    rows = []  # (깊이, 이름, 누적 us)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cum_us, name = line[len("import time:"):].split("|", 2)
+        if not cum_us.strip().isdigit():
+            continue  # 헤더 줄
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cum_us)))
+    loaded = {name for _, name, _ in rows}
+    total = next((cum for depth, name, cum in rows if depth == 0 and name == module), 0)
+    direct = sorted(((name, cum) for depth, name, cum in rows if depth == 1), key=lambda x: x[1], reverse=True)
+    return total, [{"module": m, "cum_ms": round(us / 1000, 1)} for m, us in direct[:top]], loaded
+
+
+def measure(n):
+    bare = cold_ms("pass", n)
+    out = {"python_ms": round(bare, 1), "modules": {}}
+    for module, forbidden in TARGETS.items():
+        wall = cold_ms(f"import {module}", n)
+        total_us, top, loaded = import_breakdown(module)
+        out["modules"][module] = {
+            "cold_ms": round(wall, 1),
+            "import_ms": round(max(0.0, wall - bare), 1),
+            "importtime_ms": round(total_us / 1000, 1),
+            "top": top,
+            "forbidden_loaded": sorted(m for m in forbidden if m in loaded),
+        }
+    return out
+
+
+def regressions(result, baseline, tolerance, slack_ms):
+    # 기준선보다 tolerance 비율 + slack_ms 이상 느려진 모듈 (측정 잡음은 slack_ms 로 흡수)
+    bad = []
+    for module, cur in result["modules"].items():
+        base = baseline.get("modules", {}).get(module)
+        if base is None:
+            continue
+        limit = base["import_ms"] * (1 + tolerance) + slack_ms
+        if cur["import_ms"] > limit:
+            bad.append(f"{module}: import {cur['import_ms']}ms > 기준 {base['import_ms']}ms (+{tolerance:.0%}, +{slack_ms}ms)")
+    return bad
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10, help="모듈별 반복 횟수")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준선 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="측정값을 기준선으로 저장")
+    parser.add_argument("--check", action="store_true", help="기준선 대비 회귀면 exit 1")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="허용 비율 (기본 30%%)")
+    parser.add_argument("--slack-ms", type=float, default=30.0, help="허용 절대값 (ms)")
+    ns = parser.parse_args(argv[1:])
+
+    result = measure(ns.n)
+    problems = [
+        f"{module}: import 시 {', '.join(r['forbidden_loaded'])} 로드됨"
+        for module, r in result["modules"].items() if r["forbidden_loaded"]
+    ]
+
+    if ns.check:
+        try:
+            with open(ns.baseline, "r", encoding="utf-8") as f:
+                problems += regressions(result, json.load(f), ns.tolerance, ns.slack_ms)
+        except FileNotFoundError:
+            problems.append(f"기준선 없음: {ns.baseline} (--save-baseline 으로 먼저 저장)")
+
+    if ns.save_baseline and not problems:
+        os.makedirs(os.path.dirname(ns.baseline) or ".", exist_ok=True)
+        with open(ns.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    result["problems"] = problems
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+정책 코퍼스 세대(generation) 마커.
+
+jobs/api_save.js 가 새 정책 세트를 저장할 때마다 마커 파일을 갱신하고,
+파이썬 쪽 캐시(상주 워커의 코퍼스, 검색 결과 캐시 등)는 값이 바뀌면 무효화한다.
+파일 하나를 읽는 것뿐이라 요청마다 확인해도 된다.
+"""
+
+import os
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_ROOT = os.environ.get("POLICY_CACHE_DIR", os.path.join(SERVER_DIR, ".policy_cache"))
+GENERATION_FILE = os.environ.get("POLICY_GENERATION_FILE", os.path.join(CACHE_ROOT, "generation"))
+
+
+def current_generation() -> str:
+    try:
+        with open(GENERATION_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def bump_generation() -> str:
+    os.makedirs(os.path.dirname(GENERATION_FILE), exist_ok=True)
+    gen = str(int(time.time() * 1000))
+    tmp = f"{GENERATION_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen)
+    os.replace(tmp, GENERATION_FILE)
+    return gen
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+MySQL 연결 풀 (pymysql, 스레드 안전).
+
+추천 한 번에 사용자 조회 + 정책 조회로 연결을 두 번 새로 열고, 검색/요약도 호출마다 새로 열었다.
+상주 워커에서는 요청마다 TCP + 인증 왕복을 다시 하게 된다 → 쓰고 난 연결을 돌려받아 재사용한다.
+
+- connection(): with 블록 동안 연결 하나를 빌려준다. 블록이 예외로 끝나면 그 연결은 버린다
+- 오래 놀던 연결은 빌려주기 전에 ping(reconnect=True) 으로 살린다 (MySQL wait_timeout 대비)
+- 돌려받을 때 autocommit 이 아니면 rollback → 다음 사용자가 이전 트랜잭션 스냅샷을 보지 않는다
+- 최대 max_idle 개만 보관 (동시에 더 필요하면 새로 열고, 남는 것은 닫는다). max_idle=0 이면 풀 없이 매번 연결
+- stream_cursor(conn): 버퍼링 없는 서버 측 커서(SSDictCursor). 큰 테이블은 fetchall 없이 행을 받는 대로 처리
+  (스트리밍 중에는 같은 연결로 다른 쿼리를 보낼 수 없다: 커서를 닫거나 끝까지 읽은 뒤 반납)
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Tuple
+
+
+class ConnectionPool:
+    def __init__(self, factory: Callable[[], Any], max_idle: int = 4, ping_after_s: float = 30.0):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.ping_after_s = ping_after_s
+        self._idle: List[Tuple[Any, float]] = []  # (연결, 반납 시각)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _acquire(self) -> Any:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, returned_at = self._idle.pop()
+            try:
+                if time.monotonic() - returned_at > self.ping_after_s:
+                    conn.ping(reconnect=True)
+                with self._lock:
+                    self.reused += 1
+                return conn
+            except Exception:
+                _close_quietly(conn)
+        conn = self.factory()
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _release(self, conn: Any) -> None:
+        try:
+            if not getattr(conn, "open", True):
+                return
+            if not conn.get_autocommit():
+                conn.rollback()
+        except Exception:
+            _close_quietly(conn)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((conn, time.monotonic()))
+                return
+        _close_quietly(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            _close_quietly(conn)  # 상태를 모르는 연결은 돌려놓지 않는다
+            raise
+        self._release(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "max_idle": self.max_idle, "created": self.created, "reused": self.reused}
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def stream_cursor(conn: Any):
+    """버퍼링 없는 dict 커서. with 블록이 끝나면 남은 행을 버리고 닫힌다."""
+    from pymysql.cursors import SSDictCursor
+    return conn.cursor(SSDictCursor)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 백엔드 (EMBEDDING_MODEL 로 선택).
+
+- "local-ngram" (또는 "local-ngram-<차원>"): 네트워크 없이 CPU 에서 동작하는 로컬 백엔드
+  문자 n-gram(2~3) 을 해시 버킷에 모은 TF-IDF 를 randomized SVD 로 투영(LSA)
+  → 코퍼스 전체를 몇 초 안에 임베딩, 오프라인 테스트/벤치마크 가능
+- 그 밖의 값: OpenAI 임베딩 모델 이름 (text-embedding-3-small 등)
+
+두 백엔드 모두 LangChain Embeddings 와 같은 embed_documents / embed_query 를 제공하고,
+추가로
+- model_id: 벡터 호환성 식별자 (저장소/질의 캐시 키). 로컬 백엔드는 학습 결과 해시를 포함
+- prepare(texts): 임베딩 전에 코퍼스를 한 번 보여준다 (로컬 백엔드는 미학습이면 학습)
+
+  python3 python/embedding_backends.py -n 5000   # 합성 코퍼스로 학습/임베딩/검색 시간 측정
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import unicodedata
+from typing import List, Dict, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 로컬 백엔드는 쓸 수 없다
+    np = None
+
+LOCAL_PREFIX = "local-ngram"
+LOCAL_DEFAULT_DIM = 128
+LOCAL_N_FEATURES = int(os.environ.get("LOCAL_EMBED_FEATURES", str(1 << 15)))
+LOCAL_NGRAMS = (2, 3)
+SVD_OVERSAMPLE = 10
+SVD_BLOCK = 256
+
+# 64bit 롤링 해시 상수 (결정적이어야 학습/질의 사이에 버킷이 일치한다)
+_P = np.uint64(0x100000001B3) if np is not None else None
+_MIX = np.uint64(0x9E3779B97F4A7C15) if np is not None else None
+
+
+def is_local_model(model: str) -> bool:
+    return (model or "").startswith(LOCAL_PREFIX)
+
+
+class OpenAIEmbeddingBackend:
+    def __init__(self, model: str, api_key: str):
+        self.model = model
+        self.model_id = model
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _embeddings(self):
+        with self._lock:
+            if self._client is None:
+                # 지연 import: 환경에 없으면 여기서 바로 예외 나고 fallback 가능
+                from langchain_openai import OpenAIEmbeddings
+                self._client = OpenAIEmbeddings(model=self.model, openai_api_key=self._api_key)
+            return self._client
+
+    def prepare(self, texts: Sequence[str]) -> None:
+        pass
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embeddings().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embeddings().embed_query(text)
+
+
+class HashedNgramEmbeddingBackend:
+    """
+    해시 문자 n-gram TF-IDF + SVD 투영.
+    학습 결과(idf, 투영 행렬)는 path(.npz) 에 저장해 두고 이후에는 그대로 쓴다.
+    코퍼스 세대가 바뀌어도 다시 학습하지 않는다 (벡터가 바뀌면 증분 저장소가 전부 무효화되므로).
+    다시 학습하려면 파일을 지우면 된다.
+    """
+
+    def __init__(self, path: str, dim: int = LOCAL_DEFAULT_DIM, n_features: int = LOCAL_N_FEATURES):
+        if np is None:
+            raise ImportError("numpy 가 필요합니다.")
+        self.path = path
+        self.dim = dim
+        self.n_features = n_features
+        self.model_id: Optional[str] = None
+        self.idf: Optional["np.ndarray"] = None
+        self.components: Optional["np.ndarray"] = None  # (n_features, dim)
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---------- 특징 추출 ----------
+    def _buckets(self, text: str) -> "np.ndarray":
+        norm = " " + " ".join(unicodedata.normalize("NFC", text or "").lower().split()) + " "
+        cp = np.frombuffer(norm.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        out = []
+        with np.errstate(over="ignore"):
+            h = cp.copy()
+            for n in range(2, LOCAL_NGRAMS[-1] + 1):
+                if len(cp) < n:
+                    break
+                h = h[:-1] * _P + cp[n - 1:]
+                if n >= LOCAL_NGRAMS[0]:
+                    out.append(((h + np.uint64(n)) * _MIX) >> np.uint64(40))
+        if not out:
+            return np.zeros(0, dtype=np.int64)
+        return (np.concatenate(out) % np.uint64(self.n_features)).astype(np.int64)
+
+    def _tf(self, text: str):
+        idx, cnt = np.unique(self._buckets(text), return_counts=True)
+        return idx, (1.0 + np.log(cnt)).astype(np.float32)  # sublinear tf
+
+    def _rows(self, texts: Sequence[str]):
+        """TF-IDF 행 (L2 정규화) 목록: [(버킷, 가중치), ...]"""
+        rows = []
+        for t in texts:
+            idx, w = self._tf(t)
+            w = w * self.idf[idx]
+            norm = float(np.linalg.norm(w)) or 1.0
+            rows.append((idx, w / norm))
+        return rows
+
+    def _dense(self, rows) -> "np.ndarray":
+        block = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for r, (idx, w) in enumerate(rows):
+            block[r, idx] = w
+        return block
+
+    # ---------- 학습 ----------
+    def fit(self, texts: Sequence[str], seed: int = 42) -> "HashedNgramEmbeddingBackend":
+        n = len(texts)
+        df = np.zeros(self.n_features, dtype=np.int64)
+        for t in texts:
+            df[np.unique(self._buckets(t))] += 1
+        self.idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        rows = self._rows(texts)
+
+        # randomized SVD (range finder + power iteration 1회), 행렬은 블록 단위로만 dense 로 만든다
+        k = min(self.dim + SVD_OVERSAMPLE, max(1, n))
+        rng = np.random.default_rng(seed)
+        omega = rng.standard_normal((self.n_features, k)).astype(np.float32)
+        blocks = [rows[s:s + SVD_BLOCK] for s in range(0, n, SVD_BLOCK)]
+        y = np.vstack([self._dense(b) @ omega for b in blocks])          # X Ω
+        z = np.zeros((self.n_features, k), dtype=np.float32)
+        off = 0
+        for b in blocks:
+            z += self._dense(b).T @ y[off:off + len(b)]                   # Xᵀ (X Ω)
+            off += len(b)
+        q, _ = np.linalg.qr(np.vstack([self._dense(b) @ z for b in blocks]))  # X Xᵀ X Ω
+        bt = np.zeros((self.n_features, q.shape[1]), dtype=np.float32)
+        off = 0
+        for b in blocks:
+            bt += self._dense(b).T @ q[off:off + len(b)]                  # (Qᵀ X)ᵀ
+            off += len(b)
+        u, _, _ = np.linalg.svd(bt, full_matrices=False)                 # 오른쪽 특이벡터 = u
+        comps = np.zeros((self.n_features, self.dim), dtype=np.float32)
+        m = min(self.dim, u.shape[1])
+        comps[:, :m] = u[:, :m]
+        self.components = comps
+        self.model_id = self._model_id()
+        return self
+
+    def _model_id(self) -> str:
+        h = hashlib.sha1()
+        h.update(self.idf.tobytes())
+        h.update(self.components[:64].tobytes())
+        return f"{LOCAL_PREFIX}-{self.dim}:{h.hexdigest()[:12]}"
+
+    def _load(self) -> None:
+        try:
+            with np.load(self.path, allow_pickle=False) as z:
+                if int(z["dim"]) != self.dim or int(z["n_features"]) != self.n_features:
+                    return
+                self.idf = z["idf"]
+                self.components = z["components"]
+        except (OSError, EOFError, KeyError, ValueError):
+            return
+        self.model_id = self._model_id()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, idf=self.idf, components=self.components, dim=self.dim, n_features=self.n_features)
+        os.replace(tmp, self.path)
+
+    def prepare(self, texts: Sequence[str]) -> None:
+        with self._lock:
+            if self.components is None:
+                self.fit(list(texts))
+                self.save()
+
+    # ---------- 임베딩 ----------
+    def embed_documents(self, texts: List[str]) -> "np.ndarray":
+        if self.components is None:
+            raise RuntimeError("로컬 임베딩 모델이 학습되지 않았습니다.")
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for r, (idx, w) in enumerate(self._rows(texts)):
+            v = w @ self.components[idx]
+            out[r] = v / (float(np.linalg.norm(v)) or 1.0)
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0].tolist()
+
+
+_BACKENDS: Dict[str, object] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def get_embedding_backend(model: str, api_key: str = "", cache_dir: str = ".faiss_cache"):
+    """프로세스당 모델별로 하나만 만든다."""
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(model)
+        if backend is None:
+            if is_local_model(model):
+                m = re.fullmatch(rf"{LOCAL_PREFIX}(?:-(\d+))?", model)
+                dim = int(m.group(1)) if m and m.group(1) else LOCAL_DEFAULT_DIM
+                backend = HashedNgramEmbeddingBackend(os.path.join(cache_dir, f"{LOCAL_PREFIX}-{dim}.npz"), dim=dim)
+            else:
+                backend = OpenAIEmbeddingBackend(model, api_key)
+            _BACKENDS[model] = backend
+        return backend
+
+
+# --------------------------
+# 오프라인 벤치마크
+# --------------------------
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=5000, help="합성 정책 수")
+    parser.add_argument("--dim", type=int, default=LOCAL_DEFAULT_DIM)
+    ns = parser.parse_args(argv[1:])
+
+    from bench_policy_store import synthetic_rows
+    from recommend import _policy_text_for_embedding, preprocess_policy_row
+    from vector_index import PolicyVectorIndex
+    from embedding_store import _normalize
+
+    texts = [_policy_text_for_embedding(preprocess_policy_row(r)) for r in synthetic_rows(ns.n)]
+    backend = HashedNgramEmbeddingBackend(os.devnull, dim=ns.dim)
+
+    t0 = time.perf_counter()
+    backend.fit(texts)
+    t1 = time.perf_counter()
+    vecs = _normalize(backend.embed_documents(texts))
+    t2 = time.perf_counter()
+    index = PolicyVectorIndex(range(1, ns.n + 1), vecs, backend.model_id, "bench")
+    allow = list(range(1, ns.n + 1, 2))
+    lat = []
+    for q in ["월세 지원", "청년 창업 지원금", "취업 교육 프로그램", "전세 대출 이자"] * 5:
+        s = time.perf_counter()
+        index.search(backend.embed_query(q), allow, 200)
+        lat.append((time.perf_counter() - s) * 1000)
+    lat.sort()
+    print(json.dumps({
+        "n": ns.n,
+        "dim": ns.dim,
+        "fit_s": round(t1 - t0, 2),
+        "embed_corpus_s": round(t2 - t1, 2),
+        "query_p50_ms": round(lat[len(lat) // 2], 2),
+        "query_max_ms": round(lat[-1], 2),
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+정책 임베딩 저장소 (증분 갱신, memmap).
+
+정책 하나가 바뀌어도 전체를 다시 임베딩하지 않도록
+(정책 id, 임베딩 텍스트 해시) 단위로 벡터를 보관한다.
+
+디렉터리 구성 (root = <FAISS_CACHE_DIR>/embeddings_<모델>)
+  store.json            매니페스트 {version, dim, dtype, count, model, generation}
+  ids.<ver>.npy         int64[count]      정책 id (오름차순)
+  hashes.<ver>.npy      uint8[count, 16]  _policy_text_for_embedding 의 blake2b-128
+  vectors.<ver>.npy     float32|float16[count, dim]  L2 정규화된 벡터
+
+- 읽기: np.load(mmap_mode="r") → 페이지 캐시를 공유하고 프로세스 RAM 으로 복사하지 않는다
+- 갱신(sync): 해시가 같은 행은 기존 memmap 에서 복사, 새/변경 정책만 임베딩
+  새 버전 파일을 임시 이름으로 다 쓰고 os.replace 한 뒤 매니페스트를 원자적으로 교체하고 이전 버전을 지운다
+  (이미 열려 있는 memmap 은 unlink 후에도 유효. 매니페스트만 읽고 지워진 파일을 만나면 다시 연다)
+- sync 는 store.lock 파일 잠금(flock)으로 프로세스 간 직렬화 (워커 + CLI/--batch 가 같은 세대를 동시에 갱신하지 않게)
+  잠금을 얻은 뒤 매니페스트를 다시 읽어, 다른 프로세스가 이미 갱신했으면 그대로 쓴다
+- pickle 을 쓰지 않는다 (allow_pickle=False)
+"""
+
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 벡터 단계는 건너뛴다 (recommend.py fallback)
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 (단일 프로세스 전제)
+    fcntl = None
+
+MANIFEST = "store.json"
+LOCK_FILE = "store.lock"
+HASH_BYTES = 16
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "256"))
+# float16 이면 디스크/페이지 캐시 절반, 코사인 유사도 오차는 1e-3 수준
+EMBEDDING_STORE_DTYPE = os.environ.get("EMBEDDING_STORE_DTYPE", "float32")
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=HASH_BYTES).digest()
+
+
+def _normalize(mat: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32, copy=False)
+
+
+class EmbeddingStore:
+    def __init__(self, root: str):
+        if np is None:
+            raise ImportError("numpy 가 필요합니다.")
+        self.root = root
+        self.manifest: Dict[str, Any] = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.hashes = np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        self.vectors: Optional["np.ndarray"] = None
+        self._open()
+
+    # ---------- 열기 ----------
+    def _path(self, name: str, version: int) -> str:
+        return os.path.join(self.root, f"{name}.{version}.npy")
+
+    def _open(self, attempts: int = 3) -> None:
+        for attempt in range(attempts):
+            try:
+                with open(os.path.join(self.root, MANIFEST), "r", encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.manifest = {}
+                return
+            ver = int(self.manifest["version"])
+            try:
+                self.ids = np.load(self._path("ids", ver), mmap_mode="r", allow_pickle=False)
+                self.hashes = np.load(self._path("hashes", ver), mmap_mode="r", allow_pickle=False)
+                self.vectors = np.load(self._path("vectors", ver), mmap_mode="r", allow_pickle=False)
+                return
+            except FileNotFoundError:
+                # 매니페스트를 읽은 직후 다른 프로세스가 새 버전으로 바꾸고 이전 파일을 지움 → 다시 읽는다
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.05)
+
+    @contextmanager
+    def _sync_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self.manifest.get("generation")
+
+    @property
+    def dim(self) -> int:
+        return int(self.manifest.get("dim") or 0)
+
+    def _row_map(self) -> Dict[int, int]:
+        return {int(pid): r for r, pid in enumerate(self.ids.tolist())}
+
+    # ---------- 증분 갱신 ----------
+    def sync(
+        self,
+        policies: Iterable[Dict[str, Any]],
+        text_fn: Callable[[Dict[str, Any]], str],
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        model: str,
+        generation: str,
+        batch_size: int = EMBED_BATCH_SIZE,
+    ) -> Dict[str, int]:
+        """
+        현재 코퍼스(policies)에 맞춰 저장소를 갱신한다.
+        반환: {"reused", "embedded", "removed", "count"}
+        """
+        with self._sync_lock():
+            self._open()
+            if self.generation == generation and self.manifest.get("model") == model:
+                # 기다리는 동안 다른 프로세스가 같은 세대로 갱신했다
+                return {"reused": len(self.ids), "embedded": 0, "removed": 0, "count": len(self.ids)}
+            return self._sync_locked(policies, text_fn, embed_documents, model, generation, batch_size)
+
+    def _sync_locked(
+        self,
+        policies: Iterable[Dict[str, Any]],
+        text_fn: Callable[[Dict[str, Any]], str],
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        model: str,
+        generation: str,
+        batch_size: int,
+    ) -> Dict[str, int]:
+        wanted: Dict[int, Tuple[bytes, str]] = {}
+        for p in policies:
+            pid = int(p.get("id") or 0)
+            if pid:
+                text = text_fn(p)
+                wanted[pid] = (content_hash(text), text)
+
+        old_rows = self._row_map() if self.manifest.get("model") == model else {}
+        new_ids = np.asarray(sorted(wanted), dtype=np.int64)
+        reuse_src, reuse_dst, todo_dst, todo_text = [], [], [], []
+        for dst, pid in enumerate(new_ids.tolist()):
+            h, text = wanted[pid]
+            src = old_rows.get(pid)
+            if src is not None and self.hashes[src].tobytes() == h:
+                reuse_src.append(src)
+                reuse_dst.append(dst)
+            else:
+                todo_dst.append(dst)
+                todo_text.append(text)
+
+        stats = {
+            "reused": len(reuse_src),
+            "embedded": len(todo_text),
+            "removed": len(set(old_rows) - set(wanted)),
+            "count": len(new_ids),
+        }
+        if not todo_text and not stats["removed"] and len(old_rows) == len(new_ids):
+            # 내용 변화 없음 → 매니페스트의 세대만 갱신
+            self._write_manifest(dict(self.manifest, generation=generation))
+            return stats
+
+        fresh: List["np.ndarray"] = []
+        for s in range(0, len(todo_text), batch_size):
+            fresh.append(_normalize(np.asarray(embed_documents(todo_text[s:s + batch_size]), dtype=np.float32)))
+        dim = fresh[0].shape[1] if fresh else self.dim
+        if not dim:
+            raise ValueError("임베딩 차원을 알 수 없습니다.")
+
+        ver = int(self.manifest.get("version") or 0) + 1
+        os.makedirs(self.root, exist_ok=True)
+        hashes = np.frombuffer(b"".join(wanted[pid][0] for pid in new_ids.tolist()), dtype=np.uint8)
+        hashes = hashes.reshape(len(new_ids), HASH_BYTES)
+        # 임시 이름으로 다 쓴 뒤 최종 이름으로 (읽는 쪽이 덜 쓴 파일을 보지 않게)
+        tmp = {name: f"{self._path(name, ver)}.{os.getpid()}.tmp" for name in ("ids", "hashes", "vectors")}
+        with open(tmp["ids"], "wb") as f:
+            np.save(f, new_ids, allow_pickle=False)
+        with open(tmp["hashes"], "wb") as f:
+            np.save(f, hashes, allow_pickle=False)
+        out = np.lib.format.open_memmap(
+            tmp["vectors"], mode="w+", dtype=EMBEDDING_STORE_DTYPE, shape=(len(new_ids), dim)
+        )
+        if reuse_src:
+            out[np.asarray(reuse_dst)] = self.vectors[np.asarray(reuse_src)]
+        if fresh:
+            out[np.asarray(todo_dst)] = np.vstack(fresh)
+        out.flush()
+        del out
+        for name, path in tmp.items():
+            os.replace(path, self._path(name, ver))
+
+        old_ver = self.manifest.get("version")
+        self._write_manifest({
+            "version": ver,
+            "dim": int(dim),
+            "dtype": EMBEDDING_STORE_DTYPE,
+            "count": int(len(new_ids)),
+            "model": model,
+            "generation": generation,
+            "updated_at": int(time.time()),
+        })
+        if old_ver is not None:
+            for name in ("ids", "hashes", "vectors"):
+                try:
+                    os.remove(self._path(name, int(old_ver)))
+                except OSError:
+                    pass
+        self._open()
+        return stats
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+        self.manifest = manifest
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+키워드 표 기반 다중 패턴 매처.
+
+recommend.py 의 detect_intent / classify_policy_type 은
+라벨별 키워드 목록을 우선순위대로 `any(k in text ...)` 로 훑었다
+(라벨 6개 × 키워드 ~50개 → 본문을 최대 50번 스캔).
+여기서는 표 전체를 패턴 하나로 컴파일해 본문을 한 번만 훑는다.
+
+- 표: [(라벨, [키워드, ...]), ...]  앞에 있는 라벨이 우선
+- 결과는 "처음 등장한 키워드" 가 아니라 "매칭된 라벨 중 우선순위가 가장 높은 것"
+  → 기존 if/any 체인과 같은 결과
+- 키워드마다 "자신 안에 들어 있는 모든 키워드" 의 라벨 비트마스크를 미리 계산해 둔다
+  (Aho-Corasick 의 출력 함수와 같은 역할: "보증금" → 주거 + 금융("보증"))
+  매칭 후에는 시작 위치 +1 부터 다시 찾으므로 겹쳐 있는 키워드도 놓치지 않는다
+- 문자 단위 전이는 re(C 구현)가 처리한다
+  (순수 파이썬 goto/fail 루프는 기존 `in` 체인보다 2배 느렸다)
+- 최우선 라벨이 매칭되면 그 자리에서 스캔을 멈춘다
+- fingerprint: 표 내용 해시 (표가 바뀌면 영속 캐시 키가 달라진다)
+"""
+
+import re
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+KeywordTable = Sequence[Tuple[str, Sequence[str]]]
+
+
+class KeywordMatcher:
+    def __init__(self, table: KeywordTable):
+        self.labels: List[str] = [label for label, _ in table]
+        self.fingerprint = hashlib.sha1(
+            repr([(label, list(kws)) for label, kws in table]).encode("utf-8")
+        ).hexdigest()[:12]
+
+        owners: Dict[str, int] = {}  # 키워드 → 라벨 비트 (같은 키워드가 여러 라벨에 있을 수 있다)
+        for bit, (_, keywords) in enumerate(table):
+            for kw in keywords:
+                kw = kw.lower()
+                if kw:
+                    owners[kw] = owners.get(kw, 0) | (1 << bit)
+
+        # 출력 마스크: 키워드 안에 들어 있는 다른 키워드의 라벨까지 포함
+        self._mask: Dict[str, int] = {}
+        for kw in owners:
+            m = 0
+            for other, bits in owners.items():
+                if other in kw:
+                    m |= bits
+            self._mask[kw] = m
+
+        # 긴 키워드 우선 → 같은 위치에서 가장 긴 것(=가장 큰 출력 집합)이 잡힌다
+        alts = sorted(owners, key=lambda k: (-len(k), k))
+        self._pattern = re.compile("|".join(map(re.escape, alts)) if alts else r"(?!)")
+
+    def label_mask(self, text: str, stop_mask: int = 0) -> int:
+        """text 에 등장한 키워드의 라벨 비트마스크. stop_mask 의 비트가 켜지면 바로 반환."""
+        search = self._pattern.search
+        masks = self._mask
+        mask = 0
+        pos = 0
+        while True:
+            mo = search(text, pos)
+            if mo is None:
+                return mask
+            mask |= masks[mo.group()]
+            if mask & stop_mask:
+                return mask
+            pos = mo.start() + 1
+
+    def classify(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """매칭된 라벨 중 표에서 가장 앞에 있는 것 (없으면 default)."""
+        mask = self.label_mask((text or "").lower(), stop_mask=1)
+        if not mask:
+            return default
+        return self.labels[(mask & -mask).bit_length() - 1]
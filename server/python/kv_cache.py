@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+프로세스 간에 공유되는 영속 키-값 캐시 (SQLite 파일 하나).
+
+- 값은 bytes 로 저장 (호출 측에서 직렬화)
+- TTL: 저장 후 ttl_s 가 지난 항목은 조회 시 miss 로 보고 지운다 (0 이면 만료 없음)
+- 크기: 항목 수가 max_entries 를 넘으면 마지막 접근이 오래된 것부터 제거 (LRU)
+- 여러 프로세스(CLI, 상주 워커)가 같은 파일을 열어도 된다 (WAL)
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    k TEXT PRIMARY KEY,
+    v BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+# SQLite 바인드 변수 한도(기본 999) 아래로 IN 절을 나눈다
+_IN_CHUNK = 500
+
+
+class KVCache:
+    def __init__(self, path: str, max_entries: int = 10000, ttl_s: int = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_accessed ON kv(accessed_at)")
+
+    @contextmanager
+    def _transaction(self):
+        # 실패하면(다른 프로세스가 잡고 있어 timeout 뒤 database is locked 등) 반드시 ROLLBACK:
+        # 열린 트랜잭션이 남으면 이후 모든 BEGIN 이 이 연결에서 실패한다
+        self._conn.execute("BEGIN")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_s > 0 and now - created_at > self.ttl_s
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute("SELECT v, created_at FROM kv WHERE k = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM kv WHERE k = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE kv SET accessed_at = ? WHERE k = ?", (now, key))
+            self.hits += 1
+            return bytes(row[0])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """여러 키를 한 트랜잭션에서 조회 (IN 절 묶음 단위). 없는/만료된 키는 결과에서 빠진다."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        out: Dict[str, bytes] = {}
+        expired = []
+        with self._lock, self._transaction():
+            for s in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[s:s + _IN_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for k, v, created_at in self._conn.execute(
+                    f"SELECT k, v, created_at FROM kv WHERE k IN ({marks})", chunk
+                ):
+                    if self._expired(created_at, now):
+                        expired.append((k,))
+                    else:
+                        out[k] = bytes(v)
+            if out:
+                self._conn.executemany("UPDATE kv SET accessed_at = ? WHERE k = ?", [(now, k) for k in out])
+            if expired:
+                self._conn.executemany("DELETE FROM kv WHERE k = ?", expired)
+            self.hits += len(out)
+            self.misses += len(keys) - len(out)
+        return out
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        now = time.time()
+        rows = [(k, sqlite3.Binary(v), now, now) for k, v in items]
+        if not rows:
+            return
+        with self._lock, self._transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO kv (k, v, created_at, accessed_at) VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.ttl_s > 0:
+            self._conn.execute("DELETE FROM kv WHERE created_at < ?", (time.time() - self.ttl_s,))
+        (n,) = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+        if n > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM kv WHERE k IN (SELECT k FROM kv ORDER BY accessed_at LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+            total = self.hits + self.misses
+            return {
+                "entries": n,
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+전처리된 정책 코퍼스 스냅샷 (바이너리, mmap 으로 읽기).
+
+recommend.py 는 실행마다 MySQL 에서 정책을 읽어 preprocess_policy_row
+(코드 리스트 split, int 변환, policy_type 분류)를 돌렸다.
+결과는 다음 수집(api_save.js → 세대 갱신)까지 똑같으므로 한 번 만들어 파일로 둔다.
+
+파일 구성 (리틀/빅 엔디언은 빌드한 머신 기준, 헤더에 기록)
+  magic        b"PLCYSNP1"
+  u32          헤더 길이
+  header       JSON {format, generation, schema, count, byteorder, built_at, columns}
+  섹션들       8바이트 정렬, columns[*].sections 에 (offset, nbytes)
+
+컬럼 종류
+  int   values: int64[count], nulls: uint8[count] (None 이 있을 때만, 값 자리는 0)
+  str   offs: uint32[count+1] (문자 단위 offset), blob: UTF-16-LE, nulls: uint8[count] (None 이 있을 때만)
+        (한글 본문은 UTF-8 보다 UTF-16 이 작고 decode 도 2배 빠르다)
+  list  코드 리스트(zipCd 등): 값 어휘(vocab, str 과 같은 형식) + codes: uint32[], offs: uint32[count+1]
+        (PolicyStore 와 같은 CSR, 같은 값은 문자열 객체 하나를 공유)
+- str/int/list 가 아닌 값(datetime 등)은 str() 로 저장한다
+- 읽기: mmap 후 offset/코드 배열은 memoryview 로 복사 없이 보고, 컬럼별 blob 을 한 번에 decode 해서 자른다
+- 유효성: 헤더의 generation(corpus_version) 과 schema(전처리 규칙 식별자)가 둘 다 같을 때만 쓴다
+- 쓰기: 임시 파일에 다 쓴 뒤 os.replace (읽는 쪽은 항상 완전한 파일을 본다)
+- pickle 을 쓰지 않는다
+
+왕복 검사: python3 python/policy_snapshot.py --check
+"""
+
+import gc
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+MAGIC = b"PLCYSNP1"
+FORMAT_VERSION = 1
+TEXT_ENCODING = "utf-16-le"
+_ALIGN = 8
+
+
+def _column_kind(values: Sequence[Any]) -> str:
+    kinds = set()
+    for v in values:
+        if isinstance(v, bool):
+            kinds.add("str")
+        elif isinstance(v, int):
+            kinds.add("int")
+        elif isinstance(v, list):
+            kinds.add("list")
+        else:
+            kinds.add("str")
+    if kinds == {"int"}:
+        return "int"
+    if kinds == {"list"}:
+        return "list"
+    if "list" in kinds:
+        raise ValueError("list 와 다른 타입이 섞인 컬럼은 저장할 수 없습니다.")
+    return "str"
+
+
+def _encode_strings(values: Sequence[Optional[str]]):
+    offs = array("I", [0])
+    parts: List[str] = []
+    pos = 0
+    for v in values:
+        s = "" if v is None else v
+        parts.append(s)
+        pos += len(s)
+        offs.append(pos)
+    return offs, "".join(parts).encode(TEXT_ENCODING)
+
+
+# --------------------------
+# 빌드
+# --------------------------
+def write_snapshot(
+    path: str,
+    policies: Sequence[Dict[str, Any]],
+    generation: str,
+    schema: str,
+    exclude: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """
+    policies(전처리 완료 dict 목록)를 path 에 기록한다. 반환: 헤더
+    exclude: 읽는 쪽이 쓰지 않는 컬럼 (긴 본문 등) → 파일/로드 시간에서 뺀다
+    """
+    n = len(policies)
+    names: List[str] = []
+    seen = set(exclude)
+    for p in policies:
+        for k in p:
+            if k not in seen:
+                seen.add(k)
+                names.append(k)
+
+    sections: List[bytes] = []
+    columns = []
+    offset = 0
+
+    def add(data: bytes):
+        nonlocal offset
+        ref = [offset, len(data)]
+        pad = (-len(data)) % _ALIGN
+        sections.append(data + b"\0" * pad)
+        offset += len(data) + pad
+        return ref
+
+    for name in names:
+        values = [p.get(name) for p in policies]
+        kind = _column_kind([v for v in values if v is not None])
+        col: Dict[str, Any] = {"name": name, "kind": kind, "sections": {}}
+        if kind == "int":
+            col["sections"]["values"] = add(array("q", [0 if v is None else v for v in values]).tobytes())
+        elif kind == "list":
+            vocab: Dict[str, int] = {}
+            codes = array("I")
+            offs = array("I", [0])
+            for v in values:
+                for item in v or ():
+                    codes.append(vocab.setdefault(item, len(vocab)))
+                offs.append(len(codes))
+            voffs, vblob = _encode_strings(list(vocab))
+            col["sections"]["vocab_offs"] = add(voffs.tobytes())
+            col["sections"]["vocab_blob"] = add(vblob)
+            col["sections"]["codes"] = add(codes.tobytes())
+            col["sections"]["offs"] = add(offs.tobytes())
+        else:
+            strs = [v if v is None or isinstance(v, str) else str(v) for v in values]
+            offs, blob = _encode_strings(strs)
+            col["sections"]["offs"] = add(offs.tobytes())
+            col["sections"]["blob"] = add(blob)
+        if any(v is None for v in values):
+            col["sections"]["nulls"] = add(bytes(v is None for v in values))
+        columns.append(col)
+
+    header = {
+        "format": FORMAT_VERSION,
+        "generation": generation,
+        "schema": schema,
+        "count": n,
+        "byteorder": sys.byteorder,
+        "built_at": int(time.time()),
+        "columns": columns,
+    }
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(head)) + head
+    prefix += b"\0" * ((-len(prefix)) % _ALIGN)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        for s in sections:
+            f.write(s)
+    os.replace(tmp, path)
+    return header
+
+
+# --------------------------
+# 읽기
+# --------------------------
+class PolicySnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError("스냅샷 파일 형식이 아닙니다.")
+            (hlen,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+            start = len(MAGIC) + 4
+            self.header: Dict[str, Any] = json.loads(self._mm[start:start + hlen].decode("utf-8"))
+            if self.header.get("format") != FORMAT_VERSION or self.header.get("byteorder") != sys.byteorder:
+                raise ValueError("지원하지 않는 스냅샷 버전입니다.")
+            self._base = start + hlen + ((-(start + hlen)) % _ALIGN)
+        except Exception:
+            self._mm.close()
+            raise
+
+    def __len__(self) -> int:
+        return int(self.header["count"])
+
+    @property
+    def generation(self) -> str:
+        return self.header.get("generation")
+
+    @property
+    def schema(self) -> str:
+        return self.header.get("schema")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "PolicySnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _view(self, ref) -> memoryview:
+        off, nbytes = ref
+        return memoryview(self._mm)[self._base + off:self._base + off + nbytes]
+
+    def _uints(self, ref) -> List[int]:
+        with self._view(ref) as mv, mv.cast("I") as vals:
+            return vals.tolist()
+
+    def _strings(self, offs_ref, blob_ref) -> List[str]:
+        with self._view(blob_ref) as mv:
+            text = str(mv, TEXT_ENCODING)
+        bounds = self._uints(offs_ref)
+        return list(map(text.__getitem__, map(slice, bounds[:-1], bounds[1:])))
+
+    def column(self, col: Dict[str, Any]) -> List[Any]:
+        sec = col["sections"]
+        if col["kind"] == "int":
+            with self._view(sec["values"]) as mv, mv.cast("q") as vals:
+                values = vals.tolist()
+        elif col["kind"] == "list":
+            vocab = self._strings(sec["vocab_offs"], sec["vocab_blob"])
+            items = list(map(vocab.__getitem__, self._uints(sec["codes"])))
+            bounds = self._uints(sec["offs"])
+            values = list(map(items.__getitem__, map(slice, bounds[:-1], bounds[1:])))
+        else:
+            values = self._strings(sec["offs"], sec["blob"])
+        if "nulls" in sec:
+            with self._view(sec["nulls"]) as nulls:
+                for i in range(len(values)):
+                    if nulls[i]:
+                        values[i] = None
+        return values
+
+    def policies(self) -> List[Dict[str, Any]]:
+        cols = self.header["columns"]
+        names = [c["name"] for c in cols]
+        # 순환 참조 없는 dict/list 수만 개를 만드는 동안 GC 를 멈춘다 (큰 힙에서 로드 시간이 2배 이상 차이)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            data = [self.column(c) for c in cols]
+            return [dict(zip(names, row)) for row in zip(*data)]
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+
+def load_snapshot(path: str, generation: str, schema: str) -> Optional[List[Dict[str, Any]]]:
+    """스냅샷이 없거나 세대/스키마가 다르면 None (호출 측이 DB 로 fallback)."""
+    try:
+        with PolicySnapshot(path) as snap:
+            if snap.generation != generation or snap.schema != schema:
+                return None
+            return snap.policies()
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+# --------------------------
+# 왕복 검사 / 오프라인 벤치마크
+# --------------------------
+# (컬럼 이름, 행별 값): None 이 섞인 int/str/list, 빈 리스트, 전부 None
+ROUNDTRIP_COLUMNS = {
+    "id": [1, 2, 3],
+    "inqCnt": [3, None, 0],
+    "plcyNm": ["청년 월세", None, ""],
+    "zipCd": [["11110", "11140"], [], None],
+    "memo": [None, None, None],
+}
+
+def check(path: Optional[str] = None) -> List[str]:
+    """write_snapshot → load_snapshot 이 값을 그대로 돌려주는지. 반환: 어긋난 컬럼 설명"""
+    path = path or os.path.join(os.environ.get("TMPDIR", "/tmp"), f"policies.check.{os.getpid()}.snapshot")
+    n = len(ROUNDTRIP_COLUMNS["id"])
+    rows = [{name: vals[i] for name, vals in ROUNDTRIP_COLUMNS.items()} for i in range(n)]
+    try:
+        write_snapshot(path, rows, "check", "check")
+        loaded = load_snapshot(path, "check", "check")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    if loaded is None:
+        return ["load_snapshot 이 None 을 돌려줌"]
+    return [
+        f"{name}: {[r.get(name) for r in loaded]} (기대 {vals})"
+        for name, vals in ROUNDTRIP_COLUMNS.items()
+        if [r.get(name) for r in loaded] != vals
+    ]
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="정책 스냅샷 빌드/로드 시간 (합성 코퍼스)")
+    parser.add_argument("-n", type=int, default=5000, help="합성 정책 수")
+    parser.add_argument("--path", default=os.path.join(os.environ.get("TMPDIR", "/tmp"), "policies.bench.snapshot"))
+    parser.add_argument("--check", action="store_true", help="None/빈 리스트가 섞인 컬럼의 쓰기/읽기 왕복만 검사 (어긋나면 exit 1)")
+    ns = parser.parse_args(argv[1:])
+
+    if ns.check:
+        problems = check()
+        for line in problems:
+            print(line)
+        print(f"{len(ROUNDTRIP_COLUMNS) - len(problems)}/{len(ROUNDTRIP_COLUMNS)} ok")
+        return 1 if problems else 0
+
+    from bench_policy_store import synthetic_rows
+    from recommend import SNAPSHOT_EXCLUDE_COLUMNS, preprocess_policy_row
+
+    t0 = time.perf_counter()
+    policies = [preprocess_policy_row(r) for r in synthetic_rows(ns.n)]
+    t1 = time.perf_counter()
+    write_snapshot(ns.path, policies, "bench", "bench", exclude=SNAPSHOT_EXCLUDE_COLUMNS)
+    t2 = time.perf_counter()
+    loaded = load_snapshot(ns.path, "bench", "bench")
+    t3 = time.perf_counter()
+    expected = [{k: v for k, v in p.items() if k not in SNAPSHOT_EXCLUDE_COLUMNS} for p in policies]
+    print(json.dumps({
+        "n": ns.n,
+        "preprocess_s": round(t1 - t0, 3),
+        "write_s": round(t2 - t1, 3),
+        "load_ms": round((t3 - t2) * 1000, 1),
+        "bytes": os.path.getsize(ns.path),
+        "identical": loaded == expected,
+    }, ensure_ascii=False, indent=2))
+    os.remove(ns.path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+검색용 컬럼형(columnar) 정책 테이블.
+
+SELECT * 로 LONGTEXT 컬럼까지 행(dict)마다 들고 있던 방식 대신,
+필터/응답에 필요한 짧은 컬럼만 배열로 보관한다.
+- id: array('i'), 정책명: UTF-8 blob + offset 배열
+- 코드 리스트(zipCd, jobCd, ...): 필드별 어휘(vocab)에 intern 한 small-int id
+  → CSR 형태 (offsets: array('I'), codes: array('H'|'I'))
+- 긴 본문(plcyExplnCn, plcySprtCn ...)은 보관하지 않고 필요할 때 id 로 조회
+"""
+
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Callable, Optional, Sequence
+
+from db_pool import stream_cursor
+
+CODE_FIELDS = ("zipCd", "mrgSttsCd", "schoolCd", "jobCd", "plcyMajorCd", "sbizCd", "plcyKywdNm")
+
+# 검색이 실제로 읽는 컬럼 (프로젝션)
+STORE_COLUMNS = ("id", "plcyNm") + CODE_FIELDS
+
+# id 로 지연 조회할 수 있는 긴 본문 컬럼
+LONG_TEXT_COLUMNS = (
+    "plcyExplnCn", "plcySprtCn", "plcyAplyMthdCn", "srngMthdCn", "sbmsnDcmntCn",
+    "etcMttrCn", "addAplyQlfcCndCn", "ptcpPrpTrgtCn",
+)
+
+
+def split_field(val: Any) -> List[str]:
+    # search.split_field 와 같은 규칙
+    if not val or str(val).strip() in ("제한없음", "무관"):
+        return []
+    return [v.strip() for v in str(val).split(",") if v.strip()]
+
+
+class PolicyStore:
+    def __init__(self):
+        self.ids = array("i")
+        self._name_blob = bytearray()
+        self._name_off = array("I", [0])
+        self.vocab: Dict[str, List[str]] = {f: [] for f in CODE_FIELDS}
+        self._vocab_id: Dict[str, Dict[str, int]] = {f: {} for f in CODE_FIELDS}
+        self._offsets: Dict[str, array] = {f: array("I", [0]) for f in CODE_FIELDS}
+        self._codes: Dict[str, array] = {f: array("I") for f in CODE_FIELDS}
+        self._connect: Optional[Callable[[], Any]] = None
+
+    # ---------- 적재 ----------
+    def append(self, row: Dict[str, Any]) -> None:
+        self.ids.append(int(row.get("id") or 0))
+        self._name_blob += (row.get("plcyNm") or "").encode("utf-8")
+        self._name_off.append(len(self._name_blob))
+        for f in CODE_FIELDS:
+            vid = self._vocab_id[f]
+            codes = self._codes[f]
+            for v in split_field(row.get(f)):
+                c = vid.get(v)
+                if c is None:
+                    c = vid[v] = len(self.vocab[f])
+                    self.vocab[f].append(v)
+                codes.append(c)
+            self._offsets[f].append(len(codes))
+
+    def freeze(self) -> "PolicyStore":
+        # 어휘가 작으면(대부분) 코드를 2바이트로 줄인다
+        for f in CODE_FIELDS:
+            if len(self.vocab[f]) <= 0xFFFF:
+                self._codes[f] = array("H", self._codes[f])
+        self._name_blob = bytes(self._name_blob)
+        return self
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "PolicyStore":
+        store = cls()
+        for r in rows:
+            store.append(r)
+        return store.freeze()
+
+    # ---------- 조회 ----------
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def name(self, i: int) -> str:
+        return self._name_blob[self._name_off[i]:self._name_off[i + 1]].decode("utf-8")
+
+    def code_ids(self, field: str, i: int) -> Sequence[int]:
+        off = self._offsets[field]
+        return self._codes[field][off[i]:off[i + 1]]
+
+    def values(self, field: str, i: int) -> List[str]:
+        vocab = self.vocab[field]
+        return [vocab[c] for c in self.code_ids(field, i)]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """색인 빌드용 경량 dict (짧은 컬럼만)."""
+        out: Dict[str, Any] = {"id": self.ids[i], "plcyNm": self.name(i)}
+        for f in CODE_FIELDS:
+            out[f] = self.values(f, i)
+        return out
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def fetch_text(self, ids: Iterable[int], columns: Sequence[str] = ("plcyExplnCn", "plcySprtCn")) -> Dict[int, Dict[str, str]]:
+        """긴 본문은 필요할 때 id 로 DB 에서 가져온다."""
+        cols = [c for c in columns if c in LONG_TEXT_COLUMNS]
+        ids = [int(x) for x in ids]
+        if not cols or not ids or self._connect is None:
+            return {}
+        sql = "SELECT id, {} FROM policies WHERE id IN ({})".format(
+            ", ".join(cols), ", ".join(["%s"] * len(ids))
+        )
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(sql, ids)
+            return {int(r["id"]): {c: r.get(c) or "" for c in cols} for r in cur.fetchall()}
+
+
+def load_store(connect: Callable[[], Any]) -> PolicyStore:
+    sql = "SELECT {} FROM policies ORDER BY id".format(", ".join(STORE_COLUMNS))
+    # 서버 측 커서: 행을 받는 대로 컬럼 배열에 적재 (결과 전체를 dict 목록으로 들고 있지 않는다)
+    with connect() as conn, stream_cursor(conn) as cur:
+        cur.execute(sql)
+        store = PolicyStore.from_rows(cur)
+    store._connect = connect
+    return store
+
+
+def iter_text_docs(store: PolicyStore, text_rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    TextIndex 빌드용 문서를 store 위치 순서대로 생성한다.
+    긴 본문 행(text_rows, id 오름차순)은 흘려보내기만 하고 보관하지 않는다.
+    """
+    rows = iter(text_rows)
+    cur = next(rows, None)
+    for i in range(len(store)):
+        pid = store.ids[i]
+        while cur is not None and int(cur.get("id") or 0) < pid:
+            cur = next(rows, None)
+        doc = {"plcyNm": store.name(i), "plcyKywdNm": store.values("plcyKywdNm", i)}
+        if cur is not None and int(cur.get("id") or 0) == pid:
+            doc["plcySprtCn"] = cur.get("plcySprtCn") or ""
+            doc["plcyExplnCn"] = cur.get("plcyExplnCn") or ""
+        yield doc
@@ -1,29 +1,77 @@
 import sys
 import os
+import re
+import json
+import time
+import hashlib
+import logging
+import argparse
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+
+from corpus_version import CACHE_ROOT
+from kv_cache import KVCache
 
 load_dotenv()
 
-def main():
-    input_text = sys.stdin.read().strip()
-    if not input_text:
-        print("요약할 정책 정보가 없습니다.", flush=True)
-        return
+logger = logging.getLogger("policy-summary")
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("OPENAI_API_KEY가 설정되지 않았습니다.", flush=True)
-        sys.exit(1)
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+# 프롬프트/출력 형식을 바꾸면 올린다 (기존 캐시 항목은 키가 달라져 다시 생성된다)
+SUMMARY_PROMPT_VERSION = 1
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", os.path.join(CACHE_ROOT, "summaries.sqlite"))
+SUMMARY_CACHE_MAX = int(os.getenv("SUMMARY_CACHE_MAX", "100000"))
+
+# 일괄 생성: 호출 하나에 정책 몇 개, 동시에 몇 호출
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "5"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+_LLM = None
+_CACHE = None
+
+def get_llm():
+    # 상주 워커에서는 클라이언트를 한 번만 만들어 재사용한다.
+    # langchain 은 여기서 처음 import (캐시 hit 만으로 끝나는 요청은 import 비용을 내지 않는다)
+    global _LLM
+    if _LLM is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
+        from langchain_openai import ChatOpenAI
+        _LLM = ChatOpenAI(
+            model=SUMMARY_MODEL,
+            temperature=0.2,
+            openai_api_key=api_key,
+        )
+    return _LLM
+
+def get_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = KVCache(SUMMARY_CACHE_PATH, SUMMARY_CACHE_MAX)
+    return _CACHE
+
+def build_input_text(row):
+    # controllers/policyController.js getSummary 의 inputText 와 같은 형식이어야 캐시가 맞는다
+    # (JS 템플릿 문자열은 null 을 "null" 로 찍는다)
+    def v(key):
+        val = row.get(key)
+        return "null" if val is None else str(val)
+    return f"정책명: {v('plcyNm')}\n설명: {v('plcyExplnCn')}\n지원내용: {v('plcySprtCn')}\n방법: {v('plcyAplyMthdCn')}...".strip()
+
+def cache_key(policy_id, input_text):
+    # 정책 id + 원문 해시: 정책 내용이 바뀌면 새 키
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{SUMMARY_MODEL}\x00{SUMMARY_PROMPT_VERSION}\x00".encode("utf-8"))
+    h.update(input_text.encode("utf-8"))
+    return f"{policy_id or 0}:{h.hexdigest()}"
 
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.2,
-        openai_api_key=api_key,
-    )
+def human_message(text):
+    from langchain_core.messages import HumanMessage
+    return HumanMessage(content=text)
 
-    prompt = f"""
+def build_prompt(input_text):
+    return f"""
 다음은 청년 정책 원문 정보이다.
 
 이를 바탕으로 사용자가 한눈에 이해할 수 있도록
@@ -38,9 +86,199 @@ def main():
 {input_text}
 """.strip()
 
+def build_batch_prompt(items):
+    # items: [(id, 원문), ...] → 정책별 요약을 JSON 배열로
+    docs = "\n\n".join(f"[정책 id={pid}]\n{text}" for pid, text in items)
+    return f"""
+다음은 청년 정책 원문 정보 {len(items)}건이다.
+
+각 정책을 사용자가 한눈에 이해할 수 있도록
+아래 형식으로 요약하라.
+
+- 정책 요약 (3줄 이내)
+- 이런 사람에게 추천
+- 핵심 포인트 3가지
+- 주의할 점 (있다면)
+
+반드시 JSON 배열만 반환: 각 요소는 {{"id": number, "summary": string}} (summary 는 위 형식의 텍스트).
+
+{docs}
+""".strip()
+
+def summarize(input_text, policy_id=None):
+    """캐시에 있으면 조회만, 없으면 생성 후 저장."""
+    key = cache_key(policy_id, input_text)
+    try:
+        hit = get_cache().get(key)
+    except Exception as e:  # 캐시 문제로 요약이 막히면 안 된다
+        logger.warning("summary cache read failed: %s", e)
+        hit = None
+    if hit is not None:
+        return hit.decode("utf-8")
+
+    result = get_llm().invoke([human_message(build_prompt(input_text))])
+    summary = result.content.strip()
+    try:
+        get_cache().put(key, summary.encode("utf-8"))
+    except Exception as e:
+        logger.warning("summary cache write failed: %s", e)
+    return summary
+
+def stream_summary(input_text, policy_id=None):
+    """
+    요약을 토큰 조각 단위로 내보내는 제너레이터.
+    캐시 hit 이면 전체를 한 조각으로, miss 면 llm.stream 조각을 오는 대로 내보내고 끝나면 캐시에 저장.
+    """
+    key = cache_key(policy_id, input_text)
+    try:
+        hit = get_cache().get(key)
+    except Exception as e:
+        logger.warning("summary cache read failed: %s", e)
+        hit = None
+    if hit is not None:
+        yield hit.decode("utf-8")
+        return
+
+    t0 = time.perf_counter()
+    parts = []
+    for chunk in get_llm().stream([human_message(build_prompt(input_text))]):
+        delta = chunk.content or ""
+        if not delta:
+            continue
+        if not parts:
+            logger.info("summary 첫 토큰: %.0fms (id=%s)", (time.perf_counter() - t0) * 1000, policy_id)
+            delta = delta.lstrip()
+        parts.append(delta)
+        yield delta
+    logger.info("summary 완료: %.0fms, %d조각 (id=%s)", (time.perf_counter() - t0) * 1000, len(parts), policy_id)
+
+    summary = "".join(parts).strip()
+    if summary:
+        try:
+            get_cache().put(key, summary.encode("utf-8"))
+        except Exception as e:
+            logger.warning("summary cache write failed: %s", e)
+
+def write_stream_frames(input_text, policy_id=None, out=sys.stdout):
+    # --stream: 한 줄 = 한 프레임 (NDJSON) → Node 쪽은 줄 단위로 바로 전달할 수 있다
+    #   {"delta": "..."} ... {"done": true}  /  실패 시 {"error": "..."}
+    try:
+        for delta in stream_summary(input_text, policy_id):
+            out.write(json.dumps({"delta": delta}, ensure_ascii=False) + "\n")
+            out.flush()
+    except Exception as e:
+        out.write(json.dumps({"error": f"요약 생성 오류: {e}"}, ensure_ascii=False) + "\n")
+        out.flush()
+        return False
+    out.write(json.dumps({"done": True}) + "\n")
+    out.flush()
+    return True
+
+# --------------------------
+# 수집 후 일괄 생성
+# --------------------------
+def _parse_batch(txt, ids):
+    txt = re.sub(r"^```(?:json)?\n?|```$", "", (txt or "").strip()).strip()
+    arr = json.loads(txt)
+    out = {}
+    for obj in arr:
+        pid = int(obj.get("id"))
+        summary = (obj.get("summary") or "").strip()
+        if pid in ids and summary:
+            out[pid] = summary
+    return out
+
+async def _summarize_batch(llm, sem, items, retries=2):
+    import asyncio
+    ids = {pid for pid, _ in items}
+    last_exc = None
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(0.7 * attempt)
+        try:
+            async with sem:
+                resp = await llm.ainvoke([human_message(build_batch_prompt(items))])
+            return _parse_batch(resp.content, ids)
+        except Exception as e:
+            last_exc = e
+    raise last_exc
+
+async def pregenerate(rows, batch_size=SUMMARY_BATCH_SIZE, concurrency=SUMMARY_CONCURRENCY):
+    """
+    rows(id + 원문 컬럼) 중 캐시에 없는(새/변경) 정책만 요약한다.
+    batch_size 개씩 한 호출로 묶고, 최대 concurrency 호출을 동시에 보낸다.
+    """
+    import asyncio
+    cache = get_cache()
+    todo = {}
+    for row in rows:
+        pid = int(row["id"])
+        text = build_input_text(row)
+        todo[cache_key(pid, text)] = (pid, text)
+    hits = cache.get_many(list(todo))
+    todo = {k: v for k, v in todo.items() if k not in hits}
+    stats = {"total": len(hits) + len(todo), "cached": len(hits), "generated": 0, "failed": 0}
+    if not todo:
+        return stats
+
+    key_of = {pid: k for k, (pid, _) in todo.items()}
+    items = list(todo.values())
+    llm = get_llm()
+    sem = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.ensure_future(_summarize_batch(llm, sem, items[i:i + batch_size]))
+        for i in range(0, len(items), batch_size)
+    ]
+    for fut in asyncio.as_completed(tasks):
+        try:
+            done = await fut
+        except Exception as e:
+            logger.warning("summary batch 실패: %s", e)
+            continue
+        cache.put_many((key_of[pid], s.encode("utf-8")) for pid, s in done.items())
+        stats["generated"] += len(done)
+    stats["failed"] = len(todo) - stats["generated"]
+    return stats
+
+def load_summary_rows():
+    # 긴 본문 컬럼이라 서버 측 커서로 한 행씩 흘려보낸다 (pregenerate 가 키만 만들고 버린다)
+    from search import connect
+    from db_pool import stream_cursor
+    with connect() as conn, stream_cursor(conn) as cursor:
+        cursor.execute("SELECT id, plcyNm, plcyExplnCn, plcySprtCn, plcyAplyMthdCn FROM policies ORDER BY id")
+        yield from cursor
+
+def main():
+    parser = argparse.ArgumentParser(description="정책 요약 (stdin 원문 → stdout 요약)")
+    parser.add_argument("--id", type=int, default=None, help="정책 id (요약 캐시 키)")
+    parser.add_argument("--stream", action="store_true", help="토큰이 오는 대로 NDJSON 프레임으로 출력")
+    parser.add_argument("--pregenerate", action="store_true", help="DB 의 새/변경 정책 요약을 미리 만든다")
+    parser.add_argument("--batch-size", type=int, default=SUMMARY_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=SUMMARY_CONCURRENCY)
+    ns = parser.parse_args()
+
+    if ns.pregenerate:
+        import asyncio
+        logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+        t0 = time.perf_counter()
+        stats = asyncio.run(pregenerate(load_summary_rows(), ns.batch_size, ns.concurrency))
+        logger.info("요약 일괄 생성: %s, %.1fs", json.dumps(stats), time.perf_counter() - t0)
+        return
+
+    input_text = sys.stdin.read().strip()
+    if not input_text:
+        print("요약할 정책 정보가 없습니다.", flush=True)
+        return
+
+    if ns.stream:
+        logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+        if not write_stream_frames(input_text, ns.id):
+            sys.exit(1)
+        return
+
+    # 캐시 hit 은 API 키 없이도 돌려준다 (miss 면 get_llm 이 키 없음 오류를 낸다)
     try:
-        result = llm.invoke([HumanMessage(content=prompt)])
-        print(result.content.strip(), flush=True)
+        print(summarize(input_text, ns.id), flush=True)
     except Exception as e:
         print(f"요약 생성 오류: {e}", flush=True)
         sys.exit(1)
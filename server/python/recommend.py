@@ -9,21 +9,40 @@ import time
 import math
 import logging
 import hashlib
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
-import pymysql
 from dotenv import load_dotenv
 
-# --- LangChain / Pydantic ---
 try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 후보 스코어링은 정책별 루프로 동작
+    np = None
+
+# --- LangChain / Pydantic / pymysql: 처음 쓰는 함수 안에서 import ---
+# (langchain_openai 만 2초 가까이 걸린다. 하드 필터/로컬 대체/스냅샷 빌드 경로와
+#  이 모듈을 import 하는 다른 스크립트는 LLM 을 안 쓰므로 그 비용을 내지 않는다)
+# asyncio/tiktoken 도 LLM 호출 경로에서만 쓴다
+if TYPE_CHECKING:
+    import asyncio
     from langchain_openai import ChatOpenAI
-except Exception:
-    from langchain.chat_models import ChatOpenAI
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from pydantic import BaseModel, ValidationError, Field
+from corpus_version import CACHE_ROOT, current_generation
+from db_pool import ConnectionPool, stream_cursor
+from embedding_backends import get_embedding_backend, is_local_model
+from embedding_store import EmbeddingStore, content_hash
+from keyword_matcher import KeywordMatcher
+from kv_cache import KVCache
+from policy_snapshot import load_snapshot, write_snapshot
+from region_index import KOR_SIDO_CODE, get_region_index, normalize_policy_region_list, normalize_user_region_list
+from vector_index import PolicyVectorIndex
 
 # --------------------------
 # 초기화 / 로깅
@@ -31,12 +50,16 @@ from pydantic import BaseModel, ValidationError, Field
 load_dotenv()
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-    format="[%(asctime)s] %(levelname)s %(name)s: %(message)s",
-)
 logger = logging.getLogger("policy-reco")
 
+def setup_logging() -> None:
+    # CLI 진입점에서만 호출 (import 하는 쪽의 로깅 설정을 덮어쓰지 않도록)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=getattr(logging, LOG_LEVEL, logging.INFO),
+            format="[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+        )
+
 # --------------------------
 # Config
 # --------------------------
@@ -45,25 +68,56 @@ class AppConfig:
     openai_api_key: str = os.environ.get("OPENAI_API_KEY", "")
     llm_model: str = os.environ.get("LLM_MODEL", "gpt-4o")
 
-    # --- Vector Search (Embeddings + FAISS) ---
+    # --- Vector Search (Embeddings + 전역 색인) ---
     embedding_model: str = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
-    vector_top_m: int = int(os.environ.get("VECTOR_TOP_M", "200"))  # Hard filter 후 FAISS로 Top-M
-    faiss_cache_dir: str = os.environ.get("FAISS_CACHE_DIR", ".faiss_cache")  # 인덱스 캐시 경로
+    vector_top_m: int = int(os.environ.get("VECTOR_TOP_M", "200"))  # Hard filter 후 임베딩 유사도 Top-M
+    faiss_cache_dir: str = os.environ.get("FAISS_CACHE_DIR", ".faiss_cache")  # 색인 파일 경로
+
+    # --- 질의(user_preference) 임베딩 캐시 ---
+    query_cache_path: str = os.environ.get("QUERY_CACHE_PATH", os.path.join(CACHE_ROOT, "query_embeddings.sqlite"))
+    query_cache_max: int = int(os.environ.get("QUERY_CACHE_MAX", "5000"))
+    query_cache_ttl_s: int = int(os.environ.get("QUERY_CACHE_TTL_S", str(30 * 24 * 3600)))
+    query_warm_file: str = os.environ.get("QUERY_WARM_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_queries.txt"))
+
+    # --- policy_type 캐시 (정책 본문 해시 단위) ---
+    policy_type_cache_path: str = os.environ.get("POLICY_TYPE_CACHE_PATH", os.path.join(CACHE_ROOT, "policy_types.sqlite"))
+    policy_type_cache_max: int = int(os.environ.get("POLICY_TYPE_CACHE_MAX", "50000"))
+
+    # --- 전처리 정책 스냅샷 (0 이면 매 실행 MySQL SQL 프리필터) ---
+    policy_snapshot: bool = os.environ.get("POLICY_SNAPSHOT", "1") not in ("0", "false", "False")
+    policy_snapshot_path: str = os.environ.get("POLICY_SNAPSHOT_PATH", os.path.join(CACHE_ROOT, "policies.snapshot"))
+    # CLI: 서로 의존하지 않는 I/O(사용자/정책/질의 임베딩/색인)를 동시에 시작 (0 이면 순차)
+    concurrent_stages: bool = os.environ.get("CONCURRENT_STAGES", "1") not in ("0", "false", "False")
+    # --batch: 스코어링 프로세스 수 / 동시에 진행하는 사용자별 LLM 호출 수
+    batch_workers: int = int(os.environ.get("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    batch_llm_concurrency: int = int(os.environ.get("BATCH_LLM_CONCURRENCY", "8"))
 
     db_host: str = os.environ.get("DB_HOST", "")
     db_user: str = os.environ.get("DB_USER", "")
     db_password: str = os.environ.get("DB_PASSWORD", "")
     db_name: str = os.environ.get("DB_NAME", "")
     db_charset: str = "utf8mb4"
+    db_pool_size: int = int(os.environ.get("DB_POOL_SIZE", "4"))  # 보관할 유휴 연결 수 (0 이면 매번 새 연결)
 
     top_n_view: int = int(os.environ.get("TOP_N_VIEW", "40"))
+    # 선택 프롬프트(system + 사용자 정보 + 후보 표) 입력 토큰 상한: 넘으면 top_n_view 를 줄인다 (0 이면 끔)
+    prompt_token_budget: int = int(os.environ.get("PROMPT_TOKEN_BUDGET", "6000"))
     select_k: int = int(os.environ.get("SELECT_K", "5"))
 
-    llm_timeout_s: int = int(os.environ.get("LLM_TIMEOUT_S", "30"))"
+    llm_timeout_s: int = int(os.environ.get("LLM_TIMEOUT_S", "30"))
     llm_retries: int = int(os.environ.get("LLM_RETRIES", "2"))
 
     reason_chunk_size: int = int(os.environ.get("REASON_CHUNK_SIZE", "20"))
     reason_max_tokens: int = int(os.environ.get("REASON_MAX_TOKENS", "800"))
+    reason_concurrency: int = int(os.environ.get("REASON_CONCURRENCY", "4"))  # 동시에 보내는 이유 생성 chunk 수
+    # 1 이면 선택과 이유를 LLM 한 번의 호출로 받는다 (실패 시 선택 → 이유 2회 호출)
+    llm_single_call: bool = os.environ.get("LLM_SINGLE_CALL", "0") in ("1", "true", "True")
+
+    # --- LLM 응답 캐시 (선택 결과 + 정책별 이유) ---
+    llm_cache: bool = os.environ.get("LLM_CACHE", "1") not in ("0", "false", "False")
+    llm_cache_path: str = os.environ.get("LLM_CACHE_PATH", os.path.join(CACHE_ROOT, "llm_cache.sqlite"))
+    llm_cache_max: int = int(os.environ.get("LLM_CACHE_MAX", "20000"))
+    llm_cache_ttl_s: int = int(os.environ.get("LLM_CACHE_TTL_S", str(24 * 3600)))
 
     region_bonus_exact: float = float(os.environ.get("REGION_BONUS_EXACT", "6.0"))
     region_bonus_partial: float = float(os.environ.get("REGION_BONUS_PARTIAL", "4.0"))
@@ -81,7 +135,7 @@ class AppConfig:
     pref_weight_default: float = float(os.environ.get("PREF_WEIGHT_DEFAULT", "1.5"))
     pref_weight_with_intent: float = float(os.environ.get("PREF_WEIGHT_WITH_INTENT", "2.8"))
 
-    intent_match_bonus: float = float(os.environ.get("INTENT_MATCH_BONUS, "10.0"))
+    intent_match_bonus: float = float(os.environ.get("INTENT_MATCH_BONUS", "10.0"))
     intent_mismatch_bonus: float = float(os.environ.get("INTENT_MISMATCH_BONUS", "-4.0"))
     kw_scale_intent_match: float = float(os.environ.get("KW_SCALE_INTENT_MATCH", "1.0"))
     kw_scale_intent_mismatch: float = float(os.environ.get("KW_SCALE_INTENT_MISMATCH", "0.25"))
@@ -92,11 +146,24 @@ CFG = AppConfig()
 # --------------------------
 # DB 유틸
 # --------------------------
+_DB_POOL: Optional[ConnectionPool] = None
+_DB_POOL_LOCK = threading.Lock()
+
 class MySQL:
     def __init__(self, cfg: AppConfig):
         self.cfg = cfg
 
     def connect(self):
+        """풀에서 연결 하나를 빌린다 (with 블록이 끝나면 반납). 풀은 프로세스에 하나."""
+        global _DB_POOL
+        if _DB_POOL is None:
+            with _DB_POOL_LOCK:
+                if _DB_POOL is None:
+                    _DB_POOL = ConnectionPool(self.new_connection, self.cfg.db_pool_size)
+        return _DB_POOL.connection()
+
+    def new_connection(self):
+        import pymysql
         return pymysql.connect(
             host=self.cfg.db_host,
             user=self.cfg.db_user,
@@ -107,6 +174,9 @@ class MySQL:
             autocommit=True,
         )
 
+def db_pool_stats() -> Optional[Dict[str, Any]]:
+    return _DB_POOL.stats() if _DB_POOL is not None else None
+
 def _to_int(x, default=0) -> int:
     try:
         if x in (None, ""):
@@ -126,139 +196,99 @@ def split_field(val: Any) -> List[str]:
 # --------------------------
 # 지역 정규화/매칭
 # --------------------------
-KOR_SIDO_CODE = {
-    "11": "서울", "26": "부산", "27": "대구", "28": "인천", "29": "광주", "30": "대전", "31": "울산",
-    "36": "세종",
-    "41": "경기", "42": "강원", "43": "충북", "44": "충남",
-    "45": "전북", "46": "전남",
-    "47": "경북", "48": "경남",
-    "50": "제주",
-}
-
-def normalize_user_region_list(region_list: List[str]) -> List[str]:
-    tokens: List[str] = []
-    for r in region_list or []:
-        rr = (r or "").strip()
-        if not rr:
-            continue
-        parts = [p.strip() for p in rr.split() if p.strip()]
-        tokens.append(rr)
-        tokens.extend(parts)
-
-        for p in parts:
-            if p.endswith("도") and len(p) >= 2:
-                tokens.append(p[:-1])
-            if p.endswith("특별시") or p.endswith("광역시") or p.endswith("자치시") or p.endswith("자치도"):
-                tokens.append(
-                    p.replace("특별시", "").replace("광역시", "").replace("자치시", "").replace("자치도", "")
-                )
-
-    seen = set()
-    out: List[str] = []
-    for t in tokens:
-        if t not in seen:
-            out.append(t)
-            seen.add(t)
-    return out
-
-def normalize_policy_region_list(policy_list: List[str]) -> List[str]:
-    out: List[str] = []
-    for x in policy_list or []:
-        s = (x or "").strip()
-        if not s:
-            continue
-        if s.isdigit() and s in KOR_SIDO_CODE:
-            out.append(KOR_SIDO_CODE[s])
-        out.append(s)
-        if s.endswith("도") and len(s) >= 2:
-            out.append(s[:-1])
-
-    seen = set()
-    uniq: List[str] = []
-    for t in out:
-        if t not in seen:
-            uniq.append(t)
-            seen.add(t)
-    return uniq
-
 def region_match(policy_regions: List[str], user_regions: List[str]) -> bool:
-    if not policy_regions:
-        return True
-    if not user_regions:
-        return True
-
-    pr = normalize_policy_region_list(policy_regions)
-    ur = normalize_user_region_list(user_regions)
-
-    for p in pr:
-        for u in ur:
-            if p and u and (p in u or u in p):
-                return True
-    return False
+    return region_match_strength(policy_regions, user_regions) != "mismatch"
 
 def region_match_strength(policy_regions: List[str], user_regions: List[str]) -> str:
-    if not policy_regions:
-        return "nationwide"
-    if not user_regions:
-        return "unknown"
-
-    pr = normalize_policy_region_list(policy_regions)
-    ur = normalize_user_region_list(user_regions)
-
-    if set(pr) & set(ur):
-        return "exact"
-
-    for p in pr:
-        for u in ur:
-            if p and u and (p in u or u in p):
-                return "partial"
-
-    return "mismatch"
+    # 시도/시군구 계층 색인 (region_index.py) 으로 비트 연산 매칭
+    return get_region_index().strength(policy_regions, user_regions)
 
 # --------------------------
 # Intent / Policy type (룰 기반)
 # --------------------------
 INTENT_LABELS = ["employment", "housing", "startup", "finance", "tax", "education", "other"]
 
+# 라벨별 키워드 (앞에 있는 라벨이 우선)
+INTENT_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("employment", ["취업", "일자리", "채용", "구직", "면접", "인턴", "고용", "재직", "취업지원"]),
+    ("housing", ["주거", "월세", "전세", "임대", "주택", "보증금", "청년주택"]),
+    ("startup", ["창업", "스타트업", "사업화", "창업지원", "보육", "액셀러"]),
+    ("finance", ["대출", "보증", "융자", "금리", "이자", "자금", "한도", "상환"]),
+    ("tax", ["세금", "세액", "공제", "감면", "연말정산", "과세"]),
+    ("education", ["교육", "훈련", "과정", "강의", "캠프", "프로그램", "멘토링"]),
+]
+
+POLICY_TYPE_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("employment", ["취업", "일자리", "채용", "구직", "면접", "인턴", "직업", "고용", "재직", "취업지원"]),
+    ("housing", ["주거", "월세", "전세", "임대", "주택", "기숙사", "보증금", "청년주택"]),
+    ("startup", ["창업", "스타트업", "사업화", "보육", "액셀러", "입주", "창업공간"]),
+    ("finance", ["대출", "보증", "융자", "금리", "이자", "자금", "한도", "상환"]),
+    ("tax", ["세금", "세액", "공제", "감면", "소득공제", "연말정산"]),
+    ("education", ["교육", "훈련", "과정", "강의", "캠프", "프로그램", "멘토링", "컨설팅"]),
+]
+
+# 키워드 표 → 단일 패스 매처 (keyword_matcher.py)
+INTENT_MATCHER = KeywordMatcher(INTENT_KEYWORDS)
+POLICY_TYPE_MATCHER = KeywordMatcher(POLICY_TYPE_KEYWORDS)
+
 def detect_intent(preference: str) -> Optional[str]:
-    t = (preference or "").lower()
-
-    if any(k in t for k in ["취업", "일자리", "채용", "구직", "면접", "인턴", "고용", "재직", "취업지원"]):
-        return "employment"
-    if any(k in t for k in ["주거", "월세", "전세", "임대", "주택", "보증금", "청년주택"]):
-        return "housing"
-    if any(k in t for k in ["창업", "스타트업", "사업화", "창업지원", "보육", "액셀러"]):
-        return "startup"
-    if any(k in t for k in ["대출", "보증", "융자", "금리", "이자", "자금", "한도", "상환"]):
-        return "finance"
-    if any(k in t for k in ["세금", "세액", "공제", "감면", "연말정산", "과세"]):
-        return "tax"
-    if any(k in t for k in ["교육", "훈련", "과정", "강의", "캠프", "프로그램", "멘토링"]):
-        return "education"
-    return None
+    return INTENT_MATCHER.classify(preference)
+
+def _policy_type_text(p: Dict[str, Any]) -> str:
+    return f"{p.get('plcyNm','')} {p.get('plcySprtCn','')} {p.get('plcyExplnCn','')}"
 
 def classify_policy_type(p: Dict[str, Any]) -> str:
-    text = f"{p.get('plcyNm','')} {p.get('plcySprtCn','')} {p.get('plcyExplnCn','')}".lower()
+    return POLICY_TYPE_MATCHER.classify(_policy_type_text(p), "other")
 
-    if any(k in text for k in ["취업", "일자리", "채용", "구직", "면접", "인턴", "직업", "고용", "재직", "취업지원"]):
-        return "employment"
-    if any(k in text for k in ["주거", "월세", "전세", "임대", "주택", "기숙사", "보증금", "청년주택"]):
-        return "housing"
-    if any(k in text for k in ["창업", "스타트업", "사업화", "보육", "액셀러", "입주", "창업공간"]):
-        return "startup"
-    if any(k in text for k in ["대출", "보증", "융자", "금리", "이자", "자금", "한도", "상환"]):
-        return "finance"
-    if any(k in text for k in ["세금", "세액", "공제", "감면", "소득공제", "연말정산"]):
-        return "tax"
-    if any(k in text for k in ["교육", "훈련", "과정", "강의", "캠프", "프로그램", "멘토링", "컨설팅"]):
-        return "education"
+# --------------------------
+# policy_type 영속 캐시 (정책 버전 단위)
+# --------------------------
+# 키 = 키워드 표 fingerprint + 분류 대상 텍스트 해시
+# → 정책 본문이 바뀌거나 키워드 표가 바뀌면 자연히 새 키가 되고, 같은 버전은 다시 분류하지 않는다
+_POLICY_TYPE_CACHE: Optional[KVCache] = None
 
-    return "other"
+def policy_type_cache(cfg: AppConfig) -> KVCache:
+    global _POLICY_TYPE_CACHE
+    if _POLICY_TYPE_CACHE is None:
+        _POLICY_TYPE_CACHE = KVCache(cfg.policy_type_cache_path, cfg.policy_type_cache_max)
+    return _POLICY_TYPE_CACHE
+
+def _policy_type_key(p: Dict[str, Any]) -> str:
+    return f"{POLICY_TYPE_MATCHER.fingerprint}:{content_hash(_policy_type_text(p)).hex()}"
+
+def assign_policy_types(cfg: AppConfig, policies: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    policies 에 policy_type 을 채운다. 캐시에 있는 버전은 조회만, 나머지만 분류 후 저장.
+    반환: {"cached", "classified"}
+    """
+    keys = [_policy_type_key(p) for p in policies]
+    try:
+        cache = policy_type_cache(cfg)
+        hits = cache.get_many(keys)
+    except Exception as e:  # 캐시 파일 문제로 추천이 막히면 안 된다
+        logger.warning("policy_type cache unavailable: %s", e)
+        cache, hits = None, {}
+
+    fresh: Dict[str, bytes] = {}
+    for p, key in zip(policies, keys):
+        hit = hits.get(key)
+        if hit is not None:
+            p["policy_type"] = hit.decode("utf-8")
+        else:
+            p["policy_type"] = classify_policy_type(p)
+            fresh[key] = p["policy_type"].encode("utf-8")
+
+    if cache is not None and fresh:
+        try:
+            cache.put_many(fresh.items())
+        except Exception as e:
+            logger.warning("policy_type cache write failed: %s", e)
+    return {"cached": len(policies) - len(fresh), "classified": len(fresh)}
 
 # --------------------------
 # 정책/유저 로드
 # --------------------------
-def preprocess_policy_row(policy: Dict[str, Any]) -> Dict[str, Any]:
+def preprocess_policy_row(policy: Dict[str, Any], with_type: bool = True) -> Dict[str, Any]:
     for key in ["zipCd", "mrgSttsCd", "schoolCd", "jobCd", "plcyMajorCd", "sbizCd", "plcyKywdNm"]:
         policy[key] = split_field(policy.get(key))
 
@@ -276,17 +306,62 @@ def preprocess_policy_row(policy: Dict[str, Any]) -> Dict[str, Any]:
     if min_age == 0 and max_age == 0:
         policy["sprtTrgtAgeLmtYn"] = "N"
 
-    # ✅ policy_type 추가
-    policy["policy_type"] = classify_policy_type(policy)
+    # ✅ policy_type 추가 (DB 로더는 with_type=False 후 assign_policy_types 로 한 번에 채운다)
+    if with_type:
+        policy["policy_type"] = classify_policy_type(policy)
     return policy
 
 def load_policies_from_db(cfg: AppConfig) -> List[Dict[str, Any]]:
+    # 서버 측 커서: 행을 받는 대로 전처리 (전체 결과를 먼저 메모리에 쌓지 않는다)
     db = MySQL(cfg)
-    with db.connect() as conn, conn.cursor() as cur:
+    with db.connect() as conn, stream_cursor(conn) as cur:
         cur.execute("SELECT * FROM policies")
-        rows = cur.fetchall()
-    policies = [preprocess_policy_row(r) for r in rows]
-    logger.info("policies loaded: %d", len(policies))
+        policies = [preprocess_policy_row(r, with_type=False) for r in cur]
+    types = assign_policy_types(cfg, policies)
+    logger.info("policies loaded: %d (policy_type cached=%d classified=%d)", len(policies), types["cached"], types["classified"])
+    return policies
+
+# --------------------------
+# 전처리 스냅샷 (policy_snapshot.py)
+# --------------------------
+# 추천 파이프라인이 읽지 않는 긴 본문 컬럼은 스냅샷에 넣지 않는다
+SNAPSHOT_EXCLUDE_COLUMNS = (
+    "plcyAplyMthdCn", "srngMthdCn", "sbmsnDcmntCn", "etcMttrCn", "addAplyQlfcCndCn", "ptcpPrpTrgtCn",
+)
+# preprocess_policy_row 규칙을 바꾸면 올린다 (기존 스냅샷 무효화)
+PREPROCESS_VERSION = 1
+
+def snapshot_schema() -> str:
+    return f"preprocess-v{PREPROCESS_VERSION}:{POLICY_TYPE_MATCHER.fingerprint}"
+
+def build_policy_snapshot(cfg: AppConfig) -> Dict[str, Any]:
+    """전체 정책을 DB 에서 읽어 스냅샷을 새로 쓴다. 반환: 스냅샷 헤더(컬럼 목록 제외)"""
+    generation = current_generation()  # DB 조회 전에 읽는다 (도중에 세대가 바뀌면 다음 로드에서 stale)
+    policies = load_policies_from_db(cfg)
+    header = write_snapshot(cfg.policy_snapshot_path, policies, generation, snapshot_schema(), SNAPSHOT_EXCLUDE_COLUMNS)
+    return {k: v for k, v in header.items() if k != "columns"}
+
+def load_policies(cfg: AppConfig) -> List[Dict[str, Any]]:
+    """
+    전처리된 전체 정책 목록.
+    - 현재 세대/전처리 규칙과 맞는 스냅샷이 있으면 그것만 읽는다 (DB 접속 없음)
+    - 없거나 오래됐으면 MySQL 에서 읽고 스냅샷을 다시 쓴다
+    """
+    if not cfg.policy_snapshot:
+        return load_policies_from_db(cfg)
+    generation = current_generation()
+    t0 = time.perf_counter()
+    policies = load_snapshot(cfg.policy_snapshot_path, generation, snapshot_schema())
+    if policies is not None:
+        logger.info("policies loaded (snapshot gen=%s): %d, %.1fms", generation, len(policies), (time.perf_counter() - t0) * 1000)
+        return policies
+
+    policies = load_policies_from_db(cfg)
+    try:
+        write_snapshot(cfg.policy_snapshot_path, policies, generation, snapshot_schema(), SNAPSHOT_EXCLUDE_COLUMNS)
+        logger.info("policy snapshot written (gen=%s): %s", generation, cfg.policy_snapshot_path)
+    except Exception as e:  # 스냅샷은 캐시일 뿐: 실패해도 추천은 계속
+        logger.warning("policy snapshot write failed: %s", e)
     return policies
 
 def load_policies_from_db_sql_prefilter(cfg: AppConfig, user: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -337,11 +412,10 @@ def load_policies_from_db_sql_prefilter(cfg: AppConfig, user: Dict[str, Any]) ->
         sql += " WHERE " + " AND ".join(where)
 
     db = MySQL(cfg)
-    with db.connect() as conn, conn.cursor() as cur:
+    with db.connect() as conn, stream_cursor(conn) as cur:
         cur.execute(sql, tuple(params))
-        rows = cur.fetchall()
-
-    policies = [preprocess_policy_row(r) for r in rows]
+        policies = [preprocess_policy_row(r, with_type=False) for r in cur]
+    assign_policy_types(cfg, policies)
     logger.info("policies loaded (sql prefilter): %d", len(policies))
     return policies
 
@@ -354,7 +428,22 @@ def load_user_from_db(cfg: AppConfig, user_id: str) -> Dict[str, Any]:
 
     if not user:
         raise ValueError(f"사용자 {user_id}를 찾을 수 없습니다.")
+    return user_profile_from_row(user)
 
+def load_users_from_db(cfg: AppConfig, user_ids: List[str], chunk: int = 500) -> Dict[str, Dict[str, Any]]:
+    """여러 사용자를 IN 절 묶음으로 조회 → {소문자 email: profile}. 없는 사용자는 결과에서 빠진다."""
+    user_ids = list(dict.fromkeys(user_ids))
+    out: Dict[str, Dict[str, Any]] = {}
+    db = MySQL(cfg)
+    with db.connect() as conn, conn.cursor() as cur:
+        for s in range(0, len(user_ids), chunk):
+            part = user_ids[s:s + chunk]
+            cur.execute(f"SELECT * FROM users WHERE email IN ({', '.join(['%s'] * len(part))})", part)
+            for user in cur.fetchall():
+                out[str(user["email"]).lower()] = user_profile_from_row(user)
+    return out
+
+def user_profile_from_row(user: Dict[str, Any]) -> Dict[str, Any]:
     location = (user.get("location") or "").strip()
     marital = (user.get("maritalStatus") or "").strip()
     education = (user.get("education") or "").strip()
@@ -404,7 +493,82 @@ def _multi_field_match(policy_list: List[str], user_list: List[str]) -> bool:
     sb = set(user_list)
     return any(p in sb for p in policy_list)
 
-def filter_policies(policies: List[Dict[str, Any]], user: Dict[str, Any]) -> List[Dict[str, Any]]:
+class PolicyFilterIndex:
+    """
+    filter_policies(strict hard filter) 용 사전 계산 배열.
+    정책 목록당 한 번 만들고, 사용자 프로필 하나는 벡터 연산 몇 번으로 거른다.
+    - 나이/소득: 하한·상한·조건 여부를 int64/bool 배열로 (_to_int 기본값까지 미리 반영)
+    - 지역: zipCd 조합 그룹별로 region_match 를 사용자 지역당 한 번만 계산
+    """
+
+    _INT_CLAMP = 1 << 62
+
+    def __init__(self, policies: List[Dict[str, Any]]):
+        self.policies = policies
+        n = len(policies)
+
+        def ints(key: str, default: int) -> "np.ndarray":
+            c = self._INT_CLAMP
+            return np.fromiter(
+                (max(-c, min(c, _to_int(p.get(key), default))) for p in policies), dtype=np.int64, count=n
+            )
+
+        self.age_check = np.fromiter((p.get("sprtTrgtAgeLmtYn", "N") != "N" for p in policies), dtype=bool, count=n)
+        self.age_min = ints("sprtTrgtMinAge", 0)
+        self.age_max = ints("sprtTrgtMaxAge", 200)
+        self.age_open = (self.age_min == 0) & (self.age_max == 0)
+
+        self.income_check = np.fromiter(
+            ((p.get("earnCndSeCd") or "무관").strip() not in ("무관", "제한없음", "") for p in policies),
+            dtype=bool, count=n,
+        )
+        self.income_min = ints("earnMinAmt", 0)
+        self.income_max = ints("earnMaxAmt", int(1e9))
+
+        groups: Dict[Tuple[str, ...], int] = {}
+        self.region_group = np.fromiter(
+            (groups.setdefault(tuple(p.get("zipCd", []) or ()), len(groups)) for p in policies), dtype=np.int32, count=n
+        )
+        self.region_groups: List[List[str]] = [list(g) for g in groups]
+        self._region_cache: Dict[Tuple[str, ...], "np.ndarray"] = {}
+        self._lock = threading.Lock()
+
+    def _clamp(self, x: int) -> int:
+        return max(-self._INT_CLAMP, min(self._INT_CLAMP, x))
+
+    def region_ok(self, user_regions: List[str]) -> "np.ndarray":
+        key = tuple(user_regions or ())
+        with self._lock:
+            hit = self._region_cache.get(key)
+        if hit is None:
+            hit = np.fromiter(
+                (region_match(g, list(key)) for g in self.region_groups), dtype=bool, count=len(self.region_groups)
+            )
+            with self._lock:
+                if len(self._region_cache) > 256:
+                    self._region_cache.clear()
+                self._region_cache[key] = hit
+        return hit[self.region_group]
+
+    def mask(self, user: Dict[str, Any]) -> "np.ndarray":
+        keep = self.region_ok(user.get("region", []))
+
+        ua = _to_int(user.get("age"), 0)
+        if ua:
+            ua = self._clamp(ua)
+            keep &= ~self.age_check | self.age_open | ((self.age_min <= ua) & (ua <= self.age_max))
+
+        ui = _to_int(user.get("income"), 0)
+        if ui:
+            ui = self._clamp(ui)
+            keep &= ~self.income_check | ((self.income_min <= ui) & (ui <= self.income_max))
+        return keep
+
+    def filter(self, user: Dict[str, Any]) -> List[Dict[str, Any]]:
+        policies = self.policies
+        return [policies[i] for i in np.flatnonzero(self.mask(user)).tolist()]
+
+def _filter_policies_loop(policies: List[Dict[str, Any]], user: Dict[str, Any]) -> List[Dict[str, Any]]:
     result = []
     for p in policies:
         # 1) age (불가능하면 탈락)
@@ -431,7 +595,21 @@ def filter_policies(policies: List[Dict[str, Any]], user: Dict[str, Any]) -> Lis
 
         # ✅ marriage/school/job/major/sbiz 는 하드필터에서 제거 (A)
         result.append(p)
+    return result
 
+def filter_policies(
+    policies: List[Dict[str, Any]],
+    user: Dict[str, Any],
+    index: Optional[PolicyFilterIndex] = None,
+) -> List[Dict[str, Any]]:
+    """
+    strict hard filter (나이/지역/소득). 불가능한 정책만 탈락.
+    - index: 같은 policies 로 만든 PolicyFilterIndex(워커 캐시)가 있으면 벡터 연산으로 거른다
+    """
+    if index is not None and index.policies is policies:
+        result = index.filter(user)
+    else:
+        result = _filter_policies_loop(policies, user)
     logger.info("filtered policies(strict): %d -> %d", len(policies), len(result))
     return result
 
@@ -485,6 +663,98 @@ def summarize_for_llm(p: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]
         },
     }
 
+# --------------------------
+# LLM 프롬프트용 후보 표 (compact)
+# --------------------------
+# summarize_for_llm 의 JSON 을 그대로 보내면 키 이름, 중첩 matches, 행마다 반복되는 사용자 값에
+# 본문 240자 x 2 가 후보 수만큼 들어간다 → 헤더 한 줄 + 정책당 한 줄(| 구분)로 보낸다.
+CANDIDATE_TABLE_HEADER = "id|type|name|cat|method|region|age|income|kw|support|desc"
+CANDIDATE_TABLE_LEGEND = (
+    f"후보 표 형식: 첫 줄 헤더({CANDIDATE_TABLE_HEADER}), 이후 한 줄에 정책 하나(| 구분).\n"
+    "- type: emp=취업 house=주거 start=창업 fin=금융 tax=세금 edu=교육 etc=기타\n"
+    "- region: 지역 일치도 E=exact P=partial N=nationwide U=unknown M=mismatch (: 뒤는 정책 지역)\n"
+    "- age: 지원 연령(최소-최대), - 는 제한 없음 / income: 소득 조건(구분:최소-최대), - 는 무관\n"
+    "- kw: 사용자 관심 키워드와 겹치는 정책 키워드 (많을수록 keyword_overlap 이 높음)\n"
+)
+
+_TYPE_ABBR = {
+    "employment": "emp", "housing": "house", "startup": "start",
+    "finance": "fin", "tax": "tax", "education": "edu", "other": "etc",
+}
+_REGION_ABBR = {"exact": "E", "partial": "P", "nationwide": "N", "unknown": "U", "mismatch": "M"}
+
+COMPACT_NAME_CHARS = 60
+COMPACT_SUPPORT_CHARS = 100
+COMPACT_DESC_CHARS = 60
+
+_CELL_WS = re.compile(r"[\s|]+")
+
+def _cell(v: Any, limit: int = 0) -> str:
+    s = _CELL_WS.sub(" ", str(v or "")).strip()
+    return s[:limit].rstrip() if limit else s
+
+def type_abbr(policy_type: Optional[str]) -> str:
+    return _TYPE_ABBR.get(policy_type or "other", "etc")
+
+def _compact_row(summary: Dict[str, Any]) -> str:
+    m = summary.get("matches", {})
+    region = _REGION_ABBR.get(m.get("region_strength"), "U")
+    if m.get("region_hint"):
+        region += ":" + ",".join(_cell(h) for h in m["region_hint"])
+    age = m.get("age", {})
+    age_cell = "-" if age.get("limit", "N") == "N" or not (age.get("min") or age.get("max")) else f"{age.get('min', 0)}-{age.get('max', 0)}"
+    income = m.get("income", {})
+    income_type = _cell(income.get("type"))
+    if income_type in ("", "무관") and not (income.get("min") or income.get("max")):
+        income_cell = "-"
+    else:
+        income_cell = f"{income_type}:{income.get('min', 0)}-{income.get('max', 0)}"
+    return "|".join([
+        str(summary.get("id", -1)),
+        type_abbr(summary.get("policy_type")),
+        _cell(summary.get("name"), COMPACT_NAME_CHARS),
+        "/".join(_cell(c) for c in summary.get("category", []) if c),
+        _cell(summary.get("method")),
+        region,
+        age_cell,
+        income_cell,
+        ",".join(_cell(k) for k in m.get("keywords", [])),
+        _cell(summary.get("support"), COMPACT_SUPPORT_CHARS),
+        _cell(summary.get("desc"), COMPACT_DESC_CHARS),
+    ])
+
+def encode_candidates(summaries: List[Dict[str, Any]]) -> str:
+    """summarize_for_llm 목록 → 헤더 + 정책당 한 줄 표."""
+    return "\n".join([CANDIDATE_TABLE_HEADER] + [_compact_row(s) for s in summaries])
+
+_TOKEN_ENCODERS: Dict[str, Any] = {}
+
+def _token_encoder(model: str):
+    if model not in _TOKEN_ENCODERS:
+        try:
+            import tiktoken
+        except ImportError:  # tiktoken 이 없으면 토큰 수는 글자 수로 추정
+            _TOKEN_ENCODERS[model] = None
+            return None
+        try:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+        except Exception as e:  # BPE 파일을 못 받으면(오프라인 등) 추정치 사용
+            logger.info("tiktoken 사용 불가(%s) → 글자 수로 토큰 추정", type(e).__name__)
+            enc = None
+        _TOKEN_ENCODERS[model] = enc
+    return _TOKEN_ENCODERS[model]
+
+def estimate_tokens(cfg: AppConfig, text: str) -> int:
+    enc = _token_encoder(cfg.llm_model)
+    if enc is not None:
+        return len(enc.encode(text))
+    # 대략: 영문/숫자/기호 4자에 1토큰, 한글 등은 3자에 2토큰
+    n_ascii = sum(1 for ch in text if ord(ch) < 128)
+    return n_ascii // 4 + (len(text) - n_ascii) * 2 // 3 + 1
+
 def _tokenize_korean(s: str) -> List[str]:
     return [t for t in re.split(r"[^\w가-힣]+", (s or "").lower()) if t]
 
@@ -550,7 +820,7 @@ def deterministic_shuffle(items: List[Any], seed: int) -> None:
         j = rand() % (i + 1)
         items[i], items[j] = items[j], items[i]
 
-def build_candidate_view(
+def _build_candidate_view_legacy(
     policies: List[Dict[str, Any]],
     user: Dict[str, Any],
     user_preference: str,
@@ -590,7 +860,271 @@ def build_candidate_view(
 
 
 # --------------------------
-# Vector Search (Embeddings + FAISS)
+# 배치 스코어링 (build_candidate_view)
+# --------------------------
+_TYPE_CODE = {label: i for i, label in enumerate(INTENT_LABELS)}
+_REGION_STRENGTHS = ("exact", "partial", "nationwide", "unknown", "mismatch")
+_REGION_CODE = {s: i for i, s in enumerate(_REGION_STRENGTHS)}
+
+def _lcg_stream(seed: int, count: int) -> "np.ndarray":
+    """deterministic_shuffle 의 LCG 난수열 x_1..x_count 를 점프(2배씩)로 한 번에 계산."""
+    a, c, m = 1103515245, 12345, 2**31
+    out = np.empty(count, dtype=np.uint64)
+    if count == 0:
+        return out
+    out[0] = (a * (seed % m) + c) % m
+    filled, jump_a, jump_c = 1, a, c  # x_{k+filled} = jump_a * x_k + jump_c
+    while filled < count:
+        step = min(filled, count - filled)
+        out[filled:filled + step] = (np.uint64(jump_a) * out[:step] + np.uint64(jump_c)) % np.uint64(m)
+        filled += step
+        jump_a, jump_c = (jump_a * jump_a) % m, (jump_a * jump_c + jump_c) % m
+    return out
+
+def deterministic_shuffle_order(n: int, seed: int) -> List[int]:
+    """deterministic_shuffle(list(range(n)), seed) 와 같은 순열."""
+    order = list(range(n))
+    if n < 2:
+        return order
+    i_arr = np.arange(n - 1, 0, -1, dtype=np.uint64)
+    j_arr = (_lcg_stream(seed, n - 1) % (i_arr + np.uint64(1))).tolist()
+    for i, j in zip(range(n - 1, 0, -1), j_arr):
+        order[i], order[j] = order[j], order[i]
+    return order
+
+def _stable_top(scores: "np.ndarray", positions: "np.ndarray", k: int) -> "np.ndarray":
+    """
+    positions 중 점수 상위 k 개를 (점수 내림차순, 원래 위치 오름차순)으로.
+    list.sort(reverse=True) 의 안정 정렬과 같은 순서. k 경계의 동점은 위치가 앞선 쪽.
+    """
+    if k <= 0 or not len(positions):
+        return positions[:0]
+    s = scores[positions]
+    if k < len(positions):
+        kth = -np.partition(-s, k - 1)[k - 1]
+        keep = s >= kth
+        positions, s = positions[keep], s[keep]
+    order = np.lexsort((positions, -s))
+    return positions[order[:k]]
+
+class CandidateFeatures:
+    """
+    build_candidate_view / pre_score 용 정책별 사전 계산 배열.
+    코퍼스(또는 후보 풀) 단위로 한 번 만들어 두고 사용자마다 벡터 연산으로 점수를 낸다.
+    - policy_type id, 지원내용/설명 길이(요약과 같은 240자 기준)
+    - 지역: zipCd 조합을 그룹으로 묶어 사용자별로 그룹당 한 번만 region_match_strength
+    - 관심 키워드: 어휘 id 의 CSR 배열 → 사용자 키워드 마스크로 겹침 수 계산
+    - 선호 토큰 부분문자열: 정책명/지원내용/설명(소문자)을 이어 붙인 blob 에서 토큰별로 한 번 찾고 캐시
+    """
+
+    _TOKEN_CACHE_MAX = 2048
+
+    def __init__(self, policies: List[Dict[str, Any]]):
+        n = len(policies)
+        self.ids = np.fromiter((int(p.get("id") or -1) for p in policies), dtype=np.int64, count=n)
+        self._row = {int(pid): r for r, pid in enumerate(self.ids.tolist())}
+
+        self.type_code = np.fromiter(
+            (_TYPE_CODE.get(p.get("policy_type", "other"), -1) for p in policies), dtype=np.int8, count=n
+        )
+        self.support_len = np.fromiter((len((p.get("plcySprtCn") or "")[:240]) for p in policies), dtype=np.int32, count=n)
+        self.desc_len = np.fromiter((len((p.get("plcyExplnCn") or "")[:240]) for p in policies), dtype=np.int32, count=n)
+
+        groups: Dict[Tuple[str, ...], int] = {}
+        self.region_group = np.fromiter(
+            (groups.setdefault(tuple(p.get("zipCd", []) or ()), len(groups)) for p in policies), dtype=np.int32, count=n
+        )
+        self.region_groups: List[List[str]] = [list(g) for g in groups]
+        self._region_cache: Dict[Tuple[str, ...], "np.ndarray"] = {}
+
+        vocab: Dict[str, int] = {}
+        codes: List[int] = []
+        offsets = [0]
+        for p in policies:
+            for k in p.get("plcyKywdNm", []) or []:
+                codes.append(vocab.setdefault(k, len(vocab)))
+            offsets.append(len(codes))
+        self.kw_vocab: List[str] = list(vocab)
+        self.kw_vocab_lower: List[str] = [k.lower() for k in self.kw_vocab]
+        self.kw_codes = np.asarray(codes, dtype=np.int32)
+        self.kw_offsets = np.asarray(offsets, dtype=np.int64)
+        self.kw_row = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.kw_offsets))
+
+        bases = [
+            f"{(p.get('plcyNm') or '')[:120]}\x00{(p.get('plcySprtCn') or '')[:240]}\x00{(p.get('plcyExplnCn') or '')[:240]}".lower()
+            for p in policies
+        ]
+        self._blob = "\x01".join(bases)
+        starts, pos = [], 0
+        for b in bases:
+            starts.append(pos)
+            pos += len(b) + 1
+        self._starts = starts
+        self._token_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_for(self, policies: List[Dict[str, Any]]) -> Optional["np.ndarray"]:
+        rows = [self._row.get(int(p.get("id") or -1)) for p in policies]
+        if any(r is None for r in rows):
+            return None
+        return np.asarray(rows, dtype=np.int64)
+
+    def region_strength(self, user_regions: List[str]) -> "np.ndarray":
+        """그룹별 지역 강도 코드 (_REGION_STRENGTHS 인덱스)."""
+        key = tuple(user_regions or ())
+        with self._lock:
+            hit = self._region_cache.get(key)
+        if hit is None:
+            hit = np.fromiter(
+                (_REGION_CODE[region_match_strength(g, list(key))] for g in self.region_groups),
+                dtype=np.int8, count=len(self.region_groups),
+            )
+            with self._lock:
+                if len(self._region_cache) > 256:
+                    self._region_cache.clear()
+                self._region_cache[key] = hit
+        return hit[self.region_group]
+
+    def token_hits(self, token: str) -> "np.ndarray":
+        """정책명/지원내용/설명(소문자)에 token 이 들어 있는 행."""
+        with self._lock:
+            hit = self._token_cache.get(token)
+            if hit is not None:
+                self._token_cache.move_to_end(token)
+                return hit
+        hit = np.zeros(len(self), dtype=bool)
+        blob, starts, n = self._blob, self._starts, len(self)
+        pos = blob.find(token)
+        while pos >= 0:
+            r = bisect_right(starts, pos) - 1
+            hit[r] = True
+            if r + 1 >= n:
+                break
+            pos = blob.find(token, starts[r + 1])
+        with self._lock:
+            self._token_cache[token] = hit
+            if len(self._token_cache) > self._TOKEN_CACHE_MAX:
+                self._token_cache.popitem(last=False)
+        return hit
+
+    def score(
+        self,
+        cfg: AppConfig,
+        rows: "np.ndarray",
+        user: Dict[str, Any],
+        pref_tokens: List[str],
+        intent: Optional[str],
+    ) -> "np.ndarray":
+        """summarize_for_llm + pre_score 와 같은 점수 (같은 연산 순서라 float 값도 같다)."""
+        n = len(self)
+        region = self.region_strength(user.get("region", []))[rows]
+
+        # 관심 키워드 겹침: _intersect(policy_kw, user_kw) 의 길이와 앞 5개
+        user_kw = user.get("interest_keywords", []) or []
+        if user_kw and len(self.kw_codes):
+            sb = set(user_kw)
+            vocab_mask = np.fromiter((k in sb for k in self.kw_vocab), dtype=bool, count=len(self.kw_vocab))
+            matched = vocab_mask[self.kw_codes]
+            overlap_all = np.bincount(self.kw_row[matched], minlength=n)
+        else:
+            matched = None
+            overlap_all = np.zeros(n, dtype=np.int64)
+        overlap = overlap_all[rows]
+
+        # 선호 토큰 적중 수 (중복 토큰은 중복으로 센다)
+        pref_hit = np.zeros(len(rows), dtype=np.int64)
+        top5 = None
+        if matched is not None and pref_tokens:
+            # 행별로 매칭된 키워드 중 앞 5개만 요약 텍스트에 들어간다
+            csum = np.cumsum(matched)
+            before = np.concatenate(([0], csum))[self.kw_offsets[:-1]]
+            rank_in_row = csum - before[self.kw_row]
+            top5 = matched & (rank_in_row <= 5)
+        for t in pref_tokens:
+            if not t:
+                continue
+            hit = self.token_hits(t)
+            if top5 is not None:
+                contains = np.fromiter((t in k for k in self.kw_vocab_lower), dtype=bool, count=len(self.kw_vocab))
+                sel = top5 & contains[self.kw_codes]
+                if sel.any():
+                    hit = hit.copy()
+                    hit[self.kw_row[sel]] = True
+            pref_hit += hit[rows]
+
+        region_bonus = np.asarray([
+            cfg.region_bonus_exact, cfg.region_bonus_partial, cfg.region_bonus_nationwide,
+            cfg.region_bonus_unknown, cfg.region_bonus_mismatch,
+        ], dtype=np.float64)[region]
+
+        kw_bonus = np.minimum(overlap, cfg.kw_bonus_cap) * cfg.kw_bonus_per_overlap
+        short = (self.support_len[rows] < cfg.support_short_len) & (self.desc_len[rows] < cfg.desc_short_len)
+        length_penalty = np.where(short, cfg.length_penalty_short, 0.0)
+
+        if intent:
+            same = self.type_code[rows] == _TYPE_CODE.get(intent, -2)
+            intent_bonus = np.where(same, cfg.intent_match_bonus, cfg.intent_mismatch_bonus)
+            kw_bonus = kw_bonus * np.where(same, cfg.kw_scale_intent_match, cfg.kw_scale_intent_mismatch)
+            pref_weight = cfg.pref_weight_with_intent
+        else:
+            intent_bonus = np.zeros(len(rows), dtype=np.float64)
+            pref_weight = cfg.pref_weight_default
+
+        return (pref_hit * pref_weight) + region_bonus + kw_bonus + length_penalty + intent_bonus
+
+def build_candidate_view(
+    policies: List[Dict[str, Any]],
+    user: Dict[str, Any],
+    user_preference: str,
+    top_n_view: int,
+    seed: int,
+    features: Optional[CandidateFeatures] = None,
+) -> List[Dict[str, Any]]:
+    """
+    후보 풀 → LLM 에 보여줄 top_n_view 개 요약.
+    점수는 CandidateFeatures 로 한 번에 계산하고, 요약(summarize_for_llm)은 뽑힌 정책만 만든다.
+    결과(선택/순서)는 정책마다 요약 + pre_score 후 전체 정렬하던 방식과 같다.
+    - features: 코퍼스 단위 사전 계산(워커 캐시). 없거나 풀의 정책이 빠져 있으면 풀로 새로 만든다.
+    """
+    if np is None:
+        return _build_candidate_view_legacy(policies, user, user_preference, top_n_view, seed)
+
+    rows = features.rows_for(policies) if features is not None else None
+    if rows is None:
+        features = CandidateFeatures(policies)
+        rows = np.arange(len(policies), dtype=np.int64)
+
+    pref_tokens = _tokenize_korean(user_preference)
+    intent = detect_intent(user_preference)
+    scores = features.score(CFG, rows, user, pref_tokens, intent)
+    positions = np.arange(len(policies), dtype=np.int64)
+
+    if intent:
+        is_same = features.type_code[rows] == _TYPE_CODE[intent]
+        min_intent = max(3, int(top_n_view * 0.6))
+        picked = _stable_top(scores, positions[is_same], min_intent).tolist()
+
+        remain = top_n_view - len(picked)
+        # 셔플 결과가 전체 순서에 의존하므로 나머지는 전부 정렬한다
+        other = _stable_top(scores, positions[~is_same], len(positions)).tolist()
+        order = deterministic_shuffle_order(len(other), seed ^ 0xA5A5A5A5)
+        picked += [other[i] for i in order[:max(0, remain)]]
+    else:
+        keep_main = int(math.ceil(top_n_view * 0.7))
+        top = _stable_top(scores, positions, keep_main + 120).tolist()
+        main, rest_pool = top[:keep_main], top[keep_main:keep_main + 120]
+        order = deterministic_shuffle_order(len(rest_pool), seed ^ 0xA5A5A5A5)
+        picked = main + [rest_pool[i] for i in order[:max(0, top_n_view - keep_main)]]
+
+    view = [summarize_for_llm(policies[i], user) for i in picked]
+    deterministic_shuffle(view, seed)
+    return view
+
+# --------------------------
+# Vector Search (전역 임베딩 색인)
 # --------------------------
 def _policy_text_for_embedding(p: Dict[str, Any]) -> str:
     """
@@ -622,133 +1156,207 @@ def _policy_text_for_embedding(p: Dict[str, Any]) -> str:
         f"지역: {region}\n"
     ).strip()
 
-def _policies_fingerprint(policies: List[Dict[str, Any]]) -> str:
+def embedding_backend(cfg: AppConfig):
+    # EMBEDDING_MODEL: OpenAI 모델 이름 또는 local-ngram[-차원] (오프라인 로컬 백엔드)
+    return get_embedding_backend(cfg.embedding_model, cfg.openai_api_key, cfg.faiss_cache_dir)
+
+_QUERY_CACHE: Optional[KVCache] = None
+
+def query_embedding_cache(cfg: AppConfig) -> KVCache:
+    global _QUERY_CACHE
+    if _QUERY_CACHE is None:
+        _QUERY_CACHE = KVCache(cfg.query_cache_path, cfg.query_cache_max, cfg.query_cache_ttl_s)
+    return _QUERY_CACHE
+
+def normalize_query(query: str) -> str:
+    # 공백/유니코드 정규화만 한다 (의미가 바뀌는 변환은 하지 않음)
+    return " ".join(unicodedata.normalize("NFC", query or "").split())
+
+def _query_cache_key(backend, norm: str) -> str:
+    return f"{backend.model_id}\x00{norm}"
+
+def embed_query_cached(cfg: AppConfig, query: str) -> List[float]:
+    """같은 (정규화된 질의, 모델)은 임베딩 API 를 다시 부르지 않는다."""
+    backend = embedding_backend(cfg)
+    norm = normalize_query(query)
+    key = _query_cache_key(backend, norm)
+    cache = query_embedding_cache(cfg)
+    # 캐시는 최선 노력: 조회 실패는 miss, 저장 실패는 로그만 (다른 프로세스가 파일을 잡고 있어도 추천은 계속)
+    try:
+        hit = cache.get(key)
+    except Exception as e:
+        logger.warning("query cache read failed: %s", e)
+        hit = None
+    if hit is not None:
+        return array("f", hit).tolist()
+    vec = backend.embed_query(norm)
+    try:
+        cache.put(key, array("f", vec).tobytes())
+    except Exception as e:
+        logger.warning("query cache write failed: %s", e)
+    return vec
+
+def embed_queries_cached(cfg: AppConfig, queries: List[str]) -> Dict[str, List[float]]:
     """
-    인덱스 캐시 무효화용 fingerprint.
-    DB에 updated_at이 있으면 그걸 쓰는 게 더 좋지만,
-    여기선 id + 주요 텍스트 해시로 안정적으로 만들자.
+    여러 질의를 한 번에: 캐시에 없는 것만 embed_documents 한 번으로 임베딩 (warm_query_cache 와 같은 방식).
+    반환 키는 원래 질의 문자열. 빈 질의는 빠진다.
     """
-    h = hashlib.sha256()
-    for p in sorted(policies, key=lambda x: int(x.get("id") or 0)):
-        pid = str(int(p.get("id") or 0)).encode("utf-8")
-        h.update(pid)
-        h.update(((p.get("plcyNm") or "")[:80]).encode("utf-8"))
-        h.update(((p.get("plcySprtCn") or "")[:120]).encode("utf-8"))
-        h.update(((p.get("plcyExplnCn") or "")[:120]).encode("utf-8"))
-    return h.hexdigest()[:16]
-
-def vector_top_m_with_faiss(
+    backend = embedding_backend(cfg)
+    norms = {q: normalize_query(q) for q in queries if q and q.strip()}
+    keys = {norm: _query_cache_key(backend, norm) for norm in set(norms.values())}
+    cache = query_embedding_cache(cfg)
+    try:
+        hits = cache.get_many(list(keys.values()))
+    except Exception as e:
+        logger.warning("query cache read failed: %s", e)
+        hits = {}
+    vecs = {norm: array("f", hits[key]).tolist() for norm, key in keys.items() if key in hits}
+    todo = [norm for norm in keys if norm not in vecs]
+    if todo:
+        fresh = backend.embed_documents(todo)
+        try:
+            cache.put_many((keys[norm], array("f", v).tobytes()) for norm, v in zip(todo, fresh))
+        except Exception as e:
+            logger.warning("query cache write failed: %s", e)
+        # float32 로 맞춘다 (캐시 hit 으로 읽은 값과 같게)
+        vecs.update((norm, array("f", v).tolist()) for norm, v in zip(todo, fresh))
+    logger.info("query embeddings: %d unique, %d cached, %d embedded", len(keys), len(keys) - len(todo), len(todo))
+    return {q: vecs[norm] for q, norm in norms.items()}
+
+def warm_query_cache(cfg: AppConfig, queries: List[str]) -> int:
+    """자주 쓰이는 질의 목록을 미리 임베딩해 둔다. 새로 임베딩한 개수를 돌려준다."""
+    backend = embedding_backend(cfg)
+    if backend.model_id is None:  # 아직 학습 전인 로컬 백엔드
+        return 0
+    cache = query_embedding_cache(cfg)
+    todo: Dict[str, str] = {}
+    for q in queries:
+        norm = normalize_query(q)
+        key = _query_cache_key(backend, norm)
+        if norm and key not in todo and cache.get(key) is None:
+            todo[key] = norm
+    if not todo:
+        return 0
+    vecs = backend.embed_documents(list(todo.values()))
+    cache.put_many((k, array("f", v).tobytes()) for k, v in zip(todo.keys(), vecs))
+    return len(todo)
+
+def read_warm_queries(path: str) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+    except FileNotFoundError:
+        return []
+
+def _embedding_store_dir(cfg: AppConfig) -> str:
+    slug = re.sub(r"[^0-9A-Za-z._-]+", "_", cfg.embedding_model)
+    return os.path.join(cfg.faiss_cache_dir, f"embeddings_{slug}")
+
+def vector_store_is_current(cfg: AppConfig) -> bool:
+    """임베딩 저장소가 현재 세대/모델 그대로라 load_vector_index 가 임베딩 없이 열기만 하는지."""
+    try:
+        store = EmbeddingStore(_embedding_store_dir(cfg))
+        return store.generation == current_generation() and store.manifest.get("model") == embedding_backend(cfg).model_id
+    except Exception:
+        return False
+
+def load_vector_index(
     cfg: AppConfig,
+    policies: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[PolicyVectorIndex]:
+    """
+    전체 코퍼스 임베딩 색인. 벡터는 정책 id + 텍스트 해시 단위의 증분 저장소(memmap)에 있다.
+    - 저장소가 현재 코퍼스 세대(api_save.js 가 갱신)와 같으면 그대로 연다 (임베딩 없음)
+    - 세대가 바뀌었으면 전체 정책(policies, 없으면 DB)과 비교해 새/변경 정책만 임베딩
+    - 실패 시 None (벡터 단계 생략)
+    """
+    generation = current_generation()
+    try:
+        backend = embedding_backend(cfg)
+        store = EmbeddingStore(_embedding_store_dir(cfg))
+        if store.generation != generation or store.manifest.get("model") != backend.model_id:
+            if policies is None:
+                policies = load_policies(cfg)
+            t0 = time.perf_counter()
+            backend.prepare([_policy_text_for_embedding(p) for p in policies])
+            stats = store.sync(
+                policies, _policy_text_for_embedding, backend.embed_documents,
+                backend.model_id, generation,
+            )
+            logger.info("임베딩 저장소 갱신(gen=%s, %s, %.1fs)", generation, stats, time.perf_counter() - t0)
+        index = PolicyVectorIndex.from_store(store, backend.model_id, generation)
+        logger.info("벡터 색인 준비(gen=%s, n=%d)", generation, len(index))
+        return index
+    except Exception as e:
+        logger.warning("벡터 색인 준비 실패: %s (fallback=로컬 랭킹)", e)
+        return None
+
+def vector_top_m(
+    cfg: AppConfig,
+    index: Optional[PolicyVectorIndex],
     policies: List[Dict[str, Any]],
     query: str,
-    top_m: int
+    top_m: int,
+    query_vec: Optional[List[float]] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Hard filter 통과 정책들 중에서 FAISS(임베딩 유사도)로 Top-M만 추림.
-    - 캐시: policies fingerprint 기반으로 로컬에 저장/재사용
+    Hard filter 통과 정책들 중에서 임베딩 유사도 Top-M만 추림.
+    - 전역 색인에서 policies 의 id 를 허용 목록으로 검색 (질의 임베딩 1회, query_vec 을 주면 그것을 쓴다)
+    - 색인에 없는 정책(세대 갱신 전 추가분)은 뒤에 붙인다
     - 실패 시: 원본 그대로 반환 (서비스 다운 방지)
     """
     if not policies:
         return policies
-    if not query or not query.strip():
-        return policies[:top_m] if len(policies) > top_m else policies
-
-    try:
-        # 지연 import: 환경에 없으면 여기서 바로 예외 나고 fallback 가능
-        from langchain_core.documents import Document
-        from langchain_openai import OpenAIEmbeddings
-        from langchain_community.vectorstores import FAISS
-    except Exception as e:
-        logger.warning("FAISS/Embeddings 모듈 로드 실패: %s (fallback=로컬 랭킹)", e)
+    if index is None or not query or not query.strip():
         return policies[:top_m] if len(policies) > top_m else policies
 
     try:
-        os.makedirs(cfg.faiss_cache_dir, exist_ok=True)
-        fp = _policies_fingerprint(policies)
-        cache_path = os.path.join(cfg.faiss_cache_dir, f"faiss_{fp}")
-        meta_path = os.path.join(cfg.faiss_cache_dir, f"faiss_{fp}.json")
-
-        embeddings = OpenAIEmbeddings(
-            model=cfg.embedding_model,
-            openai_api_key=cfg.openai_api_key,
-        )
-
-        # 캐시 로드 시도
-        vectorstore = None
-        if os.path.isdir(cache_path) and os.path.isfile(meta_path):
-            try:
-                with open(meta_path, "r", encoding="utf-8") as f:
-                    meta = json.load(f)
-                if meta.get("fingerprint") == fp and meta.get("embedding_model") == cfg.embedding_model:
-                    vectorstore = FAISS.load_local(
-                        cache_path, embeddings, allow_dangerous_deserialization=True
-                    )
-                    logger.info("FAISS 캐시 로드 성공(fp=%s, n=%d)", fp, meta.get("count", -1))
-            except Exception as e:
-                logger.warning("FAISS 캐시 로드 실패: %s (재생성)", e)
-                vectorstore = None
-
-        # 없으면 새로 생성
-        if vectorstore is None:
-            docs = []
-            for p in policies:
-                pid = int(p.get("id") or 0)
-                docs.append(
-                    Document(
-                        page_content=_policy_text_for_embedding(p),
-                        metadata={"id": pid},
-                    )
-                )
-            vectorstore = FAISS.from_documents(docs, embeddings)
-
-            # 저장 (다음 실행부터 빠름)
-            try:
-                vectorstore.save_local(cache_path)
-                with open(meta_path, "w", encoding="utf-8") as f:
-                    json.dump(
-                        {"fingerprint": fp, "embedding_model": cfg.embedding_model, "count": len(policies)},
-                        f,
-                        ensure_ascii=False,
-                    )
-                logger.info("FAISS 캐시 저장(fp=%s, n=%d)", fp, len(policies))
-            except Exception as e:
-                logger.warning("FAISS 캐시 저장 실패(무시): %s", e)
-
-        # 검색: Top-M
-        # similarity_search_with_score는 낮을수록 더 유사(거리)일 수도, 점수 정의는 구현에 따라 다름.
-        # 우리는 일단 결과 순서만 믿고 id를 추린다.
-        hits = vectorstore.similarity_search(query, k=min(top_m, len(policies)))
-
-        top_ids = []
-        seen = set()
-        for d in hits:
-            pid = int(d.metadata.get("id") or 0)
-            if pid and pid not in seen:
-                top_ids.append(pid)
-                seen.add(pid)
-
+        if query_vec is None:
+            query_vec = embed_query_cached(cfg, query)
         id2p = {int(p.get("id") or 0): p for p in policies}
-        out = [id2p[i] for i in top_ids if i in id2p]
+        top_ids, missing = index.search(query_vec, id2p.keys(), top_m)
+        if missing:
+            logger.info("벡터 색인에 없는 정책 %d건 (gen=%s)", len(missing), index.generation)
+            top_ids += missing[: max(0, top_m - len(top_ids))]
 
-        # 혹시 hits가 너무 빈약하면(이상 케이스) fallback
+        out = [id2p[i] for i in top_ids if i in id2p]
+        # 혹시 결과가 비었으면(이상 케이스) fallback
         if not out:
             return policies[:top_m] if len(policies) > top_m else policies
-
         return out
 
     except Exception as e:
-        logger.warning("vector_top_m_with_faiss 실패: %s (fallback=원본)", e)
+        logger.warning("vector_top_m 실패: %s (fallback=원본)", e)
         return policies[:top_m] if len(policies) > top_m else policies
 
 
 # --------------------------
 # LLM I/O
 # --------------------------
-class ReasonItemModel(BaseModel):
-    id: int
-    reason: str = Field(min_length=6, max_length=200)
+_REASON_ITEM_MODEL = None
+
+def reason_item_model():
+    """{"id", "reason"} 검증 모델 (pydantic 은 첫 호출 때 import)."""
+    global _REASON_ITEM_MODEL
+    if _REASON_ITEM_MODEL is None:
+        from pydantic import BaseModel, Field
+
+        class ReasonItemModel(BaseModel):
+            id: int
+            reason: str = Field(min_length=6, max_length=200)
+
+        _REASON_ITEM_MODEL = ReasonItemModel
+    return _REASON_ITEM_MODEL
 
-def new_llm(cfg: AppConfig, temperature: float, max_tokens: int) -> ChatOpenAI:
+def llm_messages(system: str, human: str) -> List[Any]:
+    from langchain_core.messages import SystemMessage, HumanMessage
+    return [SystemMessage(content=system), HumanMessage(content=human)]
+
+def new_llm(cfg: AppConfig, temperature: float, max_tokens: int) -> "ChatOpenAI":
+    try:
+        from langchain_openai import ChatOpenAI
+    except Exception:
+        from langchain.chat_models import ChatOpenAI
     try:
         return ChatOpenAI(
             model=cfg.llm_model,
@@ -765,58 +1373,187 @@ def new_llm(cfg: AppConfig, temperature: float, max_tokens: int) -> ChatOpenAI:
             openai_api_key=cfg.openai_api_key,
         )
 
-def select_policy_ids_with_llm(
+def _user_info_for_llm(user_profile: Dict[str, Any], intent: Optional[str]) -> Dict[str, Any]:
+    return {
+        "age": int(user_profile.get("age", 0)),
+        "region": user_profile.get("region", []),
+        "education": user_profile.get("education", []),
+        "job": user_profile.get("job", []),
+        "major": user_profile.get("major", []),
+        "marriage": user_profile.get("marriage", []),
+        "special": user_profile.get("special", []),
+        "income": int(user_profile.get("income", 0)),
+        "interest_keywords": user_profile.get("interest_keywords", []),
+        "intent": intent,
+    }
+
+# --------------------------
+# LLM 응답 캐시 (내용 주소 기반)
+# --------------------------
+# 프롬프트 문구/출력 형식을 바꾸면 올린다 (기존 캐시 항목은 키가 달라져 자연히 버려진다)
+SELECT_PROMPT_VERSION = 2
+REASON_PROMPT_VERSION = 2
+
+_LLM_CACHE: Optional[KVCache] = None
+
+def llm_cache(cfg: AppConfig) -> Optional[KVCache]:
+    global _LLM_CACHE
+    if not cfg.llm_cache:
+        return None
+    if _LLM_CACHE is None:
+        _LLM_CACHE = KVCache(cfg.llm_cache_path, cfg.llm_cache_max, cfg.llm_cache_ttl_s)
+    return _LLM_CACHE
+
+def _digest(*parts: Any) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+def user_feature_signature(user_profile: Dict[str, Any], user_preference: str) -> str:
+    """프롬프트에 들어가는 사용자 특징(프로필 필드 + intent). 같은 프로필이면 사용자가 달라도 같다."""
+    return _digest(_user_info_for_llm(user_profile, detect_intent(user_preference)))[:32]
+
+def _selection_cache_key(
     cfg: AppConfig,
+    mode: str,
     candidates: List[Dict[str, Any]],
     user_profile: Dict[str, Any],
     user_preference: str,
-    k: int
-) -> List[int]:
+    k: int,
+) -> str:
+    # 후보는 id 가 아니라 프롬프트에 들어가는 표 그대로: 수집으로 정책 내용이 바뀌면 다시 고르고,
+    # 바뀐 것이 없으면 세대가 올라가도 재사용
+    return "select:" + _digest(
+        cfg.llm_model, mode, SELECT_PROMPT_VERSION,
+        user_feature_signature(user_profile, user_preference),
+        normalize_query(user_preference), k,
+        encode_candidates(candidates),
+    )
+
+def _reason_cache_key(cfg: AppConfig, summary: Dict[str, Any], user_sig: str, user_preference: str) -> str:
+    # summary = summarize_for_llm(정책, 사용자): LLM 이 그 정책에 대해 보는 내용 그대로
+    # 프롬프트의 "사용자 의도" 는 원문 질의라서 intent 분류가 같아도 질의가 다르면 다른 키
+    return "reason:" + _digest(cfg.llm_model, REASON_PROMPT_VERSION, summary, user_sig, normalize_query(user_preference))
+
+def _llm_cache_get_many(cfg: AppConfig, keys: List[str]) -> Dict[str, Any]:
+    cache = llm_cache(cfg)
+    if cache is None or not keys:
+        return {}
+    try:
+        return {k: json.loads(v) for k, v in cache.get_many(keys).items()}
+    except Exception as e:  # 캐시 문제로 추천이 막히면 안 된다
+        logger.warning("llm cache read failed: %s", e)
+        return {}
+
+def _llm_cache_put_many(cfg: AppConfig, items: Dict[str, Any]) -> None:
+    cache = llm_cache(cfg)
+    if cache is None or not items:
+        return
+    try:
+        cache.put_many((k, json.dumps(v, ensure_ascii=False).encode("utf-8")) for k, v in items.items())
+    except Exception as e:
+        logger.warning("llm cache write failed: %s", e)
+
+def _selection_prompts(
+    candidates: List[Dict[str, Any]],
+    user_profile: Dict[str, Any],
+    user_preference: str,
+    k: int,
+    output_rule: str,
+    task: str,
+) -> Tuple[str, str]:
+    """선택 프롬프트 (system, human). output_rule/task 만 모드별로 다르다."""
     intent = detect_intent(user_preference)
 
     sys_prompt = (
         "역할: 한국 청년정책 추천 편집자.\n"
         "데이터에 있는 정보만 사용.\n"
+        f"{CANDIDATE_TABLE_LEGEND}"
         "우선순위:\n"
-        "1) region_strength가 exact/partial인 것 우선\n"
-        "2) keyword_overlap 높은 것 우선\n"
-        "3) 사용자 추가 희망 조건(user_preference)과 제목/설명/지원내용이 맞는 것\n"
+        "1) region이 E/P인 것 우선\n"
+        "2) kw가 많이 겹치는 것 우선\n"
+        "3) 사용자 추가 희망 조건(user_preference)과 name/desc/support가 맞는 것\n"
         "4) 비슷한 정책만 고르지 말고 성격이 다른 5개로 분산(예: 세금/금융/취업/주거 등)\n"
-        f"사용자 intent: {intent or '없음'}\n"
+        f"사용자 intent: {type_abbr(intent) if intent else '없음'}\n"
         "제약:\n"
-        f"- intent가 있으면, 선택 {k}개 중 최소 3개는 policy_type이 intent와 같아야 한다(가능한 경우).\n"
+        f"- intent가 있으면, 선택 {k}개 중 최소 3개는 type이 intent와 같아야 한다(가능한 경우).\n"
         "- 후보에 없는 id 금지, 중복 금지.\n"
-        f"반드시 순수 JSON 배열만 반환: 정수 id {k}개."
+        f"{output_rule}"
     )
 
-    user_info = {
-        "age": int(user_profile.get("age", 0)),
-        "region": user_profile.get("region", []),
-        "education": user_profile.get("education", []),
-        "job": user_profile.get("job", []),
-        "major": user_profile.get("major", []),
-        "marriage": user_profile.get("marriage", []),
-        "special": user_profile.get("special", []),
-        "income": int(user_profile.get("income", 0)),
-        "interest_keywords": user_profile.get("interest_keywords", []),
-        "intent": intent,
-    }
+    user_info = _user_info_for_llm(user_profile, intent)
 
-    payload = json.dumps(candidates, ensure_ascii=False)
+    payload = encode_candidates(candidates)
     prompt = (
         f"사용자 정보: {json.dumps(user_info, ensure_ascii=False)}\n"
         f"추가 희망 조건(user_preference): {user_preference}\n"
-        f"아래 후보 데이터에서 가장 적합한 정책 {k}개를 고르고, id 배열만 출력하라.\n"
+        f"{task}\n"
         f"{payload}"
     )
+    return sys_prompt, prompt
+
+def log_llm_usage(label: str, resp: Any, prompt_est: int) -> None:
+    """응답의 실제 토큰 사용량(없으면 None)과 보내기 전 추정치를 같이 남긴다."""
+    usage = getattr(resp, "usage_metadata", None) or {}
+    if not usage:
+        tu = (getattr(resp, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {"input_tokens": tu.get("prompt_tokens"), "output_tokens": tu.get("completion_tokens")}
+    logger.info(
+        "%s tokens: prompt=%s completion=%s (est prompt=%d)",
+        label, usage.get("input_tokens"), usage.get("output_tokens"), prompt_est,
+    )
 
-    llm = new_llm(cfg, temperature=0.2, max_tokens=120)
+def fit_view_to_budget(
+    cfg: AppConfig,
+    candidates: List[Dict[str, Any]],
+    user_profile: Dict[str, Any],
+    user_preference: str,
+    k: int,
+) -> int:
+    """
+    선택 프롬프트가 prompt_token_budget 안에 들어가는 후보 수 (최소 k, 최대 len(candidates)).
+    고정 부분(system + 사용자 정보)을 뺀 나머지를 후보 행 평균 토큰으로 나눈다.
+    """
+    if cfg.prompt_token_budget <= 0 or not candidates:
+        return len(candidates)
+    sys_prompt, prompt = _selection_prompts([], user_profile, user_preference, k, output_rule="", task="")
+    fixed = estimate_tokens(cfg, sys_prompt) + estimate_tokens(cfg, prompt)
+    rows = estimate_tokens(cfg, encode_candidates(candidates)) - estimate_tokens(cfg, CANDIDATE_TABLE_HEADER)
+    if fixed + rows <= cfg.prompt_token_budget:
+        return len(candidates)
+    per_row = max(1.0, rows / len(candidates))
+    return max(k, min(len(candidates), int((cfg.prompt_token_budget - fixed) // per_row)))
+
+def select_policy_ids_with_llm(
+    cfg: AppConfig,
+    candidates: List[Dict[str, Any]],
+    user_profile: Dict[str, Any],
+    user_preference: str,
+    k: int
+) -> List[int]:
+    sys_prompt, prompt = _selection_prompts(
+        candidates, user_profile, user_preference, k,
+        output_rule=f"반드시 순수 JSON 배열만 반환: 정수 id {k}개.",
+        task=f"아래 후보 데이터에서 가장 적합한 정책 {k}개를 고르고, id 배열만 출력하라.",
+    )
     valid_ids = {int(s["id"]) for s in candidates}
 
+    cache_key = _selection_cache_key(cfg, "ids", candidates, user_profile, user_preference, k)
+    cached = _llm_cache_get_many(cfg, [cache_key]).get(cache_key)
+    if cached:
+        logger.info("select_policy_ids_with_llm: cache hit")
+        return [int(i) for i in cached if int(i) in valid_ids][:k]
+
+    llm = new_llm(cfg, temperature=0.2, max_tokens=120)
+    prompt_est = estimate_tokens(cfg, sys_prompt) + estimate_tokens(cfg, prompt)
+
     last_exc: Optional[Exception] = None
     for attempt in range(cfg.llm_retries + 1):
         try:
-            resp = llm.invoke([SystemMessage(content=sys_prompt), HumanMessage(content=prompt)])
+            resp = llm.invoke(llm_messages(sys_prompt, prompt))
+            log_llm_usage("select_policy_ids_with_llm", resp, prompt_est)
             txt = (resp.content or "").strip()
             txt = re.sub(r"^```(?:json)?\n?|```$", "", txt).strip()
 
@@ -839,6 +1576,7 @@ def select_policy_ids_with_llm(
 
             if not out:
                 raise ValueError("빈 ID 목록")
+            _llm_cache_put_many(cfg, {cache_key: out})
             return out
 
         except Exception as e:
@@ -850,65 +1588,180 @@ def select_policy_ids_with_llm(
     logger.error("select_policy_ids_with_llm 최종 실패: %s", last_exc)
     return []
 
-def generate_llm_reasons(
+def select_with_reasons_llm(
+    cfg: AppConfig,
+    candidates: List[Dict[str, Any]],
+    user_profile: Dict[str, Any],
+    user_preference: str,
+    k: int
+) -> Optional[List[Tuple[int, str]]]:
+    """
+    선택 + 이유를 한 번의 호출로: [{"id", "reason"}] k개 (reason_item_model 로 검증).
+    응답이 검증을 통과하지 못하면 None → 호출 측이 2회 호출 흐름으로 간다 (재시도 없음).
+    """
+    sys_prompt, prompt = _selection_prompts(
+        candidates, user_profile, user_preference, k,
+        output_rule=(
+            f"반드시 순수 JSON 배열만 반환: 선택한 {k}개 각각 {{\"id\": number, \"reason\": string}}.\n"
+            "reason은 60~110자. 상투어/과장 금지. 사용자 조건(지역/키워드/연령/지원내용) 중 최소 2개를 근거로 써라."
+        ),
+        task=f"아래 후보 데이터에서 가장 적합한 정책 {k}개를 고르고, 각각의 추천 이유와 함께 출력하라.",
+    )
+    valid_ids = {int(s["id"]) for s in candidates}
+
+    cache_key = _selection_cache_key(cfg, "ids+reasons", candidates, user_profile, user_preference, k)
+    cached = _llm_cache_get_many(cfg, [cache_key]).get(cache_key)
+    if cached:
+        logger.info("select_with_reasons_llm: cache hit")
+        return [(int(pid), reason) for pid, reason in cached if int(pid) in valid_ids][:k] or None
+
+    llm = new_llm(cfg, temperature=0.2, max_tokens=cfg.reason_max_tokens)
+    try:
+        resp = llm.invoke(llm_messages(sys_prompt, prompt))
+        log_llm_usage("select_with_reasons_llm", resp, estimate_tokens(cfg, sys_prompt) + estimate_tokens(cfg, prompt))
+        items = _parse_reason_items(resp.content, ordered=True)
+    except Exception as e:
+        logger.warning("select_with_reasons_llm 실패: %s -> 2회 호출로 대체", e)
+        return None
+
+    out: List[Tuple[int, str]] = []
+    seen = set()
+    for pid, reason in items:
+        if pid in valid_ids and pid not in seen:
+            out.append((pid, reason))
+            seen.add(pid)
+        if len(out) >= k:
+            break
+    if not out:
+        logger.warning("select_with_reasons_llm: 유효한 id 없음 -> 2회 호출로 대체")
+        return None
+    _llm_cache_put_many(cfg, {cache_key: out})
+    return out
+
+REASON_SYS_PROMPT = (
+    "역할: 한국 청년정책 추천 에디터. 데이터에 있는 사실만 사용.\n"
+    f"{CANDIDATE_TABLE_LEGEND}"
+    "반드시 JSON 배열만 반환. 각 요소는 {\"id\": number, \"reason\": string}.\n"
+    "reason은 60~110자. 상투어/과장 금지. 사용자 조건(지역/키워드/연령/지원내용) 중 최소 2개를 근거로 써라."
+)
+
+def _parse_reason_items(txt: str, ordered: bool = False):
+    """LLM 응답 → {id: reason} (ordered=True 면 응답 순서대로 [(id, reason)])."""
+    txt = (txt or "").strip()
+    txt = re.sub(r"^```(?:json)?\n?|```$", "", txt).strip()
+    arr = json.loads(txt)
+    if not isinstance(arr, list):
+        raise ValueError("JSON 배열이 아님")
+    model = reason_item_model()
+    validated = [model(**obj) for obj in arr]
+    if ordered:
+        return [(ri.id, ri.reason) for ri in validated]
+    return {ri.id: ri.reason for ri in validated}
+
+async def _areason_chunk(
+    cfg: AppConfig,
+    llm: "ChatOpenAI",
+    sem: "asyncio.Semaphore",
+    chunk: List[Dict[str, Any]],
+    user_info: Dict[str, Any],
+    user_intent: str,
+) -> Dict[int, str]:
+    """chunk 하나의 이유 생성. 재시도 대기는 asyncio.sleep → 다른 chunk 는 그동안 계속 진행."""
+    import asyncio
+    user_prompt = (
+        f"사용자 정보: {json.dumps(user_info, ensure_ascii=False)}\n"
+        f"사용자 의도: {user_intent}\n"
+        f"데이터:\n{encode_candidates(chunk)}\n"
+        "각 정책에 대해 추천 이유를 JSON 배열로 작성하라."
+    )
+    prompt_est = estimate_tokens(cfg, REASON_SYS_PROMPT) + estimate_tokens(cfg, user_prompt)
+    last_exc: Optional[Exception] = None
+    for attempt in range(cfg.llm_retries + 1):
+        if attempt:
+            await asyncio.sleep(0.7 * attempt)
+        try:
+            async with sem:
+                resp = await llm.ainvoke(llm_messages(REASON_SYS_PROMPT, user_prompt))
+            log_llm_usage("generate_llm_reasons", resp, prompt_est)
+            return _parse_reason_items(resp.content)
+        except Exception as e:
+            last_exc = e
+    raise last_exc
+
+async def agenerate_llm_reasons(
     cfg: AppConfig,
     policies: List[Dict[str, Any]],
     user: Dict[str, Any],
     user_intent: str
 ) -> List[Dict[str, Any]]:
+    """
+    reason_chunk_size 단위 chunk 들을 동시에 요청한다 (최대 reason_concurrency 개).
+    끝나는 chunk 부터 policies 의 reason_llm 에 반영, 실패한 chunk 는 로컬 이유가 그대로 남는다.
+    정책별 이유는 (정책 요약 해시, 사용자 특징, 질의) 로 캐시 → 같은 프로필/질의의 다른 사용자도 재사용.
+    """
     if not policies:
         return policies
 
-    llm = new_llm(cfg, temperature=0.3, max_tokens=cfg.reason_max_tokens)
-    sys_prompt = (
-        "역할: 한국 청년정책 추천 에디터. 데이터에 있는 사실만 사용.\n"
-        "반드시 JSON 배열만 반환. 각 요소는 {\"id\": number, \"reason\": string}.\n"
-        "reason은 60~110자. 상투어/과장 금지. 사용자 조건(지역/키워드/연령/지원내용) 중 최소 2개를 근거로 써라."
-    )
+    by_id = {int(p.get("id") or -1): p for p in policies}
+    user_sig = user_feature_signature(user, user_intent)
+    summaries = []
+    keys: Dict[int, str] = {}
+    for p in policies:
+        summary = summarize_for_llm(p, user)
+        keys[summary["id"]] = _reason_cache_key(cfg, summary, user_sig, user_intent)
+        summaries.append(summary)
+    cached = _llm_cache_get_many(cfg, list(keys.values()))
+    for pid, key in keys.items():
+        if key in cached and pid in by_id:
+            by_id[pid]["reason_llm"] = cached[key]
+    summaries = [s for s in summaries if keys[s["id"]] not in cached]
+    if not summaries:
+        logger.info("llm reasons: all %d cached", len(policies))
+        return policies
 
-    summaries = [summarize_for_llm(p, user) for p in policies]
+    import asyncio
+    llm = new_llm(cfg, temperature=0.3, max_tokens=cfg.reason_max_tokens)
+    sem = asyncio.Semaphore(max(1, cfg.reason_concurrency))
+    user_info = _user_info_for_llm(user, detect_intent(user_intent))
 
+    tasks = {}
     for i in range(0, len(summaries), cfg.reason_chunk_size):
         chunk = summaries[i:i + cfg.reason_chunk_size]
-        payload = json.dumps(chunk, ensure_ascii=False)
-
-        user_prompt = (
-            f"사용자 의도: {user_intent}\n"
-            f"데이터: {payload}\n"
-            "각 정책에 대해 추천 이유를 JSON 배열로 작성하라."
-        )
-
-        last_exc: Optional[Exception] = None
-        for attempt in range(cfg.llm_retries + 1):
-            try:
-                resp = llm.invoke([SystemMessage(content=sys_prompt), HumanMessage(content=user_prompt)])
-                txt = (resp.content or "").strip()
-                txt = re.sub(r"^```(?:json)?\n?|```$", "", txt).strip()
-
-                arr = json.loads(txt)
-                validated: List[ReasonItemModel] = [ReasonItemModel(**obj) for obj in arr]
-
-                rid2reason = {ri.id: ri.reason for ri in validated}
-                for p in policies:
-                    pid = int(p.get("id") or -1)
-                    if pid in rid2reason:
-                        p["reason_llm"] = rid2reason[pid]
-                break
-
-            except (json.JSONDecodeError, ValidationError, ValueError) as ve:
-                last_exc = ve
-                time.sleep(0.7 * (attempt + 1))
-                continue
-            except Exception as e:
-                last_exc = e
-                time.sleep(0.7 * (attempt + 1))
+        task = asyncio.ensure_future(_areason_chunk(cfg, llm, sem, chunk, user_info, user_intent))
+        tasks[task] = i
+
+    t0 = time.perf_counter()
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None:
+                logger.warning("generate_llm_reasons chunk 실패 (i=%d): %s", tasks[task], exc)
                 continue
-
-        if last_exc:
-            logger.warning("generate_llm_reasons chunk 실패 (i=%d): %s", i, last_exc)
-
+            fresh = {}
+            for pid, reason in task.result().items():
+                if pid in by_id:
+                    by_id[pid]["reason_llm"] = reason
+                    if pid in keys:
+                        fresh[keys[pid]] = reason
+            _llm_cache_put_many(cfg, fresh)
+    logger.info(
+        "llm reasons: %d cached, %d chunks, %.0fms",
+        len(policies) - len(summaries), len(tasks), (time.perf_counter() - t0) * 1000,
+    )
     return policies
 
+def generate_llm_reasons(
+    cfg: AppConfig,
+    policies: List[Dict[str, Any]],
+    user: Dict[str, Any],
+    user_intent: str
+) -> List[Dict[str, Any]]:
+    # 동기 호출부(CLI, 워커 스레드)용: 스레드마다 이벤트 루프를 새로 돌린다
+    import asyncio
+    return asyncio.run(agenerate_llm_reasons(cfg, policies, user, user_intent))
+
 # --------------------------
 # 프레젠테이션(배지/로컬 이유)
 # --------------------------
@@ -941,65 +1794,474 @@ def build_reason_and_badges(policy: Dict[str, Any], user: Dict[str, Any]) -> Tup
 # --------------------------
 # 메인 파이프라인
 # --------------------------
-def main(argv: List[str]) -> int:
-    if len(argv) < 3:
-        print('사용법: python3 recommend.py <user_id(email)> "<user_preference>"')
-        return 1
-
-    user_id = argv[1]
-    user_preference = argv[2].strip()
-    intent = detect_intent(user_preference)
-
-    if not CFG.openai_api_key:
-        logger.error("OPENAI_API_KEY가 없습니다.")
-        return 2
-
-    user_profile = load_user_from_db(CFG, user_id)
-    policies = load_policies_from_db_sql_prefilter(CFG, user_profile)  # (D)
-    filtered = filter_policies(policies, user_profile)                 # (A: strict only)
+def to_compact(details: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    응답 스키마 축소: policyController.recommend 가 실제로 쓰는 필드만 남긴다.
+    (LONGTEXT 컬럼을 통째로 직렬화/파싱하지 않도록)
+    """
+    return [
+        {
+            "id": int(p.get("id") or -1),
+            "plcyNm": p.get("plcyNm") or "",
+            "reason": p.get("reason"),
+            "badges": p.get("badges") or [],
+        }
+        for p in details
+    ]
+
+def run_recommendation(
+    cfg: AppConfig,
+    user_id: str,
+    user_preference: str,
+    policies: Optional[List[Dict[str, Any]]] = None,
+    vector_index: Optional[PolicyVectorIndex] = None,
+    features: Optional[CandidateFeatures] = None,
+    filter_index: Optional[PolicyFilterIndex] = None,
+) -> List[Dict[str, Any]]:
+    """
+    추천 파이프라인 본체. CLI(main)와 상주 워커(worker.py)가 같이 쓴다.
+    - policies: 이미 전처리된 전체 정책 목록(워커 캐시). 없으면 스냅샷(꺼져 있으면 SQL 프리필터로 DB)에서 로드.
+    - vector_index: 전역 임베딩 색인(워커 캐시). 없으면 세대별 색인 파일을 로드(없으면 생성).
+    - features: 후보 스코어링용 사전 계산(워커 캐시). 없으면 후보 풀로 만든다.
+    - filter_index: policies 로 만든 hard filter 배열(워커 캐시). 없으면 정책별 루프.
+    """
+    user_profile = load_user_from_db(cfg, user_id)
+    if policies is None:
+        if cfg.policy_snapshot:
+            policies = load_policies(cfg)
+        else:
+            policies = load_policies_from_db_sql_prefilter(cfg, user_profile)  # (D)
+    filtered = filter_policies(policies, user_profile, filter_index)       # (A: strict only)
 
     if not filtered:
-        print(json.dumps([], ensure_ascii=False, indent=2))
-        return 0
+        return []
 
-    faiss_pool = vector_top_m_with_faiss(CFG, filtered, user_preference, top_m=CFG.vector_top_m)
-    logger.info("FAISS pool: %d -> %d", len(filtered), len(faiss_pool))
+    if vector_index is None and user_preference.strip():
+        vector_index = load_vector_index(cfg)
+    vector_pool = vector_top_m(cfg, vector_index, filtered, user_preference, top_m=cfg.vector_top_m)
+    logger.info("vector pool: %d -> %d", len(filtered), len(vector_pool))
+    return recommend_from_pool(cfg, user_id, user_preference, user_profile, vector_pool, features)
 
+def recommend_from_pool(
+    cfg: AppConfig,
+    user_id: str,
+    user_preference: str,
+    user_profile: Dict[str, Any],
+    vector_pool: List[Dict[str, Any]],
+    features: Optional[CandidateFeatures] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """벡터 풀 이후 단계: 후보 요약 → LLM 선택 → 이유. run_recommendation/arun_recommendation 공통."""
+    timings = {} if timings is None else timings
+    with stage_timer(timings, "candidates"):
+        candidates = build_llm_candidates(cfg, user_id, user_preference, user_profile, vector_pool, features)
+    return select_and_explain(cfg, user_preference, user_profile, candidates, vector_pool, timings)
+
+def build_llm_candidates(
+    cfg: AppConfig,
+    user_id: str,
+    user_preference: str,
+    user_profile: Dict[str, Any],
+    vector_pool: List[Dict[str, Any]],
+    features: Optional[CandidateFeatures] = None,
+) -> List[Dict[str, Any]]:
+    """LLM 에 보여줄 후보 요약 (사용자/날짜별 seed, 토큰 예산에 맞춘 개수). CPU 만 쓴다."""
     today_key = datetime.now(timezone.utc).strftime("%Y%m%d")
     seed = stable_seed_int(user_id, today_key)
 
-    candidates = build_candidate_view(faiss_pool, user_profile, user_preference, CFG.top_n_view, seed)
+    candidates = build_candidate_view(vector_pool, user_profile, user_preference, cfg.top_n_view, seed, features)
+    n_view = fit_view_to_budget(cfg, candidates, user_profile, user_preference, cfg.select_k)
+    if n_view < len(candidates):
+        logger.info("prompt budget %d tokens: top_n_view %d -> %d", cfg.prompt_token_budget, len(candidates), n_view)
+        candidates = build_candidate_view(vector_pool, user_profile, user_preference, n_view, seed, features)
+    return candidates
 
+def select_and_explain(
+    cfg: AppConfig,
+    user_preference: str,
+    user_profile: Dict[str, Any],
+    candidates: List[Dict[str, Any]],
+    vector_pool: List[Dict[str, Any]],
+    timings: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """후보 → LLM 선택(실패 시 로컬 점수 상위) → 배지/이유가 붙은 정책 사본 목록."""
+    timings = {} if timings is None else timings
+    intent = detect_intent(user_preference)
+
+    # 단일 호출 모드: 선택 + 이유를 한 번에 (검증 실패 시 아래 2회 호출 흐름)
+    single_reasons: Dict[int, str] = {}
+    selected_ids: List[int] = []
+    with stage_timer(timings, "llm_select"):
+        if cfg.llm_single_call:
+            picked = select_with_reasons_llm(cfg, candidates, user_profile, user_preference, k=cfg.select_k)
+            if picked:
+                selected_ids = [pid for pid, _ in picked]
+                single_reasons = dict(picked)
 
-    selected_ids = select_policy_ids_with_llm(CFG, candidates, user_profile, user_preference, k=CFG.select_k)
+        if not selected_ids:
+            selected_ids = select_policy_ids_with_llm(cfg, candidates, user_profile, user_preference, k=cfg.select_k)
 
     if not selected_ids:
         logger.warning("LLM ID 선택 실패 → 로컬 스코어 상위 K로 대체")
         pref_tokens = _tokenize_korean(user_preference)
         candidates_sorted = sorted(
-            candidates, key=lambda s: pre_score(s, pref_tokens, intent), reverse=True
+            candidates, key=lambda s: pre_score(cfg, s, pref_tokens, intent), reverse=True
         )
-        selected_ids = [int(s["id"]) for s in candidates_sorted[:CFG.select_k]]
+        selected_ids = [int(s["id"]) for s in candidates_sorted[:cfg.select_k]]
 
-    id_to_policy = {int(p.get("id") or -1): p for p in faiss_pool}
-    details = [id_to_policy[i] for i in selected_ids if i in id_to_policy]
+    # 워커에서는 policies가 프로세스 캐시이므로, 결과용 필드는 사본에만 기록한다.
+    id_to_policy = {int(p.get("id") or -1): p for p in vector_pool}
+    details = [dict(id_to_policy[i]) for i in selected_ids if i in id_to_policy]
 
     for p in details:
         r, b = build_reason_and_badges(p, user_profile)
         p["reason"] = r
         p["badges"] = b
 
-    details = generate_llm_reasons(CFG, details, user_profile, user_preference)
+    if single_reasons:
+        for p in details:
+            p["reason_llm"] = single_reasons[int(p.get("id") or -1)]
+    else:
+        with stage_timer(timings, "llm_reasons"):
+            details = generate_llm_reasons(cfg, details, user_profile, user_preference)
 
     for p in details:
         if p.get("reason_llm"):
             p["reason"] = p["reason_llm"]
             del p["reason_llm"]
 
-    print(json.dumps(details, ensure_ascii=False, indent=2))
+    return details
+
+@contextmanager
+def stage_timer(timings: Dict[str, float], name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+async def arun_recommendation(cfg: AppConfig, user_id: str, user_preference: str) -> List[Dict[str, Any]]:
+    """
+    CLI 용 run_recommendation: 서로 의존하지 않는 I/O 를 스레드에서 동시에 시작하고 데이터가 필요한 곳에서 합친다.
+      사용자 조회 ─────────────────────┐
+      정책 로드(스냅샷) → 벡터 색인 ───┼→ hard filter → 벡터 Top-M → (recommend_from_pool)
+      질의 임베딩 ─────────────────────┘
+    - 스냅샷을 끈 경우 정책 로드(SQL 프리필터)는 사용자 조회 뒤에 시작한다
+    - 임베딩 저장소가 오래됐으면(다시 임베딩 = 유료 API) 색인 준비는 사용자 조회가 성공한 뒤에 시작한다
+      (없는 사용자면 순차 실행처럼 바로 실패). 현재 세대면 열기만 하므로 처음부터 동시에
+    - 로컬 임베딩 백엔드는 색인 준비 때 학습되므로 질의 임베딩을 색인 뒤로 미룬다
+    결과는 run_recommendation 과 같다 (같은 함수에 같은 입력, 순서만 겹친다).
+    """
+    import asyncio
+
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
+
+    async def stage(name: str, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    has_query = bool(user_preference.strip())
+    user_task = asyncio.ensure_future(stage("user", load_user_from_db, cfg, user_id))
+
+    if cfg.policy_snapshot:
+        policies_task = asyncio.ensure_future(stage("policies", load_policies, cfg))
+    else:
+        async def prefiltered():
+            return await stage("policies", load_policies_from_db_sql_prefilter, cfg, await user_task)
+        policies_task = asyncio.ensure_future(prefiltered())
+
+    index_task = None
+    query_task = None
+    if has_query:
+        async def index_after_policies():
+            if not await asyncio.to_thread(vector_store_is_current, cfg):
+                await user_task
+            # 색인이 오래됐을 때 다시 임베딩할 전체 정책 (스냅샷 경로만; 프리필터 결과는 전체가 아님)
+            policies = await policies_task if cfg.policy_snapshot else None
+            return await stage("vector_index", load_vector_index, cfg, policies)
+        index_task = asyncio.ensure_future(index_after_policies())
+
+        async def query_embedding():
+            if is_local_model(cfg.embedding_model):
+                await index_task
+            return await stage("query_embedding", embed_query_cached, cfg, user_preference)
+        query_task = asyncio.ensure_future(query_embedding())
+
+    tasks = [t for t in (user_task, policies_task, index_task, query_task) if t is not None]
+    try:
+        user_profile = await user_task
+        policies = await policies_task
+        vector_index = await index_task if index_task is not None else None
+    except BaseException:
+        # 사용자 없음/정책 로드 실패: 남은 단계는 취소하고 예외를 회수한 뒤 원래 예외를 그대로 낸다
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    query_vec = None
+    if query_task is not None:
+        try:
+            query_vec = await query_task
+        except Exception as e:
+            # vector_top_m 안에서 임베딩이 실패했을 때와 같은 대체(원본 앞쪽 Top-M)
+            logger.warning("vector_top_m 실패: %s (fallback=원본)", e)
+            vector_index = None
+    timings["io_wall"] = round((time.perf_counter() - t_start) * 1000, 1)
+
+    with stage_timer(timings, "filter"):
+        filtered = filter_policies(policies, user_profile)  # (A: strict only)
+    if not filtered:
+        logger.info("stage timings(ms): %s", json.dumps(timings))
+        return []
+
+    with stage_timer(timings, "vector_top_m"):
+        vector_pool = vector_top_m(cfg, vector_index, filtered, user_preference, cfg.vector_top_m, query_vec)
+    logger.info("vector pool: %d -> %d", len(filtered), len(vector_pool))
+
+    details = await asyncio.to_thread(
+        recommend_from_pool, cfg, user_id, user_preference, user_profile, vector_pool, None, timings,
+    )
+    timings["total"] = round((time.perf_counter() - t_start) * 1000, 1)
+    logger.info("stage timings(ms): %s", json.dumps(timings))
+    return details
+
+# --------------------------
+# 배치 추천 (--batch)
+# --------------------------
+# 입력: stdin NDJSON 한 줄에 {"email": ..., "preference": ...}
+# 출력: stdout NDJSON 한 줄에 {"line", "email", "status": ok|no_match|error, "recommendations" | "error"} (끝나는 순서)
+# - 코퍼스/색인/스코어링 배열은 프로세스마다 한 번만 로드, 사용자는 IN 묶음 조회, 질의 임베딩은 한 번에
+# - 필터/벡터 Top-M/후보 요약(CPU)은 프로세스 풀, LLM 선택/이유는 스레드 풀에서 동시에
+_BATCH: Dict[str, Any] = {}
+
+def load_batch_corpus(cfg: AppConfig) -> Dict[str, Any]:
+    policies = load_policies(cfg)
+    return {
+        "policies": policies,
+        "vector_index": load_vector_index(cfg, policies),
+        "features": CandidateFeatures(policies) if np is not None else None,
+        "filter_index": PolicyFilterIndex(policies) if np is not None else None,
+    }
+
+def _batch_init(cfg: AppConfig) -> None:
+    # 자식 프로세스마다 자기 코퍼스/색인/캐시 연결을 연다 (부모가 먼저 저장소를 갱신해 두므로 임베딩은 없다)
+    if not _BATCH:
+        _BATCH.update(load_batch_corpus(cfg))
+
+def _batch_score(
+    cfg: AppConfig,
+    user_id: str,
+    user_preference: str,
+    user_profile: Dict[str, Any],
+    query_vec: Optional[List[float]],
+) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """프로세스 풀 작업: hard filter → 벡터 Top-M → 후보 요약. 반환: (벡터 풀 id, 후보)"""
+    filtered = filter_policies(_BATCH["policies"], user_profile, _BATCH["filter_index"])
+    if not filtered:
+        return [], []
+    # 질의 임베딩이 없으면(빈 질의/임베딩 실패) run_recommendation 과 같은 대체: 앞쪽 Top-M
+    index = _BATCH["vector_index"] if query_vec is not None else None
+    vector_pool = vector_top_m(cfg, index, filtered, user_preference, cfg.vector_top_m, query_vec)
+    candidates = build_llm_candidates(cfg, user_id, user_preference, user_profile, vector_pool, _BATCH["features"])
+    return [int(p.get("id") or -1) for p in vector_pool], candidates
+
+def read_batch_jobs(lines) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """NDJSON → (작업 목록, 잘못된 줄의 오류 결과)"""
+    jobs, errors = [], []
+    for no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+            email = str(obj.get("email") or "").strip()
+            if not email:
+                raise ValueError("email 없음")
+            jobs.append({"line": no, "email": email, "preference": str(obj.get("preference") or "").strip()})
+        except Exception as e:
+            errors.append({"line": no, "email": None, "status": "error", "error": f"입력 오류: {e}"})
+    return jobs, errors
+
+def run_batch(cfg: AppConfig, lines, out, workers: int, concurrency: int) -> Dict[str, int]:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    import multiprocessing
+
+    counts = {"ok": 0, "no_match": 0, "error": 0}
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
+
+    def emit(result: Dict[str, Any]) -> None:
+        counts[result["status"]] += 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    jobs, bad = read_batch_jobs(lines)
+    for result in bad:
+        emit(result)
+    if not jobs:
+        return counts
+
+    with stage_timer(timings, "corpus"):
+        _BATCH.update(load_batch_corpus(cfg))
+    by_id = {int(p.get("id") or -1): p for p in _BATCH["policies"]}
+
+    with stage_timer(timings, "users"):
+        profiles = load_users_from_db(cfg, [j["email"] for j in jobs])
+
+    query_vecs: Dict[str, List[float]] = {}
+    with stage_timer(timings, "query_embeddings"):
+        if _BATCH["vector_index"] is not None:
+            try:
+                query_vecs = embed_queries_cached(cfg, [j["preference"] for j in jobs])
+            except Exception as e:
+                logger.warning("질의 임베딩 실패: %s (fallback=원본)", e)
+
+    todo = []
+    for job in jobs:
+        job["profile"] = profiles.get(job["email"].lower())
+        if job["profile"] is None:
+            emit({"line": job["line"], "email": job["email"], "status": "error", "error": "사용자 없음"})
+        else:
+            todo.append(job)
+
+    def explain(job, pool_ids, candidates):
+        vector_pool = [by_id[i] for i in pool_ids if i in by_id]
+        details = select_and_explain(cfg, job["preference"], job["profile"], candidates, vector_pool)
+        return to_compact(details)
+
+    def scored_jobs():
+        # (작업, (풀 id, 후보) | 예외) 를 끝나는 순서대로
+        args = lambda j: (cfg, j["email"], j["preference"], j["profile"], query_vecs.get(j["preference"]))
+        if workers <= 1 or len(todo) <= 1:
+            for job in todo:
+                try:
+                    yield job, _batch_score(*args(job))
+                except Exception as e:
+                    yield job, e
+            return
+        # fork 는 쓰지 않는다: 부모는 이미 faiss(OpenMP 스레드 풀), sqlite 캐시 연결, DB 풀 소켓을 갖고 있어
+        # 복제된 자식에서 faiss 검색이 멈추거나 연결을 공유하게 된다 → 깨끗한 프로세스에서 _batch_init 으로 다시 로드
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        ctx = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_batch_init, initargs=(cfg,)) as procs:
+            futures = {procs.submit(_batch_score, *args(job)): job for job in todo}
+            for fut in as_completed(futures):
+                try:
+                    yield futures[fut], fut.result()
+                except Exception as e:
+                    yield futures[fut], e
+
+    t_fan = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as llm_pool:
+        pending = {}
+        for job, res in scored_jobs():
+            if isinstance(res, Exception):
+                logger.warning("batch scoring 실패 (line=%d): %s", job["line"], res)
+                emit({"line": job["line"], "email": job["email"], "status": "error", "error": str(res)})
+                continue
+            pool_ids, candidates = res
+            if not candidates:
+                emit({"line": job["line"], "email": job["email"], "status": "no_match", "recommendations": []})
+                continue
+            pending[llm_pool.submit(explain, job, pool_ids, candidates)] = job
+        for fut in as_completed(pending):
+            job = pending[fut]
+            try:
+                emit({"line": job["line"], "email": job["email"], "status": "ok", "recommendations": fut.result()})
+            except Exception as e:
+                logger.warning("batch LLM 실패 (line=%d): %s", job["line"], e)
+                emit({"line": job["line"], "email": job["email"], "status": "error", "error": str(e)})
+    timings["score_and_llm"] = round((time.perf_counter() - t_fan) * 1000, 1)
+    timings["total"] = round((time.perf_counter() - t_start) * 1000, 1)
+    logger.info("batch: %d users, %s, stage timings(ms): %s", len(jobs), json.dumps(counts), json.dumps(timings))
+    return counts
+
+def prompt_size_report(cfg: AppConfig, n: int) -> Dict[str, Any]:
+    """합성 코퍼스로 선택 프롬프트 크기 비교: 기존 JSON 후보 vs compact 표 (토큰 수)."""
+    from bench_policy_store import synthetic_rows
+
+    policies = [preprocess_policy_row(r) for r in synthetic_rows(n)]
+    user = {
+        "age": 27, "region": ["서울특별시 종로구"], "education": ["대학 졸업"], "job": ["미취업자"],
+        "major": [], "marriage": ["미혼"], "special": [], "income": 0, "interest_keywords": ["취업", "주거"],
+    }
+    preference = "월세 지원"
+    candidates = build_candidate_view(policies, user, preference, cfg.top_n_view, 1)
+    sys_prompt, prompt = _selection_prompts(candidates, user, preference, cfg.select_k, output_rule="", task="")
+    json_tokens = estimate_tokens(cfg, json.dumps(candidates, ensure_ascii=False))
+    table_tokens = estimate_tokens(cfg, encode_candidates(candidates))
+    return {
+        "candidates": len(candidates),
+        "tokenizer": "tiktoken" if _token_encoder(cfg.llm_model) is not None else "estimate",
+        "json_tokens": json_tokens,
+        "table_tokens": table_tokens,
+        "reduction": round(1 - table_tokens / json_tokens, 3) if json_tokens else 0.0,
+        "prompt_tokens": estimate_tokens(cfg, sys_prompt) + estimate_tokens(cfg, prompt),
+        "prompt_token_budget": cfg.prompt_token_budget,
+        "budget_view": fit_view_to_budget(cfg, candidates, user, preference, cfg.select_k),
+    }
+
+def main(argv: List[str]) -> int:
+    if len(argv) >= 2 and argv[1] == "--warm-queries":
+        # python3 recommend.py --warm-queries [파일]  (기본: warm_queries.txt)
+        queries = read_warm_queries(argv[2] if len(argv) > 2 else CFG.query_warm_file)
+        n = warm_query_cache(CFG, queries)
+        logger.info("질의 임베딩 캐시 warm-up: %d개 중 %d개 새로 임베딩", len(queries), n)
+        return 0
+
+    if len(argv) >= 2 and argv[1] == "--build-snapshot":
+        # python3 recommend.py --build-snapshot  (api_save.js 가 수집 후 호출)
+        logger.info("정책 스냅샷 빌드: %s", json.dumps(build_policy_snapshot(CFG), ensure_ascii=False))
+        return 0
+
+    if len(argv) >= 2 and argv[1] == "--batch":
+        # python3 recommend.py --batch [--workers N] [--concurrency M] < users.ndjson > results.ndjson
+        import argparse
+        parser = argparse.ArgumentParser(prog="recommend.py --batch", description="NDJSON {email, preference} → NDJSON 추천 결과")
+        parser.add_argument("--workers", type=int, default=CFG.batch_workers, help="스코어링 프로세스 수 (1 이면 프로세스 풀 없이)")
+        parser.add_argument("--concurrency", type=int, default=CFG.batch_llm_concurrency, help="동시에 진행하는 사용자별 LLM 호출 수")
+        ns = parser.parse_args(argv[2:])
+        if not CFG.openai_api_key:
+            logger.error("OPENAI_API_KEY가 없습니다.")
+            return 2
+        counts = run_batch(CFG, sys.stdin, sys.stdout, ns.workers, ns.concurrency)
+        return 0 if counts["error"] == 0 else 3
+
+    if len(argv) >= 2 and argv[1] == "--prompt-size":
+        # python3 recommend.py --prompt-size [N]  (합성 정책 N건, 기본 2000)
+        report = prompt_size_report(CFG, int(argv[2]) if len(argv) > 2 else 2000)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    if len(argv) < 3:
+        print('사용법: python3 recommend.py <user_id(email)> "<user_preference>"')
+        print('        python3 recommend.py --warm-queries [파일]')
+        print('        python3 recommend.py --build-snapshot')
+        print('        python3 recommend.py --prompt-size [N]')
+        print('        python3 recommend.py --batch [--workers N] [--concurrency M] < users.ndjson')
+        return 1
+
+    user_id = argv[1]
+    user_preference = argv[2].strip()
+
+    if not CFG.openai_api_key:
+        logger.error("OPENAI_API_KEY가 없습니다.")
+        return 2
+
+    if CFG.concurrent_stages:
+        import asyncio
+        details = asyncio.run(arun_recommendation(CFG, user_id, user_preference))
+    else:
+        details = run_recommendation(CFG, user_id, user_preference)
+    print(json.dumps(to_compact(details), ensure_ascii=False, indent=2))
     return 0
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         sys.exit(main(sys.argv))
     except KeyboardInterrupt:
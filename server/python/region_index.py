@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+지역 계층 색인 (시도 → 시군구).
+
+data/legal_district_code.txt(법정동코드 → 시도명/시군구명)와 KOR_SIDO_CODE 로 한 번 만들고,
+정책 zipCd / 사용자 region 을 (시도, 시군구) id 비트맵으로 바꿔 둔다.
+- 시도 이름은 약칭으로 통일: 서울특별시/서울 → 서울, 부산직할시 → 부산, 강원특별자치도/강원도 → 강원, 충청북도 → 충북
+- 시군구 이름은 api_save.js 와 같은 규칙으로 정규화: 수원시장안구 → 수원시 장안구
+- 정책 커버리지: 시군구 비트맵(시도 전체는 해당 시도의 모든 시군구 비트) + 전국 여부
+  전국 = data/sigungu_codes_current.txt 의 현행 시군구를 모두 포함 (utils/policyNormalizer.js 와 같은 기준)
+- 매칭 강도는 비트 연산 몇 번으로 결정한다
+  exact   : 사용자 지역 단위(시군구 / 시 / 시도) 하나가 정책 커버리지에 전부 들어감
+  partial : 사용자 시도 안의 일부 시군구만 겹침
+  mismatch: 겹치는 시도 없음
+- 관할 시도가 바뀐 시군구(_RELOCATED_SGG)는 옛 시도 이름/코드로 와도 현행 시군구로 해석
+- 색인으로 해석되지 않는 값(오타, 시도 없이 쓴 구 이름 등)만 기존 부분문자열 비교로 처리
+
+회귀 검사: python3 python/region_index.py  (REGRESSION_CASES 가 기대와 다르면 exit 1)
+"""
+
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DISTRICT_FILE = os.path.join(DATA_DIR, "legal_district_code.txt")
+CURRENT_CODES_FILE = os.path.join(DATA_DIR, "sigungu_codes_current.txt")
+
+KOR_SIDO_CODE = {
+    "11": "서울", "26": "부산", "27": "대구", "28": "인천", "29": "광주", "30": "대전", "31": "울산",
+    "36": "세종",
+    "41": "경기", "42": "강원", "43": "충북", "44": "충남",
+    "45": "전북", "46": "전남",
+    "47": "경북", "48": "경남",
+    "50": "제주",
+}
+# 특별자치도 전환 후 코드
+_NEW_SIDO_CODE = {"51": "강원", "52": "전북"}
+
+# 관할 시도가 바뀐 시군구: 옛 법정동코드 → 현행 코드 (같은 시군구 비트로 본다)
+# 가입 화면(client/app/auth/signup/page.tsx)은 옛 시도 아래에 두고 있어 "경상북도 군위군" 으로 저장된다
+_RELOCATED_SGG = {
+    "47720": "27720",  # 군위군: 경북 → 대구 (2023-07)
+}
+
+_SIDO_SUFFIXES = ("특별자치도", "특별자치시", "특별시", "광역시", "직할시")
+_CITY_GU = re.compile(r"^([가-힣]+시)([가-힣]+구)$")
+
+EXACT, PARTIAL, MISMATCH = "exact", "partial", "mismatch"
+_RANK = {MISMATCH: 0, PARTIAL: 1, EXACT: 2}
+
+
+# --------------------------
+# 부분문자열 비교 (색인으로 해석되지 않는 값용, 기존 recommend.py 규칙)
+# --------------------------
+def _dedupe(tokens: List[str]) -> List[str]:
+    seen = set()
+    out: List[str] = []
+    for t in tokens:
+        if t not in seen:
+            out.append(t)
+            seen.add(t)
+    return out
+
+def normalize_user_region_list(region_list: List[str]) -> List[str]:
+    tokens: List[str] = []
+    for r in region_list or []:
+        rr = (r or "").strip()
+        if not rr:
+            continue
+        parts = [p.strip() for p in rr.split() if p.strip()]
+        tokens.append(rr)
+        tokens.extend(parts)
+
+        for p in parts:
+            if p.endswith("도") and len(p) >= 2:
+                tokens.append(p[:-1])
+            if p.endswith("특별시") or p.endswith("광역시") or p.endswith("자치시") or p.endswith("자치도"):
+                tokens.append(
+                    p.replace("특별시", "").replace("광역시", "").replace("자치시", "").replace("자치도", "")
+                )
+    return _dedupe(tokens)
+
+def normalize_policy_region_list(policy_list: List[str]) -> List[str]:
+    out: List[str] = []
+    for x in policy_list or []:
+        s = (x or "").strip()
+        if not s:
+            continue
+        if s.isdigit() and s in KOR_SIDO_CODE:
+            out.append(KOR_SIDO_CODE[s])
+        out.append(s)
+        if s.endswith("도") and len(s) >= 2:
+            out.append(s[:-1])
+    return _dedupe(out)
+
+def substring_strength(policy_regions: List[str], user_regions: List[str]) -> str:
+    pr = normalize_policy_region_list(policy_regions)
+    ur = normalize_user_region_list(user_regions)
+    if set(pr) & set(ur):
+        return EXACT
+    for p in pr:
+        for u in ur:
+            if p and u and (p in u or u in p):
+                return PARTIAL
+    return MISMATCH
+
+
+# --------------------------
+# 계층 색인
+# --------------------------
+def normalize_sigungu(name: str) -> str:
+    s = " ".join((name or "").split())
+    m = _CITY_GU.match(s)
+    return f"{m.group(1)} {m.group(2)}" if m else s
+
+
+class RegionIndex:
+    def __init__(self, districts: Sequence[Tuple[str, str, str]] = (), current_codes: Sequence[str] = ()):
+        self.sidos: List[str] = _dedupe(list(KOR_SIDO_CODE.values()))
+        self.sido_id: Dict[str, int] = {s: i for i, s in enumerate(self.sidos)}
+        self._sido_code: Dict[str, int] = {
+            c: self.sido_id[s] for c, s in list(KOR_SIDO_CODE.items()) + list(_NEW_SIDO_CODE.items())
+        }
+
+        self._sgg_id: Dict[Tuple[int, str], int] = {}
+        self._children: Dict[Tuple[int, str], int] = {}  # (시도, "수원시") → 하위 구 비트맵
+        self._code_bit: Dict[str, int] = {}
+        self.sgg_names: List[str] = []
+        self.sido_all: List[int] = [0] * len(self.sidos)
+        known = {row[0] for row in districts}
+        relocated: List[Tuple[str, int, str]] = []
+        for code, sido_name, sgg_name in districts:
+            sido = self.sido_of(sido_name)
+            sgg = normalize_sigungu(sgg_name)
+            if sido is None or not sgg:
+                continue
+            if _RELOCATED_SGG.get(code) in known:
+                relocated.append((code, sido, sgg))
+                continue
+            sid = self._sgg_id.get((sido, sgg))
+            if sid is None:
+                sid = self._sgg_id[(sido, sgg)] = len(self.sgg_names)
+                self.sgg_names.append(f"{self.sidos[sido]} {sgg}")
+            bit = 1 << sid
+            self._code_bit[code] = bit
+            self.sido_all[sido] |= bit
+            if " " in sgg:
+                city = sgg.split(" ", 1)[0]
+                self._children[(sido, city)] = self._children.get((sido, city), 0) | bit
+        # 옛 시도 + 이름 / 옛 코드 → 현행 시군구 비트 (옛 시도 전체 비트맵에는 넣지 않는다)
+        for code, sido, sgg in relocated:
+            bit = self._code_bit[_RELOCATED_SGG[code]]
+            self._code_bit[code] = bit
+            self._sgg_id.setdefault((sido, sgg), bit.bit_length() - 1)
+
+        self.current_all = 0
+        for code in current_codes:
+            self.current_all |= self._code_bit.get(code, 0)
+        self.sido_current = [bits & self.current_all or bits for bits in self.sido_all]
+
+        self._lock = threading.Lock()
+        self._policy_cache: "OrderedDict[Tuple[str, ...], Tuple[int, bool, List[str]]]" = OrderedDict()
+        self._user_cache: "OrderedDict[Tuple[str, ...], Tuple[List[int], int, List[str]]]" = OrderedDict()
+
+    # ---------- 이름 해석 ----------
+    def sido_of(self, name: str) -> Optional[int]:
+        n = (name or "").strip()
+        if n in self.sido_id:
+            return self.sido_id[n]
+        for suf in _SIDO_SUFFIXES:
+            if n.endswith(suf) and len(n) > len(suf):
+                return self.sido_id.get(n[: -len(suf)])
+        if n.endswith("도") and len(n) >= 3:
+            base = n[:-1]
+            if len(base) == 3:  # 충청북 → 충북
+                base = base[0] + base[2]
+            return self.sido_id.get(base)
+        return None
+
+    def _entry(self, s: str) -> Tuple[Optional[int], int, int, bool]:
+        """
+        값 하나 → (시도 id, 커버리지 비트, 사용자 단위 비트, 전국 여부).
+        해석 실패면 시도 id 가 None.
+        """
+        s = (s or "").strip()
+        if s == "전국":
+            return -1, self.current_all, self.current_all, True
+        if s.isdigit():
+            if s in self._sido_code:
+                sido = self._sido_code[s]
+                return sido, self.sido_all[sido], self.sido_current[sido], False
+            bit = self._code_bit.get(s)
+            if bit:
+                return self._sido_of_bit(bit), bit, bit, False
+            return None, 0, 0, False
+
+        head, _, rest = s.partition(" ")
+        sido = self.sido_of(head)
+        if sido is None:
+            return None, 0, 0, False
+        rest = normalize_sigungu(rest)
+        if not rest:
+            return sido, self.sido_all[sido], self.sido_current[sido], False
+        bits = 0
+        sid = self._sgg_id.get((sido, rest))
+        if sid is not None:
+            bits |= 1 << sid
+        bits |= self._children.get((sido, rest), 0)
+        if not bits:
+            return None, 0, 0, False
+        return sido, bits, (bits & self.current_all) or bits, False
+
+    def _sido_of_bit(self, bit: int) -> int:
+        for i, b in enumerate(self.sido_all):
+            if b & bit:
+                return i
+        return -1
+
+    def policy_coverage(self, policy_regions: Sequence[str]) -> Tuple[int, bool, List[str]]:
+        """(시군구 비트맵, 전국 여부, 해석 못 한 값)"""
+        key = tuple(policy_regions or ())
+        with self._lock:
+            hit = self._policy_cache.get(key)
+            if hit is not None:
+                self._policy_cache.move_to_end(key)
+                return hit
+        bits, raw, nationwide = 0, [], False
+        for s in key:
+            if not (s or "").strip():
+                continue
+            sido, cov, _, nw = self._entry(s)
+            if sido is None:
+                raw.append(s)
+            bits |= cov
+            nationwide = nationwide or nw
+        nationwide = nationwide or (self.current_all != 0 and bits & self.current_all == self.current_all)
+        out = (bits, nationwide, raw)
+        with self._lock:
+            self._policy_cache[key] = out
+            if len(self._policy_cache) > 8192:
+                self._policy_cache.popitem(last=False)
+        return out
+
+    def user_units(self, user_regions: Sequence[str]) -> Tuple[List[int], int, List[str]]:
+        """(지역 단위별 비트맵 목록, 사용자 시도들의 전체 비트맵, 해석 못 한 값)"""
+        key = tuple(user_regions or ())
+        with self._lock:
+            hit = self._user_cache.get(key)
+            if hit is not None:
+                return hit
+        units, sido_bits, raw = [], 0, []
+        for s in key:
+            if not (s or "").strip():
+                continue
+            sido, _, unit, _ = self._entry(s)
+            if sido is None:
+                raw.append(s)
+                continue
+            units.append(unit)
+            sido_bits |= self.current_all if sido < 0 else self.sido_all[sido]
+        out = (units, sido_bits, raw)
+        with self._lock:
+            if len(self._user_cache) > 1024:
+                self._user_cache.clear()
+            self._user_cache[key] = out
+        return out
+
+    # ---------- 매칭 ----------
+    def strength(self, policy_regions: List[str], user_regions: List[str]) -> str:
+        if not policy_regions:
+            return "nationwide"
+        if not user_regions:
+            return "unknown"
+        if not self.sgg_names:  # 데이터 파일 없이 만든 색인
+            return substring_strength(policy_regions, user_regions)
+
+        bits, nationwide, p_raw = self.policy_coverage(policy_regions)
+        if nationwide:
+            return "nationwide"
+        units, sido_bits, u_raw = self.user_units(user_regions)
+
+        if any(u and u & bits == u for u in units):
+            result = EXACT
+        elif bits & sido_bits:
+            result = PARTIAL
+        else:
+            result = MISMATCH
+
+        # 해석 못 한 값끼리만 부분문자열 비교
+        if result != EXACT and p_raw:
+            result = max(result, substring_strength(p_raw, list(user_regions)), key=_RANK.get)
+        if result != EXACT and u_raw:
+            result = max(result, substring_strength(list(policy_regions), u_raw), key=_RANK.get)
+        return result
+
+
+def read_districts(path: str = DISTRICT_FILE) -> List[Tuple[str, str, str]]:
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        next(f, None)  # 헤더
+        for line in f:
+            parts = [v.strip() for v in line.split("\t")]
+            if len(parts) >= 3 and parts[0]:
+                rows.append((parts[0], parts[1], parts[2]))
+    return rows
+
+def read_current_codes(path: str = CURRENT_CODES_FILE) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+
+
+_INDEX: Optional[RegionIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+def get_region_index() -> RegionIndex:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            try:
+                _INDEX = RegionIndex(read_districts(), read_current_codes())
+            except FileNotFoundError:
+                # 데이터 파일이 없으면 시도 코드만으로 (나머지는 부분문자열 비교)
+                _INDEX = RegionIndex()
+        return _INDEX
+
+
+# (정책 지역, 사용자 지역, 기대 강도)
+REGRESSION_CASES = [
+    (["서울특별시 종로구"], ["서울특별시 종로구"], EXACT),
+    (["서울특별시"], ["서울특별시 종로구"], EXACT),
+    (["서울특별시 종로구"], ["서울특별시 중구"], PARTIAL),
+    (["부산광역시"], ["서울특별시 종로구"], MISMATCH),
+    (["경기도 수원시"], ["경기도 수원시 장안구"], EXACT),
+    # 관할이 바뀐 시군구: 가입 화면의 옛 시도 표기
+    (["대구광역시 군위군"], ["경상북도 군위군"], EXACT),
+    (["47720"], ["대구광역시 군위군"], EXACT),
+    (["경상북도"], ["경상북도 군위군"], PARTIAL),
+]
+
+def check(index: Optional[RegionIndex] = None) -> List[str]:
+    index = index or get_region_index()
+    bad = []
+    for policy_regions, user_regions, expected in REGRESSION_CASES:
+        got = index.strength(policy_regions, user_regions)
+        if got != expected:
+            bad.append(f"{policy_regions} vs {user_regions}: {got} (기대 {expected})")
+    return bad
+
+
+if __name__ == "__main__":
+    problems = check()
+    for line in problems:
+        print(line)
+    print(f"{len(REGRESSION_CASES) - len(problems)}/{len(REGRESSION_CASES)} ok")
+    sys.exit(1 if problems else 0)
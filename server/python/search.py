@@ -1,8 +1,16 @@
 import os
 import sys
-import pymysql
 from dotenv import load_dotenv
 import json
+import base64
+import hashlib
+import itertools
+from bisect import bisect_right
+from search_index import AttributeIndex, TextIndex, iter_bits, np
+from policy_store import load_store, iter_text_docs
+from search_cache import ResultCache
+from corpus_version import current_generation
+from db_pool import ConnectionPool, stream_cursor
 
 load_dotenv()
 
@@ -21,20 +29,31 @@ def preprocess_policy_row(policy):
             policy[k] = 0
     return policy
 
-def load_policies_from_db():
-    conn = pymysql.connect(
+def new_connection():
+    # pymysql 은 DB 에 처음 붙을 때 import (import search 만 하는 쪽은 비용 없음)
+    import pymysql
+    return pymysql.connect(
         host=os.environ.get('DB_HOST'),
         user=os.environ.get('DB_USER'),
         password=os.environ.get('DB_PASSWORD'),
-                database=os.environ.get('DB_NAME'),
+        database=os.environ.get('DB_NAME'),
         charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
     )
-    with conn:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM policies")
-            rows = cursor.fetchall()
-            return [preprocess_policy_row(p) for p in rows]
+
+# 상주 워커에서는 요청마다 연결을 새로 열지 않고 재사용한다
+DB_POOL = ConnectionPool(new_connection, int(os.environ.get("DB_POOL_SIZE", "4")))
+
+def connect():
+    # with connect() as conn: ... → 블록이 끝나면 풀에 반납
+    return DB_POOL.connection()
+
+def load_policies_from_db():
+    # 서버 측 커서로 받는 대로 전처리
+    with connect() as conn, stream_cursor(conn) as cursor:
+        cursor.execute("SELECT * FROM policies ORDER BY id")
+        return [preprocess_policy_row(p) for p in cursor]
 
 def multi_field_match(policy_list, filter_list):
     if not policy_list or any(p in ["제한없음", "무관", "", None] for p in policy_list):
@@ -47,50 +66,208 @@ def multi_field_match(policy_list, filter_list):
                 return True
     return False
 
-def filter_policies(policies, filters):
+# --------------------------
+# 결과 캐시 / 페이지네이션 / cursor
+# --------------------------
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SEARCH_CACHE_MAX_POSITIONS = int(os.environ.get("SEARCH_CACHE_MAX_POSITIONS", "500000"))
+
+PAGING_KEYS = ("limit", "cursor")
+
+# 검색 결과 캐시 (키: 코퍼스 로드 토큰 + 정규화된 filters)
+RESULT_CACHE = ResultCache(SEARCH_CACHE_MAX_POSITIONS)
+_LOAD_SEQ = itertools.count(1)
+
+def normalize_filters(filters):
+    """
+    캐시 키/cursor 용 정규형: 문자열은 trim, 리스트는 trim + 중복 제거 + 정렬,
+    빈 값은 제거. 검색 자체도 이 정규형으로 돌려서 키와 의미가 어긋나지 않게 한다.
+    """
+    out = {}
+    for k, v in (filters or {}).items():
+        if k in PAGING_KEYS:
+            if v not in (None, ""):
+                out[k] = v
+            continue
+        if isinstance(v, str):
+            v = v.strip()
+            if k == "keyword":
+                v = v.lower()
+        elif isinstance(v, (list, tuple)):
+            v = sorted({str(x).strip() for x in v if x is not None and str(x).strip()})
+        if v in (None, "", []):
+            continue
+        out[k] = v
+    return out
+
+def filters_key(filters):
+    # 같은 검색 조건이면 같은 키 (cursor 가 다른 조건에 재사용되는 것 방지)
+    body = {k: v for k, v in normalize_filters(filters).items() if k not in PAGING_KEYS}
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def encode_cursor(state):
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(cursor + pad))
+        if not isinstance(state, dict):
+            raise ValueError
+        return state
+    except Exception:
+        raise ValueError("잘못된 cursor 입니다.")
+
+def page_size(filters):
+    try:
+        limit = int(filters.get("limit") or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+class SearchCorpus:
+    # 코퍼스 로드 시 한 번 만든 색인을 함께 들고 다닌다 (상주 워커에서 재사용)
+    # 정책은 policy_store.PolicyStore(컬럼형)로 보관하고, 결과는 store 위치(position)로 다룬다.
+    def __init__(self, store, text_docs=None, generation="0"):
+        self.store = store
+        self.generation = generation
+        # 캐시 값은 이 store 의 위치라서, 세대가 같아도(마커 파일 없음 = "0", TTL/reload 재로드) 로드마다 새 토큰
+        self.cache_token = f"{generation}#{next(_LOAD_SEQ)}"
+        self.ids = store.ids  # ORDER BY id 로 로드 → 오름차순
+        self.index = AttributeIndex.from_store(store)
+        # numpy 가 없으면 keyword 는 정책명 부분문자열 검색으로 대체
+        self.text_index = None
+        if np is not None:
+            self.text_index = TextIndex(store if text_docs is None else text_docs, len(store))
+
+    def output(self, positions):
+        # 정책명만 리스트로 반환
+        return [{ "id": self.ids[i], "plcyNm": self.store.name(i) } for i in positions]
+
+    def _name_match(self, i, keyword):
+        return keyword in self.store.name(i).lower()
+
+    def _compute(self, filters):
+        keyword = filters.get("keyword") or ""
+        bits = self.index.match(filters)
+        if keyword and self.text_index is not None:
+            return self.text_index.search(keyword, bits)
+        return [i for i in iter_bits(bits) if not keyword or self._name_match(i, keyword)]
+
+    def search(self, filters):
+        """매칭된 위치 목록 (결과 캐시 경유)."""
+        filters = normalize_filters(filters)
+        key = filters_key(filters)
+        positions = RESULT_CACHE.get(self.cache_token, key)
+        if positions is None:
+            positions = RESULT_CACHE.put(self.cache_token, key, self._compute(filters))
+        return positions
+
+    def _resume_position(self, last_id):
+        # keyset: 마지막으로 내보낸 id 다음 위치 (재로드로 위치가 바뀌어도 안전)
+        return bisect_right(self.ids, last_id)
+
+    def pages(self, filters):
+        """
+        (positions, next_cursor) 를 페이지 단위로 생성한다.
+        - keyword 없음: 비트맵을 id 순으로 훑으며 찾는 즉시 페이지를 내보낸다.
+          cursor = 마지막 id (keyset)
+        - keyword 있음: BM25 정렬 결과를 결과 캐시에 두고, cursor = offset
+        """
+        filters = normalize_filters(filters)
+        limit = page_size(filters)
+        key = filters_key(filters)
+        state = decode_cursor(filters["cursor"]) if filters.get("cursor") else {}
+        if state and state.get("h") != key:
+            raise ValueError("cursor 가 다른 검색 조건에서 만들어졌습니다.")
+
+        keyword = filters.get("keyword") or ""
+
+        if keyword and self.text_index is not None:
+            ranked = self.search(filters)
+            off = int(state.get("o", 0))
+            while True:
+                chunk = ranked[off:off + limit]
+                off += len(chunk)
+                more = off < len(ranked)
+                yield chunk, (encode_cursor({"h": key, "o": off}) if more else None)
+                if not more:
+                    return
+
+        bits = self.index.match(filters)
+        start = self._resume_position(state["a"]) if "a" in state else 0
+        page = []
+        for i in iter_bits(bits, start):
+            if keyword and not self._name_match(i, keyword):
+                continue
+            if len(page) == limit:
+                # 다음 매칭이 있을 때만 cursor 발급
+                yield page, encode_cursor({"h": key, "a": self.ids[page[-1]]})
+                page = []
+            page.append(i)
+        yield page, None
+
+    def page(self, filters):
+        positions, next_cursor = next(self.pages(filters))
+        return {"items": self.output(positions), "nextCursor": next_cursor}
+
+def load_corpus():
+    # 필터/응답에 필요한 짧은 컬럼만 컬럼형으로 적재하고,
+    # 긴 본문은 BM25 색인을 만드는 동안 서버 측 커서로 흘려보내기만 한다.
+    generation = current_generation()
+    store = load_store(connect)
+    if np is None:
+        return SearchCorpus(store, generation=generation)
+    with connect() as conn, stream_cursor(conn) as cur:
+        cur.execute("SELECT id, plcySprtCn, plcyExplnCn FROM policies ORDER BY id")
+        return SearchCorpus(store, iter_text_docs(store, cur), generation=generation)
+
+def filter_policies(policies, filters, index=None, text_index=None):
     keyword = filters.get("keyword", "").lower()
-    sido = filters.get("sido")
-    employmentStatus = filters.get("employmentStatus")
-    maritalStatus = filters.get("maritalStatus")
-    education = filters.get("education")
-    major = filters.get("major")
-    specialGroup = filters.get("specialGroup", [])
-    interests = filters.get("interests", [])
+    if index is None:
+        index = AttributeIndex(policies)
+
+    # 속성 필터는 비트맵 AND/OR (multi_field_match 와 같은 의미)
+    bits = index.match(filters)
+
+    # keyword 는 BM25 색인(정책명/설명/지원내용/키워드)으로 매칭 + 점수순 정렬
+    if keyword and text_index is not None:
+        return [policies[i] for i in text_index.search(keyword, bits)]
 
     filtered = []
-    for p in policies:
+    for i in iter_bits(bits):
+        p = policies[i]
         if keyword and keyword not in p.get("plcyNm", "").lower():
             continue
-        if sido and not multi_field_match(p.get("zipCd", []), [sido]):
-            continue
-        if maritalStatus and not multi_field_match(p.get("mrgSttsCd", []), [maritalStatus]):
-            continue
-        if education and not multi_field_match(p.get("schoolCd", []), [education]):
-            continue
-        if employmentStatus and not multi_field_match(p.get("jobCd", []), [employmentStatus]):
-            continue
-        if major and not multi_field_match(p.get("plcyMajorCd", []), [major]):
-            continue
-        if specialGroup and not multi_field_match(p.get("sbizCd", []), specialGroup):
-            continue
-        if interests and not multi_field_match(p.get("plcyKywdNm", []), interests):
-            continue
-
         filtered.append(p)
     return filtered
 
+def to_output(result):
+    # 정책명만 리스트로 반환
+    return [{ "id": p.get("id"), "plcyNm": p.get("plcyNm", "(정책명 없음)") } for p in result]
+
+def is_paginated(filters):
+    return any(filters.get(k) for k in PAGING_KEYS)
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) < 2:
-            raise Exception("사용법: python3 search_v2.py '{json_str}'")
+            raise Exception("사용법: python3 search.py '{json_str}' [--ndjson]")
 
         filters = json.loads(sys.argv[1])
-        policies = load_policies_from_db()
-        result = filter_policies(policies, filters)
+        corpus = load_corpus()
 
-        # 정책명만 리스트로 반환
-        output = [{ "id": p.get("id"), "plcyNm": p.get("plcyNm", "(정책명 없음)") } for p in result]
-        print(json.dumps(output, ensure_ascii=False))
+        if "--ndjson" in sys.argv[2:]:
+            # 페이지마다 한 줄씩 바로 내보낸다 (첫 페이지는 찾는 즉시)
+            for positions, next_cursor in corpus.pages(filters):
+                print(json.dumps({ "items": corpus.output(positions), "nextCursor": next_cursor }, ensure_ascii=False), flush=True)
+        elif is_paginated(filters):
+            print(json.dumps(corpus.page(filters), ensure_ascii=False))
+        else:
+            print(json.dumps(corpus.output(corpus.search(filters)), ensure_ascii=False))
 
     except Exception as e:
         print(json.dumps({ "error": str(e) }, ensure_ascii=False))
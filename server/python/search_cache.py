@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+검색 결과 LRU 캐시.
+
+키 = (코퍼스 로드 토큰, 정규화된 filters). 값 = 매칭된 정책 위치 배열.
+(위치는 로드한 store 기준이라, 같은 세대라도 다시 로드하면 토큰이 바뀐다: search.SearchCorpus.cache_token)
+자주 쓰이는 조합(시도 + 고용상태, keyword 없음 등)을 다시 계산하지 않는다.
+- 크기 기준 축출: 보관 중인 위치 수 합계가 max_positions 를 넘으면 오래된 것부터 제거
+- 토큰이 바뀌면(새 정책 세트/재로드) 이전 항목은 모두 버린다
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# 항목 하나의 고정 비용(키/배열 헤더)을 위치 수로 환산한 값
+_ENTRY_OVERHEAD = 32
+
+
+class ResultCache:
+    def __init__(self, max_positions: int):
+        self.max_positions = max_positions
+        self._data: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._size = 0
+        self._generation: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _weight(self, positions: array) -> int:
+        return len(positions) + _ENTRY_OVERHEAD
+
+    def _switch_generation(self, generation: str) -> None:
+        if self._generation != generation:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._size = 0
+            self._generation = generation
+
+    def get(self, generation: str, key: str) -> Optional[array]:
+        with self._lock:
+            self._switch_generation(generation)
+            positions = self._data.get((generation, key))
+            if positions is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end((generation, key))
+            self.hits += 1
+            return positions
+
+    def put(self, generation: str, key: str, positions: Sequence[int]) -> array:
+        value = positions if isinstance(positions, array) else array("i", positions)
+        weight = self._weight(value)
+        with self._lock:
+            self._switch_generation(generation)
+            if weight > self.max_positions:
+                return value  # 너무 큰 결과는 캐시하지 않음
+            old = self._data.pop((generation, key), None)
+            if old is not None:
+                self._size -= self._weight(old)
+            self._data[(generation, key)] = value
+            self._size += weight
+            while self._size > self.max_positions and self._data:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= self._weight(evicted)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._size = 0
+            self._generation = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "generation": self._generation,
+                "entries": len(self._data),
+                "positions": self._size,
+                "max_positions": self.max_positions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
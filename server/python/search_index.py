@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+search.py 용 색인.
+
+1) AttributeIndex: 속성 필터용 역색인(비트셋)
+   코퍼스를 로드할 때 한 번 만들어 두고, 필터는 비트맵 AND/OR 로 계산한다.
+   - 비트 위치 = policies 리스트의 인덱스 (Python int 를 비트맵으로 사용)
+   - 필드별로 값 → 비트맵, 그리고 "제한 없음"(제한없음/무관/빈값) 비트맵
+   - multi_field_match 의 부분문자열 호환(f in p or p in f) 은
+     (필드, 질의값) 단위로 미리 계산해 둔 호환 비트맵으로 대체
+
+2) TextIndex: keyword 검색용 BM25 전문 색인
+   정책명/설명/지원내용/키워드를 음절 bigram 으로 쪼개 posting list 를 만든다.
+   질의는 질의 term 들의 posting 만 훑어 점수를 누적하므로
+   코퍼스 전체를 도는 선형 스캔보다 비용이 작다. (numpy 필요)
+"""
+
+import re
+import math
+import threading
+from array import array
+from typing import List, Dict, Any, Iterator, Iterable, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 search.py 는 정책명 부분문자열 검색으로 동작
+    np = None
+
+NO_RESTRICTION = ("제한없음", "무관", "", None)
+
+# 필터 이름 → 정책 필드
+FILTER_FIELDS = {
+    "sido": "zipCd",
+    "maritalStatus": "mrgSttsCd",
+    "education": "schoolCd",
+    "employmentStatus": "jobCd",
+    "major": "plcyMajorCd",
+    "specialGroup": "sbizCd",
+    "interests": "plcyKywdNm",
+}
+
+# 단일 값 필터 (나머지는 리스트)
+SCALAR_FILTERS = ("sido", "maritalStatus", "education", "employmentStatus", "major")
+
+_COMPAT_MEMO_MAX = 4096
+
+# 바이트 값 → 켜진 비트 위치
+_BYTE_BITS = [tuple(j for j in range(8) if (b >> j) & 1) for b in range(256)]
+
+
+def iter_bits(bits: int, start: int = 0) -> Iterator[int]:
+    """비트맵에서 켜진 위치를 오름차순으로 (start 이상부터) 순회."""
+    if start:
+        bits &= ~((1 << start) - 1)
+    if not bits:
+        return
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for i in range(start >> 3, len(raw)):
+        b = raw[i]
+        if b:
+            base = i << 3
+            for j in _BYTE_BITS[b]:
+                yield base + j
+
+
+def bits_from_positions(positions: Iterable[int], n: int) -> int:
+    """위치 목록 → 비트맵. (int 에 비트를 하나씩 OR 하면 O(n) 씩 복사가 일어나므로 bytearray 로 만든다)"""
+    buf = bytearray((n + 7) // 8)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class AttributeIndex:
+    def __init__(self, policies: Sequence[Dict[str, Any]]):
+        n = len(policies)
+        positions: Dict[str, Dict[str, array]] = {f: {} for f in FILTER_FIELDS.values()}
+        nores: Dict[str, array] = {f: array("i") for f in FILTER_FIELDS.values()}
+        for i, p in enumerate(policies):
+            for field in FILTER_FIELDS.values():
+                values = p.get(field) or []
+                if not values or any(v in NO_RESTRICTION for v in values):
+                    nores[field].append(i)
+                    continue
+                for v in values:
+                    slot = positions[field].get(v)
+                    if slot is None:
+                        slot = positions[field][v] = array("i")
+                    slot.append(i)
+        self._finish(n, positions, nores)
+
+    @classmethod
+    def from_store(cls, store) -> "AttributeIndex":
+        """policy_store.PolicyStore 의 코드 id 배열에서 바로 만든다 (dict 생성 없음)."""
+        self = cls.__new__(cls)
+        n = len(store)
+        positions: Dict[str, Dict[str, array]] = {}
+        nores: Dict[str, array] = {}
+        for field in FILTER_FIELDS.values():
+            vocab = store.vocab[field]
+            nores_codes = {c for c, v in enumerate(vocab) if v in NO_RESTRICTION}
+            by_code: List[array] = [array("i") for _ in vocab]
+            free = array("i")
+            for i in range(n):
+                codes = store.code_ids(field, i)
+                if not codes or any(c in nores_codes for c in codes):
+                    free.append(i)
+                    continue
+                for c in codes:
+                    by_code[c].append(i)
+            positions[field] = {vocab[c]: pos for c, pos in enumerate(by_code) if pos}
+            nores[field] = free
+        self._finish(n, positions, nores)
+        return self
+
+    def _finish(self, n: int, positions: Dict[str, Dict[str, array]], nores: Dict[str, array]) -> None:
+        self.n = n
+        self.all_bits = (1 << n) - 1
+        self.postings: Dict[str, Dict[str, int]] = {
+            field: {v: bits_from_positions(pos, n) for v, pos in by_value.items()}
+            for field, by_value in positions.items()
+        }
+        self.no_restriction: Dict[str, int] = {
+            field: bits_from_positions(pos, n) for field, pos in nores.items()
+        }
+        self._compat: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+        # 질의값은 대부분 같은 어휘(코드명)에서 오므로 어휘 쌍 호환 비트맵을 미리 계산
+        for field, postings in self.postings.items():
+            for v in postings:
+                self._compat[(field, v)] = self._compute_compat(field, v)
+
+    def _compute_compat(self, field: str, f: str) -> int:
+        bits = 0
+        for v, b in self.postings[field].items():
+            if v and (f in v or v in f):
+                bits |= b
+        return bits
+
+    def compat_bits(self, field: str, f: Any) -> int:
+        """질의값 f 와 부분문자열 호환되는 값을 가진 정책들의 비트맵."""
+        if not f:
+            return 0
+        key = (field, f)
+        bits = self._compat.get(key)
+        if bits is None:
+            bits = self._compute_compat(field, f)
+            with self._lock:
+                if len(self._compat) > _COMPAT_MEMO_MAX:
+                    self._compat.clear()
+                self._compat[key] = bits
+        return bits
+
+    def field_bits(self, field: str, filter_list: Iterable[Any]) -> int:
+        """multi_field_match(policy[field], filter_list) 가 True 인 정책들의 비트맵."""
+        filter_list = list(filter_list or [])
+        if not filter_list or "*" in filter_list:
+            return self.all_bits
+        bits = self.no_restriction[field]
+        for f in filter_list:
+            bits |= self.compat_bits(field, f)
+        return bits
+
+    def match(self, filters: Dict[str, Any], candidates: Optional[int] = None) -> int:
+        bits = self.all_bits if candidates is None else candidates
+        for name, field in FILTER_FIELDS.items():
+            value = filters.get(name)
+            if not value:
+                continue
+            bits &= self.field_bits(field, [value] if name in SCALAR_FILTERS else value)
+            if not bits:
+                break
+        return bits
+
+
+# --------------------------
+# BM25 전문 색인
+# --------------------------
+# (필드, 가중치, 최대 길이) — 긴 본문은 앞부분만 색인해서 색인 크기를 묶어둔다
+TEXT_FIELDS = (
+    ("plcyNm", 3.0, None),
+    ("plcyKywdNm", 2.0, None),
+    ("plcySprtCn", 1.0, 1000),
+    ("plcyExplnCn", 1.0, 1000),
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_SPLIT = re.compile(r"[^\w가-힣]+")
+_EXPAND_MEMO_MAX = 1024
+
+
+def text_terms(text: str) -> List[str]:
+    """
+    한국어는 띄어쓰기/조사 때문에 형태소 없이 단어 단위로는 잘 안 맞으므로
+    토큰별 음절 bigram 을 term 으로 쓴다. (한 글자 토큰은 그대로 term)
+    """
+    out: List[str] = []
+    for tok in _TOKEN_SPLIT.split((text or "").lower()):
+        if not tok:
+            continue
+        if len(tok) == 1:
+            out.append(tok)
+        else:
+            out.extend(tok[i:i + 2] for i in range(len(tok) - 1))
+    return out
+
+
+def _field_text(policy: Dict[str, Any], field: str, max_len: Optional[int]) -> str:
+    v = policy.get(field)
+    if isinstance(v, (list, tuple)):
+        v = " ".join(str(x) for x in v)
+    v = v or ""
+    return v[:max_len] if max_len else v
+
+
+class TextIndex:
+    def __init__(self, docs: Iterable[Dict[str, Any]], n: Optional[int] = None):
+        """
+        docs: 위치 순서대로의 문서(dict). 한 번만 순회하므로 DB 커서에서 흘려보내도 된다.
+        """
+        if np is None:
+            raise RuntimeError("TextIndex 는 numpy 가 필요합니다.")
+
+        self.n = len(docs) if n is None else n
+        doc_len = np.zeros(self.n, dtype=np.float32)
+        acc: Dict[str, Tuple[array, array]] = {}
+
+        for i, p in enumerate(docs):
+            tf: Dict[str, float] = {}
+            for field, weight, max_len in TEXT_FIELDS:
+                for t in text_terms(_field_text(p, field, max_len)):
+                    tf[t] = tf.get(t, 0.0) + weight
+            doc_len[i] = sum(tf.values())
+            for t, f in tf.items():
+                slot = acc.get(t)
+                if slot is None:
+                    slot = acc[t] = (array("i"), array("f"))
+                slot[0].append(i)
+                slot[1].append(f)
+
+        avgdl = float(doc_len.mean()) if self.n else 1.0
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / max(avgdl, 1e-6))
+
+        # term → (문서 위치 배열, BM25 가중치 배열). 가중치는 질의와 무관하므로 미리 계산
+        self.postings: Dict[str, Tuple[Any, Any]] = {}
+        for t, (docs, tfs) in acc.items():
+            ids = np.frombuffer(docs, dtype=np.int32).copy()
+            tf_arr = np.frombuffer(tfs, dtype=np.float32)
+            df = len(ids)
+            idf = math.log(1.0 + (self.n - df + 0.5) / (df + 0.5))
+            w = idf * tf_arr * (BM25_K1 + 1.0) / (tf_arr + norm[ids])
+            self.postings[t] = (ids, w.astype(np.float32))
+
+        self._expand: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _query_groups(self, query: str) -> List[List[str]]:
+        """
+        질의 term 그룹 목록. bigram 은 그 자체로 한 그룹,
+        한 글자 토큰은 그 글자를 포함하는 모든 term 의 OR 그룹으로 확장한다.
+        """
+        groups: List[List[str]] = []
+        seen = set()
+        for tok in _TOKEN_SPLIT.split((query or "").lower()):
+            if not tok:
+                continue
+            if len(tok) == 1:
+                if tok in seen:
+                    continue
+                seen.add(tok)
+                groups.append(self._expand_char(tok))
+            else:
+                for i in range(len(tok) - 1):
+                    t = tok[i:i + 2]
+                    if t not in seen:
+                        seen.add(t)
+                        groups.append([t])
+        return groups
+
+    def _expand_char(self, ch: str) -> List[str]:
+        terms = self._expand.get(ch)
+        if terms is None:
+            terms = [t for t in self.postings if ch in t]
+            with self._lock:
+                if len(self._expand) > _EXPAND_MEMO_MAX:
+                    self._expand.clear()
+                self._expand[ch] = terms
+        return terms
+
+    def search(self, query: str, candidates: Optional[int] = None, k: Optional[int] = None) -> List[int]:
+        """
+        BM25 점수 내림차순 정책 위치 목록.
+        - candidates: AttributeIndex 비트맵 (None 이면 전체)
+        - k: 상위 k 개만 (None 이면 매칭 전부)
+        질의 term 이 3개 이상이면 60% 이상 포함한 문서만 매칭으로 본다
+        (예: "청년월세" → 청년/년월/월세 중 2개).
+        """
+        groups = self._query_groups(query)
+        if not groups or not self.n:
+            return []
+
+        scores = np.zeros(self.n, dtype=np.float32)
+        hits = np.zeros(self.n, dtype=np.int16)
+        for group in groups:
+            seen = np.zeros(self.n, dtype=bool) if len(group) > 1 else None
+            for t in group:
+                posting = self.postings.get(t)
+                if posting is None:
+                    continue
+                ids, w = posting
+                scores[ids] += w
+                if seen is None:
+                    hits[ids] += 1
+                else:
+                    seen[ids] = True
+            if seen is not None:
+                hits += seen
+
+        q = len(groups)
+        need = q if q <= 2 else int(math.ceil(q * 0.6))
+        mask = hits >= need
+        if candidates is not None:
+            mask &= bitmap_to_mask(candidates, self.n)
+
+        matched = np.flatnonzero(mask)
+        if k is not None and 0 < k < len(matched):
+            part = np.argpartition(-scores[matched], k - 1)[:k]
+            matched = matched[part]
+        # 점수 내림차순, 동점은 위치(로드 순서) 오름차순
+        order = np.lexsort((matched, -scores[matched]))
+        return matched[order].tolist()
+
+
+def bitmap_to_mask(bits: int, n: int):
+    """AttributeIndex 비트맵 → numpy bool 배열."""
+    if not bits:
+        return np.zeros(n, dtype=bool)
+    raw = np.frombuffer(bits.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:n].astype(bool)
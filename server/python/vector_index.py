@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+recommend.py 용 전역 임베딩 색인.
+
+정책 코퍼스 전체 벡터(embedding_store, 세대마다 증분 갱신)를 하나의 색인으로 열고,
+사용자별 hard filter 결과는 id 허용 목록(allow-list)으로 검색 안에서 적용한다.
+→ 요청 경로에서는 질의 임베딩 1회 + 허용된 행에 대한 내적만 계산한다.
+
+- 벡터: embedding_store 의 memmap (L2 정규화, 내적 = 코사인 유사도)
+- faiss 가 설치돼 있으면 IndexFlatIP + IDSelectorBatch 로 허용 목록 안에서만 검색,
+  없으면 numpy 로 허용 행만 모아 내적 후 argpartition
+- 두 경로 모두 정확(exact) 검색 (근사 색인 아님)
+"""
+
+from typing import List, Dict, Iterable, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 벡터 단계는 건너뛴다 (recommend.py fallback)
+    np = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+from embedding_store import EmbeddingStore, _normalize
+
+
+class PolicyVectorIndex:
+    def __init__(self, ids: Sequence[int], vectors: "np.ndarray", model: str, generation: str):
+        if np is None:
+            raise ImportError("numpy 가 필요합니다.")
+        self.ids = np.asarray(ids, dtype=np.int64)
+        # memmap 그대로 보관: numpy 경로는 허용된 행만 읽는다
+        self.vectors = vectors
+        self.model = model
+        self.generation = generation
+        self._row: Dict[int, int] = {int(pid): r for r, pid in enumerate(self.ids.tolist())}
+        self._faiss = None
+        if faiss is not None and len(self.ids):
+            # faiss 는 자체 메모리에 벡터를 복사한다
+            self._faiss = faiss.IndexFlatIP(self.vectors.shape[1])
+            self._faiss.add(np.ascontiguousarray(self.vectors, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, model: str, generation: str) -> "PolicyVectorIndex":
+        return cls(store.ids, store.vectors, model, generation)
+
+    # ---------- 검색 ----------
+    def rows_for(self, ids: Iterable[int]) -> Tuple["np.ndarray", List[int]]:
+        """정책 id → 행 번호. 색인에 없는 id(세대 사이에 추가된 정책 등)는 따로 돌려준다."""
+        rows, missing = [], []
+        for pid in ids:
+            r = self._row.get(int(pid))
+            if r is None:
+                missing.append(int(pid))
+            else:
+                rows.append(r)
+        return np.asarray(rows, dtype=np.int64), missing
+
+    def search(self, query_vec: Sequence[float], allow_ids: Iterable[int], k: int) -> Tuple[List[int], List[int]]:
+        """
+        허용 목록 안에서 코사인 유사도 상위 k 개의 정책 id.
+        반환: (상위 id 목록, 색인에 없던 허용 id 목록)
+        """
+        rows, missing = self.rows_for(allow_ids)
+        if not len(rows) or k <= 0:
+            return [], missing
+        rows = np.unique(rows)  # 정렬 + 중복 제거
+        k = min(k, len(rows))
+        q = _normalize(np.asarray(query_vec, dtype=np.float32).reshape(1, -1))
+
+        if self._faiss is not None:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))
+            _, found = self._faiss.search(q, k, params=params)
+            top = [int(r) for r in found[0] if r >= 0]
+        else:
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ q[0]
+            if k < len(rows):
+                cand = np.argpartition(-scores, k - 1)[:k]
+            else:
+                cand = np.arange(len(rows))
+            order = cand[np.lexsort((rows[cand], -scores[cand]))]
+            top = rows[order].tolist()
+        return [int(self.ids[r]) for r in top], missing
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+상주(resident) 파이썬 워커.
+
+utils/pythonWorker.js 가 프로세스를 한 번 띄워두고 stdin/stdout 으로 요청을 주고받는다.
+요청마다 인터프리터를 새로 띄우던 runPython 경로의 고정비용
+(langchain/pydantic/pymysql import, load_dotenv, DB 접속, 정책 테이블 로드)을 한 번만 낸다.
+
+프로토콜 (한 줄 = 한 프레임, UTF-8 JSON / NDJSON):
+  요청: {"id": 1, "op": "search" | "search_stream" | "recommend" | "summary" | "summary_stream" | "stats" | "reload", "args": {...}}
+  응답: {"id": 1, "ok": true, "data": ...}
+        {"id": 1, "ok": false, "error": "..."}
+  스트리밍 op(search_stream, summary_stream)는 중간 프레임마다 "more": true 를 붙이고,
+  마지막에 {"id": 1, "ok": true, "data": null} 로 끝난다.
+stdout 은 프레임 전용이고, 로그/print 는 모두 stderr 로 보낸다.
+
+벤치마크:
+  python3 python/worker.py --bench search '{"sido": "서울"}' -n 30
+  → 요청마다 프로세스를 띄우는 기존 경로(cold)와 상주 워커(warm)의 p50/p99 비교
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+# 프레임 출력용 stdout 을 따로 잡아두고, 라이브러리 코드의 print 는 stderr 로 돌린다.
+_FRAME_OUT = sys.stdout
+sys.stdout = sys.stderr
+
+import search
+import recommend
+import policy_summary
+from corpus_version import current_generation
+
+logger = logging.getLogger("policy-worker")
+
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "4"))
+WORKER_CORPUS_TTL_S = int(os.environ.get("WORKER_CORPUS_TTL_S", "300"))
+# 벡터 색인 준비가 실패하면(임베딩 API 오류 등) 이 간격부터 두 배씩, 최대 MAX 까지 기다렸다가 다시 시도
+VECTOR_INDEX_RETRY_S = float(os.environ.get("VECTOR_INDEX_RETRY_S", "5"))
+VECTOR_INDEX_RETRY_MAX_S = float(os.environ.get("VECTOR_INDEX_RETRY_MAX_S", "300"))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# --------------------------
+# 정책 코퍼스 캐시
+# --------------------------
+class CorpusCache:
+    """
+    search / recommend 용 전처리 결과를 프로세스 안에 보관한다.
+    (두 스크립트의 전처리가 달라서 각각 따로 로드)
+    코퍼스 세대(api_save.js 가 갱신)가 바뀌거나, TTL 이 지나거나,
+    reload 요청이 오면 다음 호출 때 다시 읽는다.
+    로드는 이름별로 한 번만(single-flight) 하고, 다른 이름의 조회/로드는 막지 않는다
+    (recommend 가 임베딩 API 로 색인을 갱신하는 동안에도 search 는 계속 응답).
+    """
+
+    def __init__(self, ttl_s: int):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()  # 아래 dict 들만 보호 (로드 중에는 잡지 않는다)
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._items: Dict[str, Any] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._generation: Dict[str, str] = {}
+
+    def _fresh(self, name: str, generation: str) -> bool:
+        loaded_at = self._loaded_at.get(name)
+        return not (
+            loaded_at is None
+            or self._generation.get(name) != generation
+            or (self.ttl_s > 0 and time.time() - loaded_at > self.ttl_s)
+        )
+
+    def get(self, name: str, loader: Callable[[], Any]) -> Any:
+        generation = current_generation()
+        with self._lock:
+            if self._fresh(name, generation):
+                return self._items[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            with self._lock:
+                if self._fresh(name, generation):  # 기다리는 동안 다른 스레드가 로드함
+                    return self._items[name]
+            t0 = time.perf_counter()
+            item = loader()
+            with self._lock:
+                self._items[name] = item
+                self._loaded_at[name] = time.time()
+                self._generation[name] = generation
+            logger.info("corpus(%s) 로드: gen=%s %.1fms", name, generation, (time.perf_counter() - t0) * 1000)
+            return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._loaded_at.clear()
+            self._generation.clear()
+
+class RecommendCorpus:
+    """
+    recommend 용 정책 목록 + 그 목록에서 만든 색인 묶음.
+    한 항목으로 캐시해서, 색인이 다른 세대의 정책 목록에서 만들어지는 일이 없게 한다.
+    벡터 색인은 실패(None)를 캐시하지 않는다: 백오프 뒤 다음 요청에서 같은 정책 목록으로 다시 만든다.
+    """
+
+    def __init__(self, cfg: recommend.AppConfig):
+        self.cfg = cfg
+        self.policies = recommend.load_policies(cfg)
+        use_np = recommend.np is not None
+        self.features = recommend.CandidateFeatures(self.policies) if use_np else None
+        self.filter_index = recommend.PolicyFilterIndex(self.policies) if use_np else None
+        self._vector_index: Optional[Any] = None
+        self._vector_lock = threading.Lock()
+        self._vector_failures = 0
+        self._vector_retry_at = 0.0
+        self.vector_index()
+
+    def vector_index(self) -> Optional[Any]:
+        if self._vector_index is not None or time.monotonic() < self._vector_retry_at:
+            return self._vector_index
+        with self._vector_lock:
+            if self._vector_index is None and time.monotonic() >= self._vector_retry_at:
+                index = recommend.load_vector_index(self.cfg, self.policies)
+                if index is None:
+                    self._vector_failures += 1
+                    delay = min(VECTOR_INDEX_RETRY_MAX_S, VECTOR_INDEX_RETRY_S * 2 ** (self._vector_failures - 1))
+                    self._vector_retry_at = time.monotonic() + delay
+                    logger.warning("벡터 색인 없음 (%d회 실패) → %.0fs 뒤 재시도", self._vector_failures, delay)
+                else:
+                    self._vector_index = index
+                    self._vector_failures = 0
+            return self._vector_index
+
+CORPUS = CorpusCache(WORKER_CORPUS_TTL_S)
+
+# --------------------------
+# 지연시간 통계
+# --------------------------
+def percentile(values: List[float], q: float) -> float:
+    # nearest-rank 방식
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, math.ceil(q / 100.0 * len(s)) - 1))
+    return s[k]
+
+def latency_summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+    }
+
+class LatencyStats:
+    """op별 첫 호출(cold: import/DB/코퍼스 로드 포함)과 이후 호출(warm)을 나눠 기록."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cold: Dict[str, List[float]] = {}
+        self._warm: Dict[str, List[float]] = {}
+
+    def record(self, op: str, elapsed_ms: float) -> None:
+        with self._lock:
+            if op not in self._cold:
+                self._cold[op] = [elapsed_ms]
+            else:
+                warm = self._warm.setdefault(op, [])
+                warm.append(elapsed_ms)
+                if len(warm) > 10000:
+                    del warm[: len(warm) - 10000]
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                op: {
+                    "cold": latency_summary(self._cold.get(op, [])),
+                    "warm": latency_summary(self._warm.get(op, [])),
+                }
+                for op in sorted(set(self._cold) | set(self._warm))
+            }
+
+STATS = LatencyStats()
+
+# --------------------------
+# op 핸들러
+# --------------------------
+def op_search(args: Dict[str, Any]) -> Any:
+    corpus = CORPUS.get("search", search.load_corpus)
+    filters = args.get("filters") or {}
+    if search.is_paginated(filters):
+        return corpus.page(filters)
+    return corpus.output(corpus.search(filters))
+
+def op_search_stream(args: Dict[str, Any]) -> Iterator[Any]:
+    corpus = CORPUS.get("search", search.load_corpus)
+    for positions, next_cursor in corpus.pages(args.get("filters") or {}):
+        yield {"items": corpus.output(positions), "nextCursor": next_cursor}
+
+def op_recommend(args: Dict[str, Any]) -> Any:
+    cfg = recommend.CFG
+    if not cfg.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY가 없습니다.")
+    email = args.get("email") or ""
+    prompt = (args.get("prompt") or "").strip()
+    if not email:
+        raise ValueError("email 이 필요합니다.")
+
+    corpus = CORPUS.get("recommend", lambda: RecommendCorpus(cfg))
+    details = recommend.run_recommendation(
+        cfg, email, prompt, policies=corpus.policies, vector_index=corpus.vector_index(),
+        features=corpus.features, filter_index=corpus.filter_index,
+    )
+    return recommend.to_compact(details)
+
+def op_summary(args: Dict[str, Any]) -> Any:
+    text = (args.get("text") or "").strip()
+    if not text:
+        return "요약할 정책 정보가 없습니다."
+    return policy_summary.summarize(text, args.get("id"))
+
+def op_summary_stream(args: Dict[str, Any]) -> Iterator[Any]:
+    # 토큰 조각마다 프레임 하나 (latency 통계는 첫 프레임 = time-to-first-token)
+    text = (args.get("text") or "").strip()
+    if not text:
+        yield {"delta": "요약할 정책 정보가 없습니다."}
+        return
+    for delta in policy_summary.stream_summary(text, args.get("id")):
+        yield {"delta": delta}
+
+def op_stats(args: Dict[str, Any]) -> Any:
+    llm_cache = recommend.llm_cache(recommend.CFG)
+    return {
+        "latency": STATS.report(),
+        "search_cache": search.RESULT_CACHE.stats(),
+        "query_embedding_cache": recommend.query_embedding_cache(recommend.CFG).stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "db_pool": {"search": search.DB_POOL.stats(), "recommend": recommend.db_pool_stats()},
+    }
+
+def op_reload(args: Dict[str, Any]) -> Any:
+    CORPUS.clear()
+    search.RESULT_CACHE.clear()
+    return True
+
+OPS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "search": op_search,
+    "search_stream": op_search_stream,
+    "recommend": op_recommend,
+    "summary": op_summary,
+    "summary_stream": op_summary_stream,
+    "stats": op_stats,
+    "reload": op_reload,
+}
+
+STREAM_OPS = ("search_stream", "summary_stream")
+
+def handle(op: str, args: Dict[str, Any]) -> Any:
+    fn = OPS.get(op)
+    if fn is None:
+        raise ValueError(f"알 수 없는 op: {op}")
+    t0 = time.perf_counter()
+    try:
+        return fn(args)
+    finally:
+        if op not in ("stats", "reload") and op not in STREAM_OPS:
+            STATS.record(op, (time.perf_counter() - t0) * 1000)
+
+def handle_stream(req_id: Any, op: str, args: Dict[str, Any]) -> None:
+    # 스트리밍 op 의 지연시간은 첫 프레임까지(time-to-first-frame)로 기록
+    t0 = time.perf_counter()
+    first = True
+    for chunk in OPS[op](args):
+        if first:
+            STATS.record(op, (time.perf_counter() - t0) * 1000)
+            first = False
+        write_frame({"id": req_id, "ok": True, "data": chunk, "more": True})
+    write_frame({"id": req_id, "ok": True, "data": None})
+
+# --------------------------
+# 프레임 I/O
+# --------------------------
+_write_lock = threading.Lock()
+
+def write_frame(frame: Dict[str, Any]) -> None:
+    line = json.dumps(frame, ensure_ascii=False, default=str, separators=(",", ":"))
+    with _write_lock:
+        _FRAME_OUT.write(line + "\n")
+        _FRAME_OUT.flush()
+
+def process_line(line: str) -> None:
+    req_id = None
+    try:
+        req = json.loads(line)
+        req_id = req.get("id")
+        op = req.get("op", "")
+        if op in STREAM_OPS:
+            handle_stream(req_id, op, req.get("args") or {})
+            return
+        data = handle(op, req.get("args") or {})
+        write_frame({"id": req_id, "ok": True, "data": data})
+    except Exception as e:
+        logger.exception("요청 처리 실패(id=%s): %s", req_id, e)
+        write_frame({"id": req_id, "ok": False, "error": str(e)})
+
+def warm_up() -> None:
+    # 자주 쓰이는 추천 질의의 임베딩을 미리 캐시에 올려 둔다 (실패해도 서비스에는 영향 없음)
+    cfg = recommend.CFG
+    if not cfg.openai_api_key and not recommend.is_local_model(cfg.embedding_model):
+        return
+    try:
+        queries = recommend.read_warm_queries(cfg.query_warm_file)
+        n = recommend.warm_query_cache(cfg, queries)
+        logger.info("질의 임베딩 warm-up: %d/%d", n, len(queries))
+    except Exception as e:
+        logger.warning("질의 임베딩 warm-up 실패(무시): %s", e)
+
+def serve() -> int:
+    logger.info("worker 시작 (pid=%d, threads=%d)", os.getpid(), WORKER_THREADS)
+    with ThreadPoolExecutor(max_workers=WORKER_THREADS) as pool:
+        pool.submit(warm_up)
+        for line in sys.stdin:
+            line = line.strip()
+            if line:
+                pool.submit(process_line, line)
+    logger.info("stdin 종료 → worker 종료. latency=%s", json.dumps(STATS.report(), ensure_ascii=False))
+    return 0
+
+# --------------------------
+# 벤치마크 (cold spawn vs warm resident)
+# --------------------------
+def _legacy_command(op: str, args: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+    if op == "search":
+        return [sys.executable, os.path.join(HERE, "search.py"), json.dumps(args.get("filters") or {}, ensure_ascii=False)], None
+    if op == "recommend":
+        return [sys.executable, os.path.join(HERE, "recommend.py"), args.get("email", ""), args.get("prompt", "")], None
+    if op == "summary":
+        return [sys.executable, os.path.join(HERE, "policy_summary.py")], args.get("text", "")
+    raise ValueError(f"벤치마크 불가 op: {op}")
+
+def bench(op: str, args: Dict[str, Any], n: int) -> Dict[str, Any]:
+    cmd, stdin_data = _legacy_command(op, args)
+    cold: List[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, input=stdin_data, capture_output=True, text=True, check=True)
+        cold.append((time.perf_counter() - t0) * 1000)
+
+    handle(op, args)  # 워밍업 (import 이후 첫 호출: 코퍼스 로드)
+    warm: List[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        handle(op, args)
+        warm.append((time.perf_counter() - t0) * 1000)
+
+    return {"op": op, "cold_spawn": latency_summary(cold), "warm_resident": latency_summary(warm)}
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="policy python worker")
+    parser.add_argument("--bench", metavar="OP", help="search | recommend | summary")
+    parser.add_argument("bench_args", nargs="?", default="{}", help="op args (JSON)")
+    parser.add_argument("-n", type=int, default=20, help="반복 횟수")
+    ns = parser.parse_args(argv[1:])
+
+    if ns.bench:
+        raw = json.loads(ns.bench_args)
+        args = {"filters": raw} if ns.bench == "search" else raw
+        print(json.dumps(bench(ns.bench, args, ns.n), ensure_ascii=False, indent=2), file=_FRAME_OUT)
+        return 0
+    return serve()
+
+if __name__ == "__main__":
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+            format="[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+        )
+    try:
+        sys.exit(main(sys.argv))
+    except KeyboardInterrupt:
+        sys.exit(130)
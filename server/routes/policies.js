@@ -51,6 +51,21 @@ const review = require('../controllers/reviewController');
  *         schema:
  *           type: string
  *         description: "관심사 쉼표로 구분"
+ *       - in: query
+ *         name: limit
+ *         schema:
+ *           type: integer
+ *         description: "페이지 크기 (지정하면 { items, nextCursor } 형태로 응답)"
+ *       - in: query
+ *         name: cursor
+ *         schema:
+ *           type: string
+ *         description: "이전 응답의 nextCursor (다음 페이지 조회)"
+ *       - in: query
+ *         name: stream
+ *         schema:
+ *           type: string
+ *         description: "1 이면 페이지마다 한 줄씩 NDJSON(application/x-ndjson)으로 스트리밍"
  *     responses:
  *       200:
  *         description: 검색 결과
@@ -186,6 +201,11 @@ router.get('/:id', authenticate, policy.getDetail);
  *           type: integer
  *         required: true
  *         description: 정책 ID
+ *       - in: query
+ *         name: stream
+ *         schema:
+ *           type: string
+ *         description: "1 이면 토큰 조각마다 {\"delta\"} 한 줄씩 NDJSON(application/x-ndjson)으로 스트리밍, 끝에 {\"done\": true}"
  *     responses:
  *       200:
  *         description: 정책 요약
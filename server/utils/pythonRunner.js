@@ -2,6 +2,7 @@ const { spawn } = require('child_process');
 const path = require('path');
 
 const pythonExecutable = path.resolve(__dirname, '..', 'venv/bin/python');
+exports.pythonExecutable = pythonExecutable;
 
 exports.runPython = (scriptName, args = [], stdInData = null) => {
   return new Promise((resolve, reject) => {
@@ -0,0 +1,81 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const { pythonExecutable } = require('./pythonRunner');
+
+// 상주 파이썬 워커(python/worker.py)와 NDJSON 프레임으로 통신
+// 요청: {"id", "op", "args"} / 응답: {"id", "ok", "data" | "error"}
+// 스트리밍 op 는 중간 프레임에 "more": true 가 붙고, onData 로 하나씩 전달된다.
+const DEFAULT_TIMEOUT_MS = Number(process.env.PYTHON_WORKER_TIMEOUT_MS || 120000);
+
+let worker = null;
+let nextId = 1;
+const pending = new Map();
+
+function failAll(err) {
+  for (const { reject, timer } of pending.values()) {
+    clearTimeout(timer);
+    reject(err);
+  }
+  pending.clear();
+}
+
+function startWorker() {
+  const py = spawn(pythonExecutable, ['python/worker.py'], {
+    cwd: path.resolve(__dirname, '..'),
+    env: process.env,
+  });
+
+  const rl = readline.createInterface({ input: py.stdout });
+  rl.on('line', (line) => {
+    let frame;
+    try {
+      frame = JSON.parse(line);
+    } catch (e) {
+      console.error('[pythonWorker] 잘못된 프레임:', line);
+      return;
+    }
+    const job = pending.get(frame.id);
+    if (!job) return;
+    if (frame.ok && frame.more) {
+      if (job.onData) job.onData(frame.data);
+      return;
+    }
+    pending.delete(frame.id);
+    clearTimeout(job.timer);
+    if (frame.ok) job.resolve(frame.data);
+    else job.reject(new Error(frame.error || 'python worker error'));
+  });
+
+  py.stderr.on('data', (chunk) => process.stderr.write(chunk));
+
+  const onExit = (reason) => {
+    if (worker === py) worker = null;
+    failAll(new Error(`python worker 종료: ${reason}`));
+  };
+  py.on('error', (err) => onExit(err.message));
+  py.on('close', (code) => onExit(`exit code ${code}`));
+
+  return py;
+}
+
+exports.callWorker = (op, args = {}, { timeoutMs = DEFAULT_TIMEOUT_MS, onData = null } = {}) => {
+  if (!worker) worker = startWorker();
+
+  return new Promise((resolve, reject) => {
+    const id = nextId++;
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new Error(`python worker timeout (${op})`));
+    }, timeoutMs);
+    pending.set(id, { resolve, reject, timer, onData });
+    worker.stdin.write(JSON.stringify({ id, op, args }) + '\n');
+  });
+};
+
+exports.stopWorker = () => {
+  if (worker) {
+    worker.stdin.end();
+    worker = null;
+  }
+};